@@ -0,0 +1,18 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+音频输入输出模块
+提供常驻麦克风采集线程、共享环形缓冲区、语音活动检测、流式播放、插话检测和本地唤醒词检测
+"""
+
+from .capture import AudioRingBuffer, RingBufferReader, MicrophoneCapture
+from .vad import VoiceActivityDetector, VadEvent
+from .playback import AudioPlayer, PlaybackStream
+from .echo import EchoSuppressor, BargeInDetector
+from .keyword_spotter import KeywordSpotter, MfccExtractor
+
+# 导出模块的主要类
+__all__ = ['AudioRingBuffer', 'RingBufferReader', 'MicrophoneCapture',
+           'VoiceActivityDetector', 'VadEvent', 'AudioPlayer', 'PlaybackStream',
+           'EchoSuppressor', 'BargeInDetector', 'KeywordSpotter', 'MfccExtractor']
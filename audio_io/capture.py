@@ -0,0 +1,269 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+麦克风采集模块
+
+一个常驻线程独占唯一的PyAudio输入流，把采集到的int16采样写入预分配的环形缓冲区。
+唤醒词检测、命令录制和麦克风自检各自持有读游标，从同一个缓冲区读取数据，
+因此在两次处理之间说出的语音不会丢失，也不需要反复打开设备。
+"""
+
+import threading
+import time
+
+import numpy as np
+import pyaudio
+
+
+class AudioRingBuffer:
+    """预分配的int16环形缓冲区
+
+    写入位置是单调递增的绝对采样计数，读者用绝对位置表示自己的读游标，
+    缓冲区只保留最近capacity个采样。
+    """
+
+    def __init__(self, capacity):
+        """初始化环形缓冲区
+
+        Args:
+            capacity: 缓冲区容量（采样数）
+        """
+        self.capacity = int(capacity)
+        self._data = np.zeros(self.capacity, dtype=np.int16)
+        self._write_pos = 0
+        self._cond = threading.Condition()
+        self._closed = False
+
+    @property
+    def write_position(self):
+        """当前写入位置（已写入的采样总数）"""
+        with self._cond:
+            return self._write_pos
+
+    @property
+    def oldest_position(self):
+        """缓冲区中仍可读取的最早位置"""
+        with self._cond:
+            return max(0, self._write_pos - self.capacity)
+
+    @property
+    def closed(self):
+        return self._closed
+
+    def write(self, samples):
+        """写入一段采样并唤醒等待的读者"""
+        samples = np.asarray(samples, dtype=np.int16)
+        n = len(samples)
+        if n == 0:
+            return
+        with self._cond:
+            # 超过容量的部分只保留最新的数据
+            if n > self.capacity:
+                self._write_pos += n - self.capacity
+                samples = samples[-self.capacity:]
+                n = self.capacity
+            start = self._write_pos % self.capacity
+            end = start + n
+            if end <= self.capacity:
+                self._data[start:end] = samples
+            else:
+                split = self.capacity - start
+                self._data[start:] = samples[:split]
+                self._data[:end - self.capacity] = samples[split:]
+            self._write_pos += n
+            self._cond.notify_all()
+
+    def read_range(self, start, end):
+        """读取[start, end)范围内的采样副本
+
+        已被覆盖的部分会被截掉，尚未写入的部分不会返回。
+        """
+        with self._cond:
+            start = max(start, self._write_pos - self.capacity, 0)
+            end = min(end, self._write_pos)
+            if end <= start:
+                return np.zeros(0, dtype=np.int16)
+            i = start % self.capacity
+            j = i + (end - start)
+            if j <= self.capacity:
+                return self._data[i:j].copy()
+            return np.concatenate((self._data[i:], self._data[:j - self.capacity]))
+
+    def wait_for(self, position, timeout=None):
+        """等待写入位置到达position
+
+        Returns:
+            bool: 数据已就绪返回True，超时或缓冲区关闭返回False
+        """
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self._cond:
+            while self._write_pos < position and not self._closed:
+                remaining = None if deadline is None else deadline - time.monotonic()
+                if remaining is not None and remaining <= 0:
+                    return False
+                self._cond.wait(remaining)
+            return self._write_pos >= position
+
+    def close(self):
+        """关闭缓冲区，唤醒所有等待的读者"""
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()
+
+    def reopen(self):
+        with self._cond:
+            self._closed = False
+
+    def create_reader(self, from_position=None):
+        """创建一个读游标，默认从当前写入位置开始读取"""
+        if from_position is None:
+            from_position = self.write_position
+        return RingBufferReader(self, from_position)
+
+
+class RingBufferReader:
+    """环形缓冲区的读游标"""
+
+    def __init__(self, ring, position):
+        self.ring = ring
+        self.position = int(position)
+        self.overruns = 0  # 读取落后导致数据被覆盖的次数
+
+    def available(self):
+        """当前可读的采样数"""
+        return self.ring.write_position - self.position
+
+    def _check_overrun(self):
+        oldest = self.ring.oldest_position
+        if self.position < oldest:
+            print(f"警告: 音频读取落后，丢弃 {oldest - self.position} 个采样")
+            self.overruns += 1
+            self.position = oldest
+
+    def read(self, num_samples, timeout=None):
+        """阻塞读取num_samples个采样
+
+        Returns:
+            np.ndarray: int16采样；超时或缓冲区关闭时返回None
+        """
+        self._check_overrun()
+        end = self.position + num_samples
+        if not self.ring.wait_for(end, timeout):
+            return None
+        self._check_overrun()
+        data = self.ring.read_range(self.position, self.position + num_samples)
+        self.position += len(data)
+        return data
+
+    def read_block(self, min_samples, max_samples=None, timeout=None):
+        """至少读取min_samples个采样，积压的数据一并读出以便批量处理
+
+        Returns:
+            np.ndarray: int16采样；超时或缓冲区关闭时返回None
+        """
+        self._check_overrun()
+        if not self.ring.wait_for(self.position + min_samples, timeout):
+            return None
+        return self.read_available(max_samples)
+
+    def read_available(self, max_samples=None):
+        """非阻塞读取当前所有可读采样"""
+        self._check_overrun()
+        end = self.ring.write_position
+        if max_samples is not None:
+            end = min(end, self.position + max_samples)
+        data = self.ring.read_range(self.position, end)
+        self.position += len(data)
+        return data
+
+    def seek(self, position):
+        """移动读游标到指定绝对位置"""
+        self.position = int(position)
+
+    def skip_to_latest(self):
+        """跳过所有未读数据"""
+        self.position = self.ring.write_position
+
+
+class MicrophoneCapture:
+    """常驻麦克风采集线程
+
+    独占一个长期打开的PyAudio输入流，把数据持续写入共享的环形缓冲区。
+    """
+
+    def __init__(self, audio, sample_rate=16000, frames_per_buffer=512, buffer_seconds=30):
+        """初始化采集器
+
+        Args:
+            audio: pyaudio.PyAudio实例
+            sample_rate: 采样率
+            frames_per_buffer: 每次从设备读取的采样数
+            buffer_seconds: 环形缓冲区保留的音频时长（秒）
+        """
+        self.audio = audio
+        self.sample_rate = sample_rate
+        self.frames_per_buffer = frames_per_buffer
+        self.ring = AudioRingBuffer(sample_rate * buffer_seconds)
+        self.last_error = None
+
+        self._stream = None
+        self._thread = None
+        self._running = False
+
+    @property
+    def is_running(self):
+        return self._running and self._thread is not None and self._thread.is_alive()
+
+    def start(self):
+        """打开输入流并启动采集线程"""
+        if self.is_running:
+            return
+        self._stream = self.audio.open(
+            format=pyaudio.paInt16,
+            channels=1,
+            rate=self.sample_rate,
+            input=True,
+            frames_per_buffer=self.frames_per_buffer
+        )
+        self.ring.reopen()
+        self._running = True
+        self._thread = threading.Thread(target=self._capture_loop, name="MicrophoneCapture", daemon=True)
+        self._thread.start()
+        print("麦克风采集线程已启动")
+
+    def _capture_loop(self):
+        """采集线程主循环"""
+        try:
+            while self._running:
+                data = self._stream.read(self.frames_per_buffer, exception_on_overflow=False)
+                self.ring.write(np.frombuffer(data, dtype=np.int16))
+        except Exception as e:
+            self.last_error = e
+            print(f"麦克风采集出错: {e}")
+        finally:
+            self._running = False
+            self.ring.close()
+
+    def stop(self):
+        """停止采集线程并关闭输入流"""
+        self._running = False
+        if self._thread is not None:
+            self._thread.join(timeout=1.0)
+            self._thread = None
+        if self._stream is not None:
+            try:
+                self._stream.stop_stream()
+                self._stream.close()
+            except Exception as e:
+                print(f"关闭麦克风输入流出错: {e}")
+            self._stream = None
+        self.ring.close()
+
+    def create_reader(self, from_position=None):
+        """创建读游标，默认从当前位置开始读取"""
+        return self.ring.create_reader(from_position)
+
+    def read_range(self, start, end):
+        """按绝对位置读取一段历史音频"""
+        return self.ring.read_range(start, end)
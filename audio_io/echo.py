@@ -0,0 +1,185 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+回声抑制与插话（barge-in）检测模块
+
+播放线程把写入扬声器的PCM作为参考信号送入EchoSuppressor，记录最近一段时间内每帧的能量。
+麦克风一侧用Geigel双讲检测的思路判断近端语音：麦克风帧能量必须明显高于
+"扬声器到麦克风的耦合系数 × 最近参考信号的最大能量"，才认为是用户在说话而不是回声。
+耦合系数在没有近端语音的播放期间自适应估计。
+
+BargeInDetector在播放期间持续读取麦克风环形缓冲区，检测到持续的近端语音时回调通知。
+"""
+
+import threading
+import time
+from collections import deque
+
+import numpy as np
+
+from .vad import VoiceActivityDetector
+
+
+class EchoSuppressor:
+    """基于输出参考信号能量的回声抑制（Geigel双讲检测）"""
+
+    def __init__(self, sample_rate=16000, frame_ms=20, window_ms=300, coupling=1.0,
+                 margin=2.0, adapt_rate=0.05, min_coupling=0.05, max_coupling=4.0):
+        """
+        Args:
+            sample_rate: 采样率
+            frame_ms: 计算参考能量的帧长（毫秒）
+            window_ms: 回声路径时长窗口（毫秒），覆盖输出缓冲和声学延迟
+            coupling: 扬声器到麦克风的初始能量耦合系数
+            margin: 近端语音需要超过回声估计的倍数
+            adapt_rate: 耦合系数的平滑系数
+            min_coupling: 耦合系数下限
+            max_coupling: 耦合系数上限
+        """
+        self.frame_size = int(sample_rate * frame_ms / 1000)
+        self.window = window_ms / 1000.0
+        self.coupling = coupling
+        self.margin = margin
+        self.adapt_rate = adapt_rate
+        self.min_coupling = min_coupling
+        self.max_coupling = max_coupling
+
+        self._reference = deque()  # (写入时间, 帧RMS)
+        self._lock = threading.Lock()
+
+    def push_reference(self, pcm_data):
+        """记录一段刚写入扬声器的PCM（播放线程调用）"""
+        samples = np.frombuffer(pcm_data, dtype=np.int16)
+        if not len(samples):
+            return
+        num_frames = len(samples) // self.frame_size
+        if num_frames == 0:
+            frames = samples.reshape(1, -1)  # 不足一帧时整段作为一帧
+        else:
+            frames = samples[:num_frames * self.frame_size].reshape(num_frames, self.frame_size)
+        rms, _ = VoiceActivityDetector.frame_features(frames)
+        now = time.monotonic()
+        with self._lock:
+            self._reference.append((now, float(rms.max())))
+            while self._reference and now - self._reference[0][0] > self.window:
+                self._reference.popleft()
+
+    def reference_level(self, now=None):
+        """回声路径窗口内参考信号的最大帧能量"""
+        now = time.monotonic() if now is None else now
+        with self._lock:
+            while self._reference and now - self._reference[0][0] > self.window:
+                self._reference.popleft()
+            if not self._reference:
+                return 0.0
+            return max(level for _, level in self._reference)
+
+    def echo_level(self, now=None):
+        """当前麦克风中回声的估计能量"""
+        return self.coupling * self.reference_level(now)
+
+    def near_end(self, rms, floor=0.0):
+        """判断麦克风各帧是否含有近端语音，并用非语音帧更新耦合系数
+
+        Args:
+            rms: 麦克风各帧的RMS能量数组
+            floor: 最低能量阈值（例如VAD的说话阈值）
+
+        Returns:
+            np.ndarray: 与rms等长的布尔数组
+        """
+        reference = self.reference_level()
+        threshold = max(floor, self.margin * self.coupling * reference)
+        mask = rms > threshold
+        if reference > 0:
+            echo_only = rms[~mask]
+            if len(echo_only):
+                ratio = float(echo_only.max()) / reference
+                self.coupling += self.adapt_rate * (ratio - self.coupling)
+                self.coupling = min(self.max_coupling, max(self.min_coupling, self.coupling))
+        return mask
+
+
+class BargeInDetector:
+    """播放期间的插话检测线程"""
+
+    def __init__(self, microphone, player, suppressor, on_barge_in, frame_ms=20,
+                 speaking_level=1000, min_speech_ms=200, preroll_ms=300):
+        """
+        Args:
+            microphone: MicrophoneCapture实例
+            player: AudioPlayer实例
+            suppressor: EchoSuppressor实例（应同时设置为player的回声参考）
+            on_barge_in: 检测到插话时的回调，参数为语音起点的绝对采样位置
+            frame_ms: 检测帧长（毫秒）
+            speaking_level: 近端语音的最低RMS阈值
+            min_speech_ms: 持续多久的近端语音才判定为插话
+            preroll_ms: 回调位置向前预留的时长
+        """
+        self.microphone = microphone
+        self.player = player
+        self.suppressor = suppressor
+        self.on_barge_in = on_barge_in
+        self.frame_size = int(microphone.sample_rate * frame_ms / 1000)
+        self.speaking_level = speaking_level
+        self.min_speech_frames = max(1, int(min_speech_ms / frame_ms))
+        self.preroll = int(microphone.sample_rate * preroll_ms / 1000)
+        self.armed = False  # 只有武装状态下才触发回调
+
+        self._running = False
+        self._thread = None
+
+    def start(self):
+        if self._thread is not None and self._thread.is_alive():
+            return
+        self._running = True
+        self._thread = threading.Thread(target=self._detect_loop, name="BargeInDetector", daemon=True)
+        self._thread.start()
+
+    def _detect_loop(self):
+        reader = self.microphone.create_reader()
+        while self._running:
+            # 空闲时不做检测，只跟上最新位置
+            if not self.player.wait_playing(timeout=0.5):
+                continue
+            reader.skip_to_latest()
+            pending = np.zeros(0, dtype=np.int16)
+            run = 0
+            while self._running and self.player.is_playing:
+                data = reader.read_block(self.frame_size, max_samples=self.microphone.sample_rate, timeout=0.2)
+                if data is None:
+                    if not self.microphone.is_running:
+                        time.sleep(0.5)
+                    continue
+                samples = np.concatenate((pending, data))
+                num_frames = len(samples) // self.frame_size
+                pending = samples[num_frames * self.frame_size:]
+                if num_frames == 0:
+                    continue
+                frames = samples[:num_frames * self.frame_size].reshape(num_frames, self.frame_size)
+                rms, _ = VoiceActivityDetector.frame_features(frames)
+                frames_start = reader.position - len(pending) - num_frames * self.frame_size
+                start = None
+                for i, speech in enumerate(self.suppressor.near_end(rms, self.speaking_level)):
+                    run = run + 1 if speech else 0
+                    if run >= self.min_speech_frames:
+                        start = frames_start + (i - run + 1) * self.frame_size - self.preroll
+                        break
+                if start is None or not self.armed:
+                    continue
+                print("检测到用户插话，停止播放")
+                try:
+                    self.on_barge_in(max(self.microphone.ring.oldest_position, start))
+                except Exception as e:
+                    print(f"插话处理出错: {e}")
+                run = 0
+                # 等回调取消的播放真正停下，再开始下一轮检测
+                self.player.wait_idle(timeout=1.0)
+                break
+
+    def stop(self):
+        self._running = False
+        if self._thread is not None:
+            self._thread.join(timeout=1.0)
+            self._thread = None
@@ -0,0 +1,238 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+本地关键词检测模块
+
+用NumPy计算MFCC特征，把语音段与事先录入的唤醒词模板做子序列DTW匹配。
+模板可以出现在语音段的任意位置（前面允许有预录的静音，后面允许紧跟指令），
+匹配代价按模板长度归一化，低于阈值才认为可能是唤醒词，再交给云端识别确认。
+模板以.npy文件保存在模板目录中，每个唤醒词可以录入多条。
+"""
+
+import os
+import re
+import threading
+
+import numpy as np
+
+
+def _hz_to_mel(hz):
+    return 2595.0 * np.log10(1.0 + hz / 700.0)
+
+
+def _mel_to_hz(mel):
+    return 700.0 * (10.0 ** (mel / 2595.0) - 1.0)
+
+
+class MfccExtractor:
+    """MFCC特征提取（预加重、加窗、梅尔滤波器组、对数、DCT、倒谱均值归一化）"""
+
+    def __init__(self, sample_rate=16000, frame_ms=25, hop_ms=10, num_filters=26, num_ceps=13,
+                 preemphasis=0.97):
+        self.sample_rate = sample_rate
+        self.frame_size = int(sample_rate * frame_ms / 1000)
+        self.hop_size = int(sample_rate * hop_ms / 1000)
+        self.preemphasis = preemphasis
+        self.fft_size = 1 << (self.frame_size - 1).bit_length()
+        self.window = np.hamming(self.frame_size).astype(np.float32)
+        self.filters = self._mel_filterbank(num_filters)
+        # DCT-II矩阵，去掉0阶（能量项由均值归一化处理）
+        n = np.arange(num_filters)
+        k = np.arange(1, num_ceps)[:, None]
+        self.dct = np.cos(np.pi * k * (2 * n + 1) / (2 * num_filters)).astype(np.float32)
+
+    def _mel_filterbank(self, num_filters):
+        bins = self.fft_size // 2 + 1
+        mels = np.linspace(_hz_to_mel(20.0), _hz_to_mel(self.sample_rate / 2), num_filters + 2)
+        points = np.floor((self.fft_size + 1) * _mel_to_hz(mels) / self.sample_rate).astype(int)
+        filters = np.zeros((num_filters, bins), dtype=np.float32)
+        for i in range(num_filters):
+            left, center, right = points[i], points[i + 1], points[i + 2]
+            if center > left:
+                filters[i, left:center] = (np.arange(left, center) - left) / (center - left)
+            if right > center:
+                filters[i, center:right] = (right - np.arange(center, right)) / (right - center)
+        return filters
+
+    def __call__(self, samples):
+        """计算一段int16采样的MFCC
+
+        Returns:
+            np.ndarray: 形状为(帧数, num_ceps - 1)的特征，采样不足一帧时帧数为0
+        """
+        x = np.asarray(samples, dtype=np.float32) / 32768.0
+        if len(x) < self.frame_size:
+            return np.zeros((0, self.dct.shape[0]), dtype=np.float32)
+        x = np.append(x[0], x[1:] - self.preemphasis * x[:-1])
+        num_frames = 1 + (len(x) - self.frame_size) // self.hop_size
+        # 用步长视图一次取出所有帧
+        frames = np.lib.stride_tricks.as_strided(
+            x, shape=(num_frames, self.frame_size),
+            strides=(x.strides[0] * self.hop_size, x.strides[0])
+        ) * self.window
+        power = np.abs(np.fft.rfft(frames, self.fft_size)) ** 2 / self.fft_size
+        energies = np.log(power @ self.filters.T + 1e-10)
+        ceps = energies @ self.dct.T
+        return ceps - ceps.mean(axis=0)
+
+
+def subsequence_dtw(template, features):
+    """模板在特征序列中任意位置匹配的最小平均代价
+
+    局部代价为余弦距离；每一步模板前进一帧，特征序列前进0~2帧，
+    这样每一行只依赖上一行，可以整行向量化计算。
+
+    Args:
+        template: 形状为(M, D)的模板特征
+        features: 形状为(N, D)的待检测特征
+
+    Returns:
+        float: 按模板长度归一化的最小累计代价，越小越相似
+    """
+    if len(template) == 0 or len(features) == 0:
+        return float('inf')
+    a = template / (np.linalg.norm(template, axis=1, keepdims=True) + 1e-8)
+    b = features / (np.linalg.norm(features, axis=1, keepdims=True) + 1e-8)
+    cost = 1.0 - a @ b.T  # (M, N)
+
+    acc = cost[0].copy()  # 起点可以在特征序列的任意位置
+    for i in range(1, len(template)):
+        prev = acc
+        best = prev.copy()  # 特征序列不前进
+        best[1:] = np.minimum(best[1:], prev[:-1])  # 前进1帧
+        best[2:] = np.minimum(best[2:], prev[:-2])  # 前进2帧
+        acc = cost[i] + best
+    return float(acc.min()) / len(template)
+
+
+class KeywordSpotter:
+    """基于MFCC + DTW模板匹配的本地唤醒词检测器"""
+
+    def __init__(self, sample_rate=16000, threshold=0.3, template_dir=None, search_seconds=3.0):
+        """
+        Args:
+            sample_rate: 采样率
+            threshold: 匹配代价阈值，低于此值视为命中
+            template_dir: 模板保存目录，None表示只保存在内存中
+            search_seconds: 只在语音段开头这么长的范围内搜索唤醒词
+        """
+        self.sample_rate = sample_rate
+        self.threshold = threshold
+        self.template_dir = template_dir
+        self.search_samples = int(sample_rate * search_seconds)
+        self.extractor = MfccExtractor(sample_rate)
+
+        self._templates = {}  # 唤醒词 -> [模板特征]
+        self._lock = threading.Lock()
+        self.load()
+
+    @property
+    def ready(self):
+        """是否已有可用的模板"""
+        return bool(self._templates)
+
+    @property
+    def max_template_samples(self):
+        """最长模板对应的采样数，用于决定至少收集多少音频再检测"""
+        with self._lock:
+            frames = max((len(t) for ts in self._templates.values() for t in ts), default=0)
+        return frames * self.extractor.hop_size + self.extractor.frame_size
+
+    def _file_prefix(self, word):
+        # 文件名中只保留安全字符，中文保留
+        return re.sub(r'[^\w]', '_', word)
+
+    def load(self):
+        """从模板目录加载所有模板"""
+        if not self.template_dir or not os.path.isdir(self.template_dir):
+            return
+        templates = {}
+        for name in sorted(os.listdir(self.template_dir)):
+            match = re.match(r'(.+)_(\d+)\.npy$', name)
+            if not match:
+                continue
+            try:
+                templates.setdefault(match.group(1), []).append(
+                    np.load(os.path.join(self.template_dir, name)))
+            except Exception as e:
+                print(f"加载唤醒词模板失败 {name}: {e}")
+        with self._lock:
+            self._templates = templates
+        if templates:
+            print(f"已加载唤醒词模板: {', '.join(f'{w}({len(t)})' for w, t in templates.items())}")
+
+    def enroll(self, word, samples):
+        """录入一条唤醒词模板
+
+        Args:
+            word: 唤醒词
+            samples: 只包含唤醒词的int16采样（可以带少量前后静音）
+        """
+        features = self.extractor(self._trim_silence(samples))
+        if len(features) < 10:
+            raise ValueError("录音太短，无法作为唤醒词模板")
+        with self._lock:
+            templates = self._templates.setdefault(self._file_prefix(word), [])
+            templates.append(features)
+            index = len(templates)
+        if self.template_dir:
+            os.makedirs(self.template_dir, exist_ok=True)
+            np.save(os.path.join(self.template_dir, f"{self._file_prefix(word)}_{index}.npy"), features)
+        print(f"已录入唤醒词模板: {word} #{index}")
+
+    def clear(self, word=None):
+        """删除某个唤醒词（默认全部）的模板"""
+        prefix = None if word is None else self._file_prefix(word)
+        with self._lock:
+            if prefix is None:
+                self._templates.clear()
+            else:
+                self._templates.pop(prefix, None)
+        if self.template_dir and os.path.isdir(self.template_dir):
+            for name in os.listdir(self.template_dir):
+                match = re.match(r'(.+)_(\d+)\.npy$', name)
+                if match and (prefix is None or match.group(1) == prefix):
+                    os.remove(os.path.join(self.template_dir, name))
+
+    def _trim_silence(self, samples, ratio=0.1):
+        """去掉首尾能量低于峰值一定比例的部分"""
+        samples = np.asarray(samples, dtype=np.int16)
+        frame = self.extractor.hop_size
+        num_frames = len(samples) // frame
+        if num_frames == 0:
+            return samples
+        frames = samples[:num_frames * frame].reshape(num_frames, frame).astype(np.float32)
+        rms = np.sqrt(np.mean(frames * frames, axis=1))
+        active = np.flatnonzero(rms > rms.max() * ratio)
+        return samples[active[0] * frame:(active[-1] + 1) * frame]
+
+    def score(self, samples):
+        """计算语音段与各唤醒词模板的最佳匹配
+
+        Returns:
+            (word, cost): 代价最小的唤醒词及其代价，没有模板时返回(None, inf)
+        """
+        features = self.extractor(np.asarray(samples)[:self.search_samples])
+        with self._lock:
+            templates = {word: list(ts) for word, ts in self._templates.items()}
+        best_word, best_cost = None, float('inf')
+        for word, word_templates in templates.items():
+            for template in word_templates:
+                cost = subsequence_dtw(template, features)
+                if cost < best_cost:
+                    best_word, best_cost = word, cost
+        return best_word, best_cost
+
+    def detect(self, samples):
+        """检测语音段中是否可能包含唤醒词
+
+        Returns:
+            str: 命中的唤醒词（模板文件名前缀），未命中返回None
+        """
+        word, cost = self.score(samples)
+        if word is not None and cost <= self.threshold:
+            print(f"本地唤醒词检测命中: {word} (代价 {cost:.3f})")
+            return word
+        print(f"本地唤醒词检测未命中 (最佳代价 {cost:.3f})")
+        return None
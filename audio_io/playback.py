@@ -0,0 +1,265 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+流式音频播放模块
+
+播放线程持有一个长期打开的PyAudio输出流，依次播放排队的PlaybackStream。
+语音合成每收到一个PCM数据包就写入PlaybackStream的有界抖动缓冲区，
+缓冲达到预缓冲时长后立即开始播放，不必等待整段合成完成。
+"""
+
+import queue
+import threading
+import time
+from collections import deque
+
+import pyaudio
+
+
+class PlaybackStream:
+    """一段待播放的PCM音频（16位单声道）
+
+    生产者调用write写入数据、finish表示写入结束；播放线程从中取数据播放。
+    """
+
+    def __init__(self, sample_rate, prebuffer_ms=100, max_buffer_ms=30000):
+        """
+        Args:
+            sample_rate: 采样率
+            prebuffer_ms: 开始播放前至少缓冲的时长（毫秒），None表示等全部写入后再播放
+            max_buffer_ms: 抖动缓冲区上限（毫秒），写满后write会阻塞
+        """
+        bytes_per_ms = sample_rate * 2 // 1000
+        self.prebuffer_bytes = None if prebuffer_ms is None else prebuffer_ms * bytes_per_ms
+        self.max_buffer_bytes = max_buffer_ms * bytes_per_ms
+        self.written_bytes = 0
+        self.played_bytes = 0
+        self.created_at = time.monotonic()
+        self.first_audio_at = None  # 第一个数据包开始播放的时间
+
+        self._chunks = deque()
+        self._buffered = 0
+        self._cond = threading.Condition()
+        self._finished = False
+        self._cancelled = False
+        self._done = threading.Event()
+
+    @property
+    def cancelled(self):
+        return self._cancelled
+
+    @property
+    def done(self):
+        return self._done.is_set()
+
+    def write(self, data):
+        """写入PCM数据，缓冲区满时阻塞直到有空间
+
+        Returns:
+            bool: 已取消时返回False
+        """
+        if not data:
+            return not self._cancelled
+        with self._cond:
+            while self._buffered >= self.max_buffer_bytes and not self._cancelled:
+                self._cond.wait()
+            if self._cancelled:
+                return False
+            self._chunks.append(bytes(data))
+            self._buffered += len(data)
+            self.written_bytes += len(data)
+            self._cond.notify_all()
+        return True
+
+    def finish(self):
+        """标记数据已全部写入"""
+        with self._cond:
+            self._finished = True
+            self._cond.notify_all()
+
+    def cancel(self):
+        """取消播放，丢弃未播放的数据"""
+        with self._cond:
+            self._cancelled = True
+            self._chunks.clear()
+            self._buffered = 0
+            self._cond.notify_all()
+
+    def wait(self, timeout=None):
+        """等待播放结束
+
+        Returns:
+            bool: 播放结束（或被取消）返回True，超时返回False
+        """
+        return self._done.wait(timeout)
+
+    def _wait_ready(self):
+        """播放线程调用：等待预缓冲就绪"""
+        with self._cond:
+            while not (self._cancelled or self._finished or
+                       (self.prebuffer_bytes is not None and self._buffered >= self.prebuffer_bytes)):
+                self._cond.wait()
+
+    def _next_chunk(self, max_bytes):
+        """播放线程调用：取出下一块数据，播放结束或被取消时返回None"""
+        with self._cond:
+            while not self._chunks and not self._finished and not self._cancelled:
+                self._cond.wait()
+            if self._cancelled or not self._chunks:
+                return None
+            chunk = self._chunks.popleft()
+            if len(chunk) > max_bytes:
+                self._chunks.appendleft(chunk[max_bytes:])
+                chunk = chunk[:max_bytes]
+            self._buffered -= len(chunk)
+            self._cond.notify_all()
+            return chunk
+
+    def _mark_done(self):
+        self._done.set()
+
+
+class AudioPlayer:
+    """常驻输出流的音频播放器"""
+
+    def __init__(self, audio, sample_rate=16000, frames_per_buffer=1024,
+                 prebuffer_ms=100, max_buffer_ms=30000, echo_reference=None):
+        """初始化播放器
+
+        Args:
+            audio: pyaudio.PyAudio实例
+            sample_rate: 采样率
+            frames_per_buffer: 每次写入输出流的采样数
+            prebuffer_ms: 默认预缓冲时长（毫秒）
+            max_buffer_ms: 默认抖动缓冲区上限（毫秒）
+            echo_reference: 回声参考接收者（如EchoSuppressor），每块写入扬声器的PCM都会通过
+                            push_reference送给它
+        """
+        self.audio = audio
+        self.sample_rate = sample_rate
+        self.frames_per_buffer = frames_per_buffer
+        self.prebuffer_ms = prebuffer_ms
+        self.max_buffer_ms = max_buffer_ms
+        self.echo_reference = echo_reference
+        self.current = None  # 正在播放的PlaybackStream
+
+        self._playing = threading.Event()
+        self._idle = threading.Event()
+        self._idle.set()
+        self._queue = queue.Queue()
+        self._output = None
+        self._thread = None
+        self._lock = threading.Lock()
+
+    def start(self):
+        """打开输出流并启动播放线程"""
+        with self._lock:
+            if self._thread is not None and self._thread.is_alive():
+                return
+            self._output = self.audio.open(
+                format=pyaudio.paInt16,
+                channels=1,
+                rate=self.sample_rate,
+                output=True,
+                frames_per_buffer=self.frames_per_buffer
+            )
+            self._thread = threading.Thread(target=self._playback_loop, name="AudioPlayer", daemon=True)
+            self._thread.start()
+
+    def begin_stream(self, prebuffer_ms=None, wait_all=False):
+        """创建一段流式播放并排入播放队列
+
+        Args:
+            prebuffer_ms: 预缓冲时长（毫秒），默认使用播放器设置
+            wait_all: 为True时等数据全部写入后再开始播放
+        """
+        self.start()
+        if wait_all:
+            prebuffer_ms = None
+        elif prebuffer_ms is None:
+            prebuffer_ms = self.prebuffer_ms
+        stream = PlaybackStream(self.sample_rate, prebuffer_ms, self.max_buffer_ms)
+        self._queue.put(stream)
+        return stream
+
+    @property
+    def is_playing(self):
+        return self._playing.is_set()
+
+    def wait_playing(self, timeout=None):
+        """等待开始播放，超时返回False"""
+        return self._playing.wait(timeout)
+
+    def wait_idle(self, timeout=None):
+        """等待当前播放结束，超时返回False"""
+        return self._idle.wait(timeout)
+
+    def play(self, pcm_data, wait=True):
+        """播放一段完整的PCM数据"""
+        stream = self.begin_stream()
+        stream.write(pcm_data)
+        stream.finish()
+        if wait:
+            stream.wait()
+        return stream
+
+    def _playback_loop(self):
+        """播放线程主循环"""
+        max_bytes = self.frames_per_buffer * 2
+        while True:
+            stream = self._queue.get()
+            if stream is None:
+                break
+            self.current = stream
+            try:
+                stream._wait_ready()
+                while True:
+                    chunk = stream._next_chunk(max_bytes)
+                    if chunk is None:
+                        break
+                    if stream.first_audio_at is None:
+                        stream.first_audio_at = time.monotonic()
+                        self._idle.clear()
+                        self._playing.set()
+                    self._output.write(chunk)
+                    stream.played_bytes += len(chunk)
+                    if self.echo_reference is not None:
+                        self.echo_reference.push_reference(chunk)
+            except Exception as e:
+                print(f"音频播放出错: {e}")
+                stream.cancel()
+            finally:
+                self.current = None
+                self._playing.clear()
+                self._idle.set()
+                stream._mark_done()
+
+    def cancel_all(self):
+        """取消正在播放和排队中的所有音频"""
+        while True:
+            try:
+                stream = self._queue.get_nowait()
+            except queue.Empty:
+                break
+            if stream is not None:
+                stream.cancel()
+                stream._mark_done()
+        current = self.current
+        if current is not None:
+            current.cancel()
+
+    def close(self):
+        """停止播放线程并关闭输出流"""
+        self.cancel_all()
+        if self._thread is not None:
+            self._queue.put(None)
+            self._thread.join(timeout=2.0)
+            self._thread = None
+        if self._output is not None:
+            try:
+                self._output.stop_stream()
+                self._output.close()
+            except Exception as e:
+                print(f"关闭音频输出流出错: {e}")
+            self._output = None
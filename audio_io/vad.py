@@ -0,0 +1,170 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+语音活动检测（VAD）模块
+
+按10~30ms分帧，用NumPy批量计算每帧的RMS能量和过零率，
+结合自适应噪声底、拖尾（hangover）和预录（pre-roll）判断语音起止。
+阈值按帧RMS计算，同一段音频的RMS约为平均绝对值的1.25倍，
+默认阈值1000/380对应原来按平均绝对值计算时的800/300。
+事件位置使用与环形缓冲区相同的绝对采样位置，调用方可以直接按位置取回整段语音。
+"""
+
+from collections import namedtuple
+
+import numpy as np
+
+# 语音事件: kind为'start'或'end'，position为绝对采样位置
+VadEvent = namedtuple('VadEvent', ['kind', 'position'])
+
+
+class VoiceActivityDetector:
+    """基于帧能量、过零率和自适应噪声底的语音活动检测器"""
+
+    def __init__(self, sample_rate=16000, frame_ms=20, speaking_level=1000, silence_level=380,
+                 noise_ratio=3.0, zcr_threshold=0.25, hangover_ms=1000, preroll_ms=300,
+                 min_speech_ms=60, max_speech_ms=None, noise_adapt_rate=0.05):
+        """初始化检测器
+
+        Args:
+            sample_rate: 采样率
+            frame_ms: 帧长（毫秒），取值10~30
+            speaking_level: 语音开始的最低RMS阈值
+            silence_level: 语音持续的最低RMS阈值，低于此值视为静默
+            noise_ratio: 语音开始阈值相对噪声底的倍数
+            zcr_threshold: 清音（高过零率）帧的过零率阈值，用于语音中的擦音延续
+            hangover_ms: 连续静默多久判定语音结束
+            preroll_ms: 语音开始位置向前预留的时长，避免截掉起始音节
+            min_speech_ms: 连续多久的有声帧才判定为语音开始，用于过滤短促噪声
+            max_speech_ms: 单段语音的最长时长，超过后强制结束，None表示不限制
+            noise_adapt_rate: 噪声底上升时的平滑系数
+        """
+        if not 10 <= frame_ms <= 30:
+            raise ValueError(f"帧长必须在10~30ms之间: {frame_ms}")
+        self.sample_rate = sample_rate
+        self.frame_size = int(sample_rate * frame_ms / 1000)
+        self.speaking_level = speaking_level
+        self.silence_level = silence_level
+        self.noise_ratio = noise_ratio
+        self.zcr_threshold = zcr_threshold
+        self.hangover_frames = max(1, int(hangover_ms / frame_ms))
+        self.preroll = int(sample_rate * preroll_ms / 1000)
+        self.min_speech_frames = max(1, int(min_speech_ms / frame_ms))
+        self.max_speech = None if max_speech_ms is None else int(sample_rate * max_speech_ms / 1000)
+        self.noise_adapt_rate = noise_adapt_rate
+        self.reset()
+
+    def reset(self, position=0):
+        """重置状态
+
+        Args:
+            position: 下一个输入采样对应的绝对位置
+        """
+        self.position = int(position)  # 已处理到的绝对位置（不含未满一帧的剩余采样）
+        self.is_speaking = False
+        self.speech_start = None  # 当前语音段起点（已包含预录）
+        self.speech_end = None  # 最近一段语音的终点
+        self.noise_floor = None
+        self._pending = np.zeros(0, dtype=np.int16)
+        self._active_run = 0
+        self._silence_run = 0
+        self._min_position = self.position
+
+    @staticmethod
+    def frame_features(frames):
+        """批量计算每帧的RMS和过零率
+
+        Args:
+            frames: 形状为(帧数, 帧长)的int16数组
+
+        Returns:
+            (rms, zcr): 两个长度为帧数的float数组
+        """
+        frames = frames.astype(np.float32)
+        rms = np.sqrt(np.mean(frames * frames, axis=1))
+        signs = np.signbit(frames)
+        zcr = np.count_nonzero(signs[:, 1:] != signs[:, :-1], axis=1) / (frames.shape[1] - 1)
+        return rms, zcr
+
+    @property
+    def start_threshold(self):
+        """语音开始阈值"""
+        if self.noise_floor is None:
+            return self.speaking_level
+        return max(self.speaking_level, self.noise_floor * self.noise_ratio)
+
+    @property
+    def stop_threshold(self):
+        """语音持续阈值"""
+        if self.noise_floor is None:
+            return self.silence_level
+        return max(self.silence_level, self.noise_floor * self.noise_ratio * 0.5)
+
+    def _update_noise_floor(self, rms):
+        """非语音帧更新噪声底：下降快、上升慢"""
+        if self.noise_floor is None:
+            self.noise_floor = rms
+        elif rms < self.noise_floor:
+            self.noise_floor += 0.5 * (rms - self.noise_floor)
+        else:
+            self.noise_floor += self.noise_adapt_rate * (rms - self.noise_floor)
+
+    def process(self, samples):
+        """处理一段新采样
+
+        Args:
+            samples: int16采样，紧接在上一次输入之后
+
+        Returns:
+            list[VadEvent]: 本段中产生的语音开始/结束事件
+        """
+        samples = np.asarray(samples, dtype=np.int16)
+        if len(self._pending):
+            samples = np.concatenate((self._pending, samples))
+        num_frames = len(samples) // self.frame_size
+        self._pending = samples[num_frames * self.frame_size:]
+        if num_frames == 0:
+            return []
+
+        frames = samples[:num_frames * self.frame_size].reshape(num_frames, self.frame_size)
+        rms, zcr = self.frame_features(frames)
+
+        events = []
+        for i in range(num_frames):
+            frame_start = self.position
+            self.position += self.frame_size
+            start_threshold = self.start_threshold
+            voiced = rms[i] > start_threshold
+
+            if not self.is_speaking:
+                if voiced:
+                    self._active_run += 1
+                    if self._active_run >= self.min_speech_frames:
+                        first = frame_start - (self._active_run - 1) * self.frame_size
+                        self.speech_start = max(self._min_position, first - self.preroll)
+                        self.is_speaking = True
+                        self._silence_run = 0
+                        events.append(VadEvent('start', self.speech_start))
+                else:
+                    self._active_run = 0
+                    self._update_noise_floor(rms[i])
+                continue
+
+            # 语音进行中：有声帧或者高过零率的清音帧都视为语音延续
+            stop_threshold = self.stop_threshold
+            unvoiced = rms[i] > stop_threshold * 0.5 and zcr[i] > self.zcr_threshold
+            if voiced or rms[i] > stop_threshold or unvoiced:
+                self._silence_run = 0
+            else:
+                self._silence_run += 1
+
+            too_long = self.max_speech is not None and self.position - self.speech_start >= self.max_speech
+            if self._silence_run >= self.hangover_frames or too_long:
+                self.is_speaking = False
+                self._active_run = 0
+                self.speech_end = self.position
+                # 下一段的预录不能回溯到本段之内
+                self._min_position = self.position
+                events.append(VadEvent('end', self.position))
+        return events
@@ -0,0 +1,17 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+大语言模型服务模块
+提供带重试和备用模型的请求客户端、LLM回复缓存、带token预算的多轮对话记忆
+和基于中间识别结果的预先请求
+"""
+
+from .client import LlmClient, CancelToken, RequestCancelled
+from .response_cache import ResponseCache, normalize_transcript
+from .conversation import ConversationMemory, estimate_tokens
+from .speculative import SpeculativeStream, Speculator
+
+# 导出模块的主要类和函数
+__all__ = ['LlmClient', 'CancelToken', 'RequestCancelled', 'ResponseCache', 'normalize_transcript',
+           'ConversationMemory', 'estimate_tokens', 'SpeculativeStream', 'Speculator']
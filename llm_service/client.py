@@ -0,0 +1,351 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+LLM请求客户端
+
+在OpenAI兼容接口外包一层请求策略：
+- 连接池：httpx默认空闲5秒就关闭连接，语音交互间隔通常更长，每轮都要重新握手，
+  这里把保活时间延长，并在启动和唤醒时预热连接，TLS握手与录音同时进行；
+- 截止时间：每次调用都有总的截止时间，请求在线程池中执行，卡住的请求不会让调用方一直等待，
+  流式请求的截止时间针对首个token，之后每段数据的间隔不超过stall_timeout；
+- 重试：连接错误、超时、429和5xx按带随机抖动的指数退避重试，不会超过截止时间；
+- 备用模型：主模型超过延迟SLO还没有返回（流式为首个token）时，同时向更便宜的备用模型发出
+  对冲请求，先返回的被采用，另一个被丢弃；主模型直接失败时立即改用备用模型；
+- 取消：流式请求可以传入CancelToken，取消时关闭连接，等待首个token的读取立即中止，
+  不会一直占用线程池和连接池（例如被放弃的预先请求）。
+"""
+
+import functools
+import random
+import socket
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+
+import httpx
+import openai
+from openai import OpenAI, DefaultHttpxClient
+
+DASHSCOPE_BASE_URL = "https://dashscope.aliyuncs.com/compatible-mode/v1"
+
+
+def _retryable(error):
+    """连接错误、超时、限流和服务端错误可以重试，参数和鉴权错误不重试"""
+    if isinstance(error, openai.APIStatusError):
+        return error.status_code == 429 or error.status_code >= 500
+    return isinstance(error, openai.APIConnectionError)
+
+
+def _has_content(chunk):
+    if not chunk.choices:
+        return False
+    delta = chunk.choices[0].delta
+    return bool(delta.content or getattr(delta, 'reasoning_content', None))
+
+
+class RequestCancelled(Exception):
+    """请求已通过CancelToken取消"""
+
+
+class CancelToken:
+    """请求的取消标记，取消时调用登记的回调（例如关闭流式连接）"""
+
+    def __init__(self):
+        self._cancelled = False
+        self._callbacks = []
+        self._lock = threading.Lock()
+
+    @property
+    def cancelled(self):
+        return self._cancelled
+
+    def on_cancel(self, callback):
+        """登记取消时的回调，已经取消时立即调用"""
+        with self._lock:
+            if not self._cancelled:
+                self._callbacks.append(callback)
+                return
+        callback()
+
+    def cancel(self):
+        with self._lock:
+            if self._cancelled:
+                return
+            self._cancelled = True
+            callbacks, self._callbacks = self._callbacks, []
+        for callback in callbacks:
+            callback()
+
+
+def _close_stream(opened):
+    stream = opened[0]
+    try:
+        stream.close()
+    except Exception:
+        pass
+
+
+def _abort_stream(opened):
+    """从其它线程中止流式连接：先shutdown套接字唤醒阻塞中的读取，再关闭响应
+
+    只调用close时，另一个线程里等待数据的recv不会返回，线程一直被占用到服务端发出数据或超时。
+    """
+    network_stream = opened[0].response.extensions.get("network_stream")
+    sock = network_stream.get_extra_info("socket") if network_stream is not None else None
+    if sock is not None:
+        try:
+            sock.shutdown(socket.SHUT_RDWR)
+        except OSError:
+            pass
+    _close_stream(opened)
+
+
+class LlmClient:
+    """带连接池、截止时间、重试和备用模型的LLM客户端"""
+
+    def __init__(self, api_key, base_url=DASHSCOPE_BASE_URL, fallback_model=None, slo=3.0,
+                 deadline=20.0, connect_timeout=5.0, stall_timeout=15.0, max_retries=2,
+                 backoff=0.25, max_backoff=2.0, pool_size=4, keepalive_expiry=120.0):
+        """
+        Args:
+            api_key: API密钥
+            base_url: OpenAI兼容接口地址
+            fallback_model: 备用模型，None表示不使用
+            slo: 主模型的延迟目标（秒），超过时向备用模型发出对冲请求；None表示只在主模型失败时改用
+            deadline: 默认截止时间（秒）；流式请求为等待首个token的时间
+            connect_timeout: 建立连接的超时（秒）
+            stall_timeout: 两段数据之间最长的等待时间（秒）
+            max_retries: 每个模型最多重试的次数
+            backoff: 首次重试的退避上限（秒），之后每次加倍，实际等待时间在0到上限之间随机
+            max_backoff: 退避上限的最大值（秒）
+            pool_size: 连接池大小，也是同时进行的请求数上限
+            keepalive_expiry: 空闲连接保留的时间（秒）
+        """
+        self.fallback_model = fallback_model or None
+        self.slo = slo
+        self.deadline = deadline
+        self.connect_timeout = connect_timeout
+        self.stall_timeout = stall_timeout
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+
+        self.http_client = DefaultHttpxClient(
+            limits=httpx.Limits(max_connections=pool_size, max_keepalive_connections=pool_size,
+                                keepalive_expiry=keepalive_expiry),
+            timeout=httpx.Timeout(stall_timeout, connect=connect_timeout)
+        )
+        # 重试由本类处理，SDK自带的重试关闭
+        self.client = OpenAI(api_key=api_key, base_url=base_url, http_client=self.http_client,
+                             max_retries=0)
+        self._pool = ThreadPoolExecutor(max_workers=pool_size, thread_name_prefix="LlmClient")
+
+        self.retries = 0
+        self.hedges = 0
+        self.fallbacks = 0
+        self._last_used = 0.0
+        self._lock = threading.Lock()
+
+    def warm_up(self, min_idle=0.0):
+        """在后台发一个轻量请求，提前建立连接并放入连接池
+
+        Args:
+            min_idle: 距上次请求不到这么久（秒）时连接还在池中，不再预热
+        """
+        with self._lock:
+            if time.monotonic() - self._last_used < min_idle:
+                return
+            self._last_used = time.monotonic()
+        self._pool.submit(self._warm_up)
+
+    def _warm_up(self):
+        start = time.perf_counter()
+        try:
+            self.client.with_options(timeout=self.connect_timeout + self.stall_timeout).models.list()
+        except openai.APIStatusError:
+            # 收到了HTTP响应，连接已经建立
+            pass
+        except Exception as e:
+            print(f"LLM连接预热失败: {e}")
+            return
+        print(f"LLM连接预热完成（{(time.perf_counter() - start) * 1000:.0f}ms）")
+
+    def create(self, model, messages, deadline=None, fallback=True, **params):
+        """非流式请求，返回ChatCompletion
+
+        Args:
+            deadline: 截止时间（秒），None时使用默认值
+            fallback: 是否允许使用备用模型（例如视觉请求不能换成纯文本模型）
+            params: 其它请求参数，例如temperature、max_tokens、response_format
+
+        Raises:
+            TimeoutError: 超过截止时间
+            openai.OpenAIError: 请求失败且无法重试
+        """
+        deadline_at = time.monotonic() + (deadline or self.deadline)
+        attempt = functools.partial(self._create_once, messages=messages, params=params)
+        _, completion = self._hedged(attempt, model, fallback, deadline_at)
+        return completion
+
+    def stream(self, model, messages, deadline=None, fallback=True, cancel=None, **params):
+        """流式请求，逐个产出chunk
+
+        重试和备用模型只在收到首个token之前生效，之后的错误直接抛出。其它参数同create。
+
+        Args:
+            cancel: CancelToken，取消时关闭连接；收到首个token之前取消会抛出RequestCancelled，
+                    之后取消则正常结束迭代
+        """
+        deadline_at = time.monotonic() + (deadline or self.deadline)
+        attempt = functools.partial(self._open_stream, messages=messages, params=params, cancel=cancel)
+        _, (stream, iterator, head) = self._hedged(attempt, model, fallback, deadline_at,
+                                                   close=_close_stream, cancel=cancel)
+        try:
+            yield from head
+            try:
+                yield from iterator
+            except Exception:
+                # 取消时连接被关闭，读取中断不算错误
+                if cancel is None or not cancel.cancelled:
+                    raise
+        finally:
+            _close_stream((stream,))
+
+    def close(self):
+        self._pool.shutdown(wait=False)
+        self.http_client.close()
+
+    def _timeout(self, deadline_at, stream=False):
+        """单次请求的超时，流式请求的读超时只限制数据间隔，不受截止时间限制"""
+        remaining = max(deadline_at - time.monotonic(), 0.001)
+        read = self.stall_timeout if stream else min(self.stall_timeout, remaining)
+        return httpx.Timeout(read, connect=min(self.connect_timeout, remaining))
+
+    def _create_once(self, model, deadline_at, messages, params):
+        return self.client.with_options(timeout=self._timeout(deadline_at)).chat.completions.create(
+            model=model, messages=messages, **params)
+
+    def _open_stream(self, model, deadline_at, messages, params, cancel=None):
+        """打开流式请求并读到首个带内容的chunk
+
+        Returns:
+            (stream, iterator, head): head为已读出的chunk，iterator继续产出其余chunk
+
+        Raises:
+            RequestCancelled: 收到首个token之前被取消
+        """
+        if cancel is not None and cancel.cancelled:
+            raise RequestCancelled("请求已取消")
+        stream = self.client.with_options(timeout=self._timeout(deadline_at, stream=True)).chat.completions.create(
+            model=model, messages=messages, stream=True, **params)
+        if cancel is not None:
+            # 取消时从其它线程关闭连接，阻塞中的读取随之中止
+            cancel.on_cancel(functools.partial(_abort_stream, (stream,)))
+        iterator = iter(stream)
+        head = []
+        try:
+            for chunk in iterator:
+                head.append(chunk)
+                if _has_content(chunk):
+                    break
+        except BaseException:
+            _close_stream((stream,))
+            if cancel is not None and cancel.cancelled:
+                raise RequestCancelled("请求已取消")
+            raise
+        if cancel is not None and cancel.cancelled:
+            raise RequestCancelled("请求已取消")
+        return stream, iterator, head
+
+    def _with_retries(self, attempt, model, deadline_at):
+        """在截止时间内按带抖动的指数退避重试attempt(model, deadline_at)"""
+        for retry in range(self.max_retries + 1):
+            if time.monotonic() >= deadline_at:
+                raise TimeoutError(f"LLM请求超过截止时间（{model}）")
+            with self._lock:
+                self._last_used = time.monotonic()
+            try:
+                return attempt(model, deadline_at)
+            except Exception as e:
+                if retry == self.max_retries or not _retryable(e):
+                    raise
+                delay = random.uniform(0, min(self.max_backoff, self.backoff * 2 ** retry))
+                if time.monotonic() + delay >= deadline_at:
+                    raise
+                print(f"LLM请求失败（{model}），{delay:.2f}秒后第{retry + 1}次重试: {e}")
+                with self._lock:
+                    self.retries += 1
+                time.sleep(delay)
+
+    def _hedged(self, attempt, model, fallback, deadline_at, close=None, cancel=None):
+        """先请求主模型，超过SLO或失败时再请求备用模型，采用先成功的结果
+
+        Args:
+            close: close(result)，释放被丢弃的结果（例如关闭流式连接）
+            cancel: CancelToken，取消后不再等待，抛出RequestCancelled
+
+        Returns:
+            (model, result): 实际采用的模型和结果
+        """
+        backup = self.fallback_model if fallback and self.fallback_model != model else None
+        hedge_at = time.monotonic() + self.slo if backup is not None and self.slo is not None else None
+        futures = {self._pool.submit(self._with_retries, attempt, model, deadline_at): model}
+        last_error = None
+        while futures:
+            now = time.monotonic()
+            if now >= deadline_at or (cancel is not None and cancel.cancelled):
+                break
+            timeout = deadline_at - now
+            if hedge_at is not None:
+                timeout = min(timeout, max(hedge_at - now, 0))
+            if cancel is not None:
+                # 等待连接建立时无法中断，定期检查是否已取消
+                timeout = min(timeout, 0.1)
+            done, _ = wait(futures, timeout=timeout, return_when=FIRST_COMPLETED)
+            for future in done:
+                used = futures.pop(future)
+                try:
+                    result = future.result()
+                except RequestCancelled:
+                    continue
+                except Exception as e:
+                    print(f"LLM请求失败（{used}）: {e}")
+                    last_error = e
+                    continue
+                # 另一个请求的结果不再需要
+                for other in futures:
+                    other.add_done_callback(functools.partial(self._discard, close))
+                if used != model:
+                    print(f"采用备用模型 {used} 的回复")
+                    with self._lock:
+                        self.fallbacks += 1
+                return used, result
+            if cancel is not None and cancel.cancelled:
+                break
+            if backup is not None and (not futures or (hedge_at is not None and time.monotonic() >= hedge_at)):
+                if futures:
+                    print(f"{model} 超过 {self.slo:g} 秒未返回，同时请求备用模型 {backup}")
+                    with self._lock:
+                        self.hedges += 1
+                else:
+                    print(f"改用备用模型 {backup}")
+                futures[self._pool.submit(self._with_retries, attempt, backup, deadline_at)] = backup
+                backup = None
+                hedge_at = None
+
+        for future in futures:
+            # 还没开始执行的直接取消，执行中的在结束后释放结果
+            future.cancel()
+            future.add_done_callback(functools.partial(self._discard, close))
+        if cancel is not None and cancel.cancelled:
+            raise RequestCancelled("请求已取消")
+        if last_error is not None and not futures:
+            raise last_error
+        raise TimeoutError(f"LLM请求超过截止时间（{model}）")
+
+    @staticmethod
+    def _discard(close, future):
+        if close is None or future.cancelled() or future.exception() is not None:
+            return
+        close(future.result())
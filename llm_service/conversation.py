@@ -0,0 +1,154 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+多轮对话记忆
+
+保存最近几轮对话原文，较早的对话在后台线程中增量压缩为摘要，请求时按token预算组装上下文，
+每轮请求的长度不会随对话变长而增长。消息顺序固定为：系统提示词、摘要、最近几轮对话、
+本轮问题。系统提示词始终不变，摘要只在压缩完成时变化，新一轮只在末尾追加，
+因此服务端可以复用前缀缓存。长时间没有对话后自动开始新的会话。
+"""
+
+import re
+import threading
+import time
+
+_CJK = re.compile(r"[\u3000-\u303f\u4e00-\u9fff\uff00-\uffef]")
+
+
+def estimate_tokens(text):
+    """粗略估计token数：中文约每字一个token，其它字符约每4个一个token"""
+    if not text:
+        return 0
+    cjk = len(_CJK.findall(text))
+    return cjk + (len(text) - cjk + 3) // 4
+
+
+class ConversationMemory:
+    """带token预算的多轮对话记忆"""
+
+    def __init__(self, summarize, max_tokens=1200, recent_turns=3, summarize_ratio=0.75,
+                 idle_reset=300.0, max_turns=50, executor=None):
+        """
+        Args:
+            summarize: summarize(summary, turns) -> str，把旧摘要和[(问, 答)]合并为新摘要（阻塞调用），
+                       失败时抛出异常或返回空字符串，对应的对话保留到下次再压缩
+            max_tokens: 摘要加历史对话的token预算，超出时最早的对话不再发送
+            recent_turns: 始终保留原文的最近轮数
+            summarize_ratio: 历史对话超过预算的这个比例时开始后台压缩
+            idle_reset: 超过这么久（秒）没有对话时清空记忆，None表示不清空
+            max_turns: 最多保存的对话轮数（压缩一直失败时防止无限增长）
+            executor: 执行压缩任务的线程池，None时每次新建线程
+        """
+        self.summarize = summarize
+        self.max_tokens = max_tokens
+        self.recent_turns = recent_turns
+        self.summarize_ratio = summarize_ratio
+        self.idle_reset = idle_reset
+        self.max_turns = max_turns
+        self.executor = executor
+
+        self.summary = ""
+        self._turns = []  # [(编号, 问, 答, token数)]
+        self._next_id = 0
+        self._last_active = time.monotonic()
+        self._summarizing = False
+        self._generation = 0  # 清空记忆后，进行中的压缩结果作废
+        self._lock = threading.Lock()
+
+    def _expire(self):
+        """调用方需持有锁"""
+        if self.idle_reset is not None and self._turns and \
+                time.monotonic() - self._last_active > self.idle_reset:
+            print("对话空闲时间过长，开始新的会话")
+            self._clear()
+
+    def _clear(self):
+        self.summary = ""
+        self._turns = []
+        self._generation += 1
+
+    def clear(self):
+        with self._lock:
+            self._clear()
+
+    @property
+    def turns(self):
+        with self._lock:
+            return [(question, answer) for _, question, answer, _ in self._turns]
+
+    def messages(self, system_prompt, prompt):
+        """组装本轮请求的消息列表
+
+        Returns:
+            list: OpenAI格式的messages
+        """
+        with self._lock:
+            self._expire()
+            messages = [{"role": "system", "content": system_prompt}]
+            budget = self.max_tokens
+            if self.summary:
+                messages.append({"role": "system", "content": f"之前对话的摘要：{self.summary}"})
+                budget -= estimate_tokens(self.summary)
+            # 从最近一轮往前取，直到用完预算
+            selected = []
+            for _, question, answer, tokens in reversed(self._turns):
+                if tokens > budget:
+                    break
+                budget -= tokens
+                selected.append((question, answer))
+        for question, answer in reversed(selected):
+            messages.append({"role": "user", "content": question})
+            messages.append({"role": "assistant", "content": answer})
+        messages.append({"role": "user", "content": prompt})
+        return messages
+
+    def add_turn(self, question, answer):
+        """记录一轮对话，历史过长时在后台压缩较早的对话"""
+        if not question or not answer:
+            return
+        with self._lock:
+            self._expire()
+            self._turns.append((self._next_id, question, answer,
+                                estimate_tokens(question) + estimate_tokens(answer)))
+            self._next_id += 1
+            self._last_active = time.monotonic()
+            if len(self._turns) > self.max_turns:
+                self._turns = self._turns[-self.max_turns:]
+
+            history_tokens = estimate_tokens(self.summary) + sum(turn[3] for turn in self._turns)
+            if self._summarizing or len(self._turns) <= self.recent_turns or \
+                    history_tokens <= self.max_tokens * self.summarize_ratio:
+                return
+            self._summarizing = True
+            folded = self._turns[:-self.recent_turns]
+            summary = self.summary
+            generation = self._generation
+
+        if self.executor is not None:
+            self.executor.submit(self._compress, summary, folded, generation)
+        else:
+            threading.Thread(target=self._compress, args=(summary, folded, generation),
+                             name="ConversationSummary", daemon=True).start()
+
+    def _compress(self, summary, folded, generation):
+        """后台压缩：把folded中的对话并入摘要，完成后从原文中移除"""
+        try:
+            start = time.perf_counter()
+            new_summary = self.summarize(summary, [(question, answer) for _, question, answer, _ in folded])
+            if not new_summary:
+                raise ValueError("摘要为空")
+            last_id = folded[-1][0]
+            with self._lock:
+                if generation != self._generation:
+                    return
+                self.summary = new_summary.strip()
+                self._turns = [turn for turn in self._turns if turn[0] > last_id]
+            print(f"已压缩 {len(folded)} 轮对话（{(time.perf_counter() - start) * 1000:.0f}ms），"
+                  f"摘要 {estimate_tokens(self.summary)} tokens")
+        except Exception as e:
+            print(f"压缩对话历史失败: {e}")
+        finally:
+            with self._lock:
+                self._summarizing = False
@@ -0,0 +1,124 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+LLM回复缓存
+
+同一句指令（例如"向左前方走三秒然后停一下"）反复出现时直接复用上次的回复，省去一次LLM往返。
+缓存键由处理类别、系统提示词和规范化后的识别文本计算：去掉标点和空白、全角转半角、
+中文数字转为阿拉伯数字，"向前走三秒。"和"向前走 3 秒"对应同一条缓存。
+只有登记过的处理类别才会缓存，每个类别有自己的有效期，只应登记回复确定的意图
+（例如低温度解析移动指令），开放式对话不应缓存。
+"""
+
+import hashlib
+import re
+import threading
+import time
+import unicodedata
+from collections import OrderedDict
+
+_CN_DIGITS = {'零': 0, '一': 1, '二': 2, '两': 2, '三': 3, '四': 4, '五': 5, '六': 6, '七': 7, '八': 8, '九': 9}
+_CN_NUMBER = re.compile(r"[零一二两三四五六七八九十百]+")
+
+
+def _cn_to_int(text):
+    value, current = 0, 0
+    for ch in text:
+        if ch == '十':
+            value += (current or 1) * 10
+            current = 0
+        elif ch == '百':
+            value += (current or 1) * 100
+            current = 0
+        else:
+            current = current * 10 + _CN_DIGITS[ch] if current else _CN_DIGITS[ch]
+    return value + current
+
+
+def normalize_transcript(text):
+    """规范化识别文本，用于计算缓存键"""
+    text = unicodedata.normalize('NFKC', text).lower()
+    text = _CN_NUMBER.sub(lambda match: str(_cn_to_int(match.group(0))), text)
+    # 只保留文字和数字（小数点保留）
+    text = re.sub(r"\.(?!\d)", "", text)
+    return re.sub(r"[^\w.]+", "", text)
+
+
+class ResponseCache:
+    """按处理类别设置有效期的LRU回复缓存"""
+
+    def __init__(self, max_entries=256):
+        """
+        Args:
+            max_entries: 所有类别合计最多保存的回复数，超出时淘汰最久未使用的
+        """
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+
+        self._ttls = {}  # 处理类别 -> 有效期（秒）
+        self._entries = OrderedDict()  # 缓存键 -> (过期时间, 回复)
+        self._lock = threading.Lock()
+
+    def register(self, namespace, ttl):
+        """允许缓存某个处理类别的回复
+
+        Args:
+            namespace: 处理类别，例如'move'
+            ttl: 有效期（秒），0或None表示不缓存
+        """
+        with self._lock:
+            if ttl:
+                self._ttls[namespace] = ttl
+            else:
+                self._ttls.pop(namespace, None)
+
+    def enabled(self, namespace):
+        return namespace in self._ttls
+
+    @staticmethod
+    def make_key(namespace, system_prompt, text):
+        normalized = normalize_transcript(text)
+        return hashlib.sha1(f"{namespace}\n{system_prompt or ''}\n{normalized}".encode('utf-8')).hexdigest()
+
+    def get(self, namespace, system_prompt, text):
+        """查找缓存的回复，未命中、已过期或类别未登记时返回None"""
+        if not self.enabled(namespace):
+            return None
+        key = self.make_key(namespace, system_prompt, text)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] < time.monotonic():
+                del self._entries[key]
+                entry = None
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+
+    def put(self, namespace, system_prompt, text, response):
+        """保存回复，类别未登记时忽略"""
+        if not response:
+            return
+        key = self.make_key(namespace, system_prompt, text)
+        with self._lock:
+            ttl = self._ttls.get(namespace)
+            if ttl is None:
+                return
+            self._entries[key] = (time.monotonic() + ttl, response)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def discard(self, namespace, system_prompt, text):
+        """删除一条回复（例如回复未通过校验）"""
+        key = self.make_key(namespace, system_prompt, text)
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
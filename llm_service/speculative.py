@@ -0,0 +1,180 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+预先请求LLM
+
+录制问题时，中间识别结果稳定一段时间后就用它发出LLM请求，回复在后台读入缓冲区，
+与剩余的录音、尾部静默检测和最终识别同时进行。最终结果与预先请求的文本一致时
+（按normalize_transcript比较）直接使用已经收到的回复，不一致时取消请求并重新请求。
+取消时通过CancelToken关闭连接，还在等待首个token的请求立即结束，不会占住LLM客户端的线程和连接。
+"""
+
+import threading
+
+from .client import CancelToken
+from .response_cache import normalize_transcript
+
+
+class SpeculativeStream:
+    """在后台读取的流式回复，可以在读取过程中被取消"""
+
+    def __init__(self, text, iterable, executor=None, cancel=None):
+        """
+        Args:
+            text: 发出请求时使用的识别文本
+            iterable: 回复的迭代器（例如流式LLM响应的生成器），在后台线程中迭代
+            executor: 执行读取的线程池，None时新建线程
+            cancel: 传给请求的CancelToken，取消时一并取消，中止阻塞中的读取
+        """
+        self.text = text
+        self.key = normalize_transcript(text)
+        self._cancel = cancel
+        self._iterable = iterable
+        self._items = []
+        self._finished = False
+        self._cancelled = False
+        self._cond = threading.Condition()
+
+        if executor is not None:
+            executor.submit(self._run)
+        else:
+            threading.Thread(target=self._run, name="SpeculativeStream", daemon=True).start()
+
+    @property
+    def cancelled(self):
+        return self._cancelled
+
+    @property
+    def finished(self):
+        """后台读取已经结束（包括取消后读取线程退出）"""
+        return self._finished
+
+    def matches(self, text):
+        return bool(self.key) and normalize_transcript(text) == self.key
+
+    def cancel(self):
+        """取消请求：关闭连接中止阻塞中的读取，读取线程随后停止并关闭迭代器"""
+        with self._cond:
+            if self._finished:
+                return
+            self._cancelled = True
+            self._cond.notify_all()
+        if self._cancel is not None:
+            self._cancel.cancel()
+
+    def _run(self):
+        try:
+            for item in self._iterable:
+                with self._cond:
+                    if self._cancelled:
+                        break
+                    self._items.append(item)
+                    self._cond.notify_all()
+        except Exception as e:
+            print(f"预先请求出错: {e}")
+        finally:
+            # 关闭生成器，流式连接随之关闭
+            close = getattr(self._iterable, 'close', None)
+            if close is not None:
+                close()
+            with self._cond:
+                self._finished = True
+                self._cond.notify_all()
+
+    def __iter__(self):
+        """先产出已经收到的回复，再等待后续回复，直到读取结束或被取消"""
+        index = 0
+        while True:
+            with self._cond:
+                while index >= len(self._items) and not self._finished and not self._cancelled:
+                    self._cond.wait()
+                if index >= len(self._items) or self._cancelled:
+                    return
+                item = self._items[index]
+            index += 1
+            yield item
+
+
+class Speculator:
+    """根据中间识别结果决定何时预先请求，录音结束后认领与最终结果一致的请求
+
+    被取消的请求结束之前不发出新的请求，同时进行的预先请求最多一个。
+    """
+
+    def __init__(self, start, stable_time=0.3, min_chars=2, max_attempts=3, executor=None):
+        """
+        Args:
+            start: start(text, cancel) -> iterable，用识别文本发出请求，cancel为CancelToken
+            stable_time: 中间结果保持不变这么久（秒，按音频时间）后发出请求
+            min_chars: 规范化后的文本少于这么多字时不请求
+            max_attempts: 一次录音最多发出的请求数（中间结果变化后会重新请求）
+            executor: 传给SpeculativeStream的线程池
+        """
+        self.start = start
+        self.stable_time = stable_time
+        self.min_chars = min_chars
+        self.max_attempts = max_attempts
+        self.executor = executor
+
+        self.current = None
+        self.attempts = 0
+        self._cancelled = []  # 已取消但读取线程还没有结束的请求
+        self._key = ""
+        self._since = 0.0
+
+    def update(self, text, now):
+        """收到中间结果（录音线程调用）
+
+        Args:
+            text: 最新的中间结果
+            now: 当前音频时间（秒）
+        """
+        key = normalize_transcript(text)
+        if key != self._key:
+            self._key = key
+            self._since = now
+            return
+        if len(key) < self.min_chars or now - self._since < self.stable_time:
+            return
+        if self.current is not None:
+            if self.current.key == key:
+                return
+            print("中间结果已变化，取消预先请求")
+            self._discard(self.current)
+            self.current = None
+        if self.attempts >= self.max_attempts:
+            return
+        self._cancelled = [stream for stream in self._cancelled if not stream.finished]
+        if self._cancelled:
+            return
+        self.attempts += 1
+        print(f"中间结果已稳定，预先请求LLM: {text}")
+        cancel = CancelToken()
+        self.current = SpeculativeStream(text, self.start(text, cancel), self.executor, cancel=cancel)
+
+    def _discard(self, stream):
+        stream.cancel()
+        if not stream.finished:
+            self._cancelled.append(stream)
+
+    def claim(self, text):
+        """录音结束后认领预先请求
+
+        Returns:
+            SpeculativeStream: 与最终结果一致时返回，否则取消请求并返回None
+        """
+        current, self.current = self.current, None
+        if current is None:
+            return None
+        if text and current.matches(text):
+            print("最终结果与预先请求一致，直接使用已收到的回答")
+            return current
+        print("最终结果与预先请求不一致，重新请求")
+        self._discard(current)
+        return None
+
+    def cancel(self):
+        if self.current is not None:
+            self._discard(self.current)
+            self.current = None
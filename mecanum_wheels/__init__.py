@@ -7,6 +7,14 @@
 """
 
 from .mecanum_control import MecanumWheels, BUILDHAT_AVAILABLE
+from .motion_executor import MotionExecutor, MotionHandle
+from .motor_group import (MotorGroup, PassiveMotorGroup, BuildHatMotorGroup, SimulatedMotorGroup,
+                          batch_command)
+from .motion_plan import MotionSegment, DIRECTION_PATTERNS, total_duration
+from .motion_parser import parse_motion_text, parse_plan_json, chinese_to_number, PLAN_JSON_FORMAT
 
 # 导出模块的主要类和常量
-__all__ = ['MecanumWheels', 'BUILDHAT_AVAILABLE'] 
\ No newline at end of file
+__all__ = ['MecanumWheels', 'BUILDHAT_AVAILABLE', 'MotionExecutor', 'MotionHandle',
+           'MotionSegment', 'DIRECTION_PATTERNS', 'total_duration',
+           'parse_motion_text', 'parse_plan_json', 'chinese_to_number', 'PLAN_JSON_FORMAT',
+           'MotorGroup', 'PassiveMotorGroup', 'BuildHatMotorGroup', 'SimulatedMotorGroup', 'batch_command'] 
\ No newline at end of file
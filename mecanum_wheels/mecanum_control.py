@@ -10,11 +10,19 @@
 - 右后轮(RR): Port C
 - 左后轮(LR): Port D
 
+运动学:
+drive(vx, vy, omega)由底盘速度（前进、向左、逆时针旋转，取值-1~1）一次矩阵乘法
+算出四个轮子的转速，超出范围时整体等比缩小，再按电机安装方向换算为PassiveMotor速度。
+四个轮子的速度通过电机组（motor_group）一次下发，默认拼成一条BuildHAT命令。
 """
 
 import time
 import sys
 
+import numpy as np
+
+from .motor_group import PassiveMotorGroup, BuildHatMotorGroup, SimulatedMotorGroup
+
 # 检查BuildHAT库是否可用
 try:
     from buildhat import PassiveMotor
@@ -27,13 +35,40 @@ except ImportError:
 
 class MecanumWheels:
     """麦克纳姆轮控制类"""
-    
-    def __init__(self, auto_init=True):
+
+    WHEEL_ORDER = ('RF', 'LF', 'RR', 'LR')
+    # 逆运动学矩阵：每行对应一个轮子（WHEEL_ORDER顺序），列为(vx, vy, omega)，结果为轮子向前的转速
+    KINEMATICS = np.array([
+        [1.0, 1.0, 1.0],  # 右前轮
+        [1.0, -1.0, -1.0],  # 左前轮
+        [1.0, -1.0, 1.0],  # 右后轮
+        [1.0, 1.0, -1.0],  # 左后轮
+    ])
+    # 电机安装方向：LF和LR电机反装，向前需反转
+    MOTOR_POLARITY = np.array([1.0, -1.0, 1.0, -1.0])
+
+    # 各运动方式对应的底盘速度 (vx 前进, vy 向左, omega 逆时针)
+    MOTION_PATTERNS = {
+        'forward': (1, 0, 0),
+        'backward': (-1, 0, 0),
+        'right': (0, -1, 0),
+        'left': (0, 1, 0),
+        'right_forward': (1, -1, 0),  # 左前轮、右后轮向前
+        'left_forward': (1, 1, 0),  # 右前轮、左后轮向前
+        'right_backward': (-1, -1, 0),  # 右前轮、左后轮向后
+        'left_backward': (-1, 1, 0),  # 左前轮、右后轮向后
+        'rotate_right': (0, 0, -1),  # 右轮向后，左轮向前
+        'rotate_left': (0, 0, 1),  # 右轮向前，左轮向后
+    }
+
+    def __init__(self, auto_init=True, batched=True, simulate=False):
         """初始化四个轮子电机
         
         Args:
             auto_init: 是否自动初始化电机，默认为True。
                        如果设为False，则需要手动调用_init_motors()
+            batched: 是否把四个轮子的命令合并为一次BuildHAT写入
+            simulate: 使用模拟电机组，不需要BuildHAT
         """
         self.motor_config = {
             'RF': {'port': 'A', 'motor': None},  # 右前轮
@@ -42,6 +77,12 @@ class MecanumWheels:
             'LR': {'port': 'D', 'motor': None}   # 左后轮
         }
         self.default_speed = 75  # 默认速度 (0-100)
+        self.batched = batched
+        self.motor_group = None  # 同时设置四个轮子的电机组
+        if simulate:
+            self.motor_group = SimulatedMotorGroup(self.WHEEL_ORDER, batched=batched)
+            print(f"使用{self.motor_group.name}电机组")
+            return
         
         # 检查BuildHAT库是否可用
         if not BUILDHAT_AVAILABLE:
@@ -70,6 +111,15 @@ class MecanumWheels:
                 print(f"初始化{position}轮失败 (Port {config['port']}): {e}")
                 self.cleanup()
                 return False
+
+        motors = {position: self.motor_config[position]['motor'] for position in self.WHEEL_ORDER}
+        self.motor_group = PassiveMotorGroup(motors)
+        if self.batched:
+            try:
+                self.motor_group = BuildHatMotorGroup(motors)
+            except Exception as e:
+                print(f"无法批量写入电机命令，改为逐个写入: {e}")
+        print(f"电机写入方式: {self.motor_group.name}")
         return True
     
     def _set_motor(self, position, direction, speed=None):
@@ -95,19 +145,64 @@ class MecanumWheels:
     
     def stop(self):
         """停止所有轮子"""
-        for position in self.motor_config:
-            self._set_motor(position, 0)
+        if self.motor_group is not None:
+            self.motor_group.stop()
+        else:
+            for position in self.motor_config:
+                self._set_motor(position, 0)
         print("所有轮子已停止")
-    
+
+    def wheel_speeds(self, vx, vy, omega, speed=None):
+        """由底盘速度计算四个电机的PassiveMotor速度
+
+        Args:
+            vx: 前进速度（-1~1，负数为后退）
+            vy: 向左速度（-1~1，负数为向右）
+            omega: 逆时针旋转速度（-1~1，负数为顺时针）
+            speed: 最快的轮子对应的电机速度 (默认使用self.default_speed)
+
+        Returns:
+            np.ndarray: WHEEL_ORDER顺序的电机速度（-100~100）
+        """
+        wheels = self.KINEMATICS @ np.array([vx, vy, omega], dtype=float)
+        # 任一轮子超出范围时整体等比缩小，保持运动方向不变
+        peak = np.abs(wheels).max()
+        if peak > 1.0:
+            wheels /= peak
+        motor_speed = speed if speed is not None else self.default_speed
+        return np.clip(wheels * motor_speed * self.MOTOR_POLARITY, -100, 100)
+
+    def drive(self, vx, vy, omega=0.0, speed=None):
+        """按底盘速度设置四个轮子后立即返回，可以连续调用平滑改变方向
+
+        Args:
+            vx: 前进速度（-1~1，负数为后退）
+            vy: 向左速度（-1~1，负数为向右）
+            omega: 逆时针旋转速度（-1~1，负数为顺时针）
+            speed: 最快的轮子对应的电机速度 (默认使用self.default_speed)
+        """
+        if self.motor_group is None:
+            print("警告: 电机未初始化")
+            return
+        speeds = self.wheel_speeds(vx, vy, omega, speed)
+        speeds[np.abs(speeds) < 1.0] = 0.0  # 太小的速度电机转不动，直接停止
+        self.motor_group.apply(speeds)
+
+    def start_motion(self, pattern, speed=None):
+        """按运动方式设置四个轮子后立即返回，不等待也不停止
+
+        Args:
+            pattern: MOTION_PATTERNS中的运动方式名称
+            speed: 速度 (默认使用self.default_speed)
+        """
+        self.drive(*self.MOTION_PATTERNS[pattern], speed=speed)
+
     def move_forward(self, duration=1.0, speed=None):
         """向前移动
         四个轮子都向前转动（LF和LR电机因反装使用-1方向）
         """
         print(f"向前移动 {duration}秒")
-        self._set_motor('RF', 1, speed)   # 右前轮向前（正转）
-        self._set_motor('LF', -1, speed)  # 左前轮向前（反转实现）
-        self._set_motor('RR', 1, speed)   # 右后轮向前（正转）
-        self._set_motor('LR', -1, speed)  # 左后轮向前（反转实现）
+        self.start_motion('forward', speed)
         
         time.sleep(duration)
         self.stop()
@@ -117,10 +212,7 @@ class MecanumWheels:
         四个轮子都向后转动（LF和LR电机因反装使用1方向）
         """
         print(f"向后移动 {duration}秒")
-        self._set_motor('RF', -1, speed)  # 右前轮向后（反转）
-        self._set_motor('LF', 1, speed)   # 左前轮向后（正转实现）
-        self._set_motor('RR', -1, speed)  # 右后轮向后（反转）
-        self._set_motor('LR', 1, speed)   # 左后轮向后（正转实现）
+        self.start_motion('backward', speed)
         
         time.sleep(duration)
         self.stop()
@@ -131,10 +223,7 @@ class MecanumWheels:
         （LF/LR电机方向需反向）
         """
         print(f"向右横向移动 {duration}秒")
-        self._set_motor('RF', -1, speed)  # 右前轮向后（反转）
-        self._set_motor('LF', -1, speed)  # 左前轮向前（反转实现）
-        self._set_motor('RR', 1, speed)   # 右后轮向前（正转）
-        self._set_motor('LR', 1, speed)   # 左后轮向后（正转实现）
+        self.start_motion('right', speed)
         
         time.sleep(duration)
         self.stop()
@@ -145,10 +234,7 @@ class MecanumWheels:
         （LF/LR电机方向需反向）
         """
         print(f"向左横向移动 {duration}秒")
-        self._set_motor('RF', 1, speed)   # 右前轮向前（正转）
-        self._set_motor('LF', 1, speed)   # 左前轮向后（正转实现）
-        self._set_motor('RR', -1, speed)  # 右后轮向后（反转）
-        self._set_motor('LR', -1, speed)  # 左后轮向前（反转实现）
+        self.start_motion('left', speed)
         
         time.sleep(duration)
         self.stop()
@@ -158,10 +244,7 @@ class MecanumWheels:
         左前轮向前，右后轮向前
         """
         print(f"向右前方移动 {duration}秒")
-        self._set_motor('RF', 0, 0)      # 右前轮停止
-        self._set_motor('LF', -1, speed)  # 左前轮向前
-        self._set_motor('RR', -1, speed)  # 右后轮向前
-        self._set_motor('LR', 0, 0)      # 左后轮停止
+        self.start_motion('right_forward', speed)
         
         time.sleep(duration)
         self.stop()
@@ -171,36 +254,27 @@ class MecanumWheels:
         右前轮向前，左后轮向前
         """
         print(f"向左前方移动 {duration}秒")
-        self._set_motor('RF', 1, speed)  # 右前轮向前
-        self._set_motor('LF', 0, 0)      # 左前轮停止
-        self._set_motor('RR', 0, 0)      # 右后轮停止
-        self._set_motor('LR', -1, speed)  # 左后轮向前
+        self.start_motion('left_forward', speed)
         
         time.sleep(duration)
         self.stop()
     
     def move_right_backward(self, duration=1.0, speed=None):
         """向右后方移动
-        左前轮向后，右后轮向后
+        右前轮向后，左后轮向后
         """
         print(f"向右后方移动 {duration}秒")
-        self._set_motor('RF', 0, 0)      # 右前轮停止
-        self._set_motor('LF', 1, speed)  # 左前轮向后
-        self._set_motor('RR', -1, speed)  # 右后轮向后
-        self._set_motor('LR', 0, 0)      # 左后轮停止
+        self.start_motion('right_backward', speed)
         
         time.sleep(duration)
         self.stop()
     
     def move_left_backward(self, duration=1.0, speed=None):
         """向左后方移动
-        右前轮向后，左后轮向后
+        左前轮向后，右后轮向后
         """
         print(f"向左后方移动 {duration}秒")
-        self._set_motor('RF', -1, speed)  # 右前轮向后
-        self._set_motor('LF', 0, 0)      # 左前轮停止
-        self._set_motor('RR', 0, 0)      # 右后轮停止
-        self._set_motor('LR', 1, speed)  # 左后轮向后
+        self.start_motion('left_backward', speed)
         
         time.sleep(duration)
         self.stop()
@@ -210,10 +284,7 @@ class MecanumWheels:
         右轮向后，左轮向前
         """
         print(f"顺时针旋转 {duration}秒")
-        self._set_motor('RF', -1, speed)  # 右前轮向后
-        self._set_motor('LF', -1, speed)   # 左前轮向前
-        self._set_motor('RR', -1, speed)  # 右后轮向后
-        self._set_motor('LR', -1, speed)   # 左后轮向前
+        self.start_motion('rotate_right', speed)
         
         time.sleep(duration)
         self.stop()
@@ -223,10 +294,7 @@ class MecanumWheels:
         右轮向前，左轮向后
         """
         print(f"逆时针旋转 {duration}秒")
-        self._set_motor('RF', 1, speed)   # 右前轮向前
-        self._set_motor('LF', 1, speed)  # 左前轮向后
-        self._set_motor('RR', 1, speed)   # 右后轮向前
-        self._set_motor('LR', 1, speed)  # 左后轮向后
+        self.start_motion('rotate_left', speed)
         
         time.sleep(duration)
         self.stop()
@@ -306,6 +374,8 @@ class MecanumWheels:
     
     def cleanup(self):
         """清理资源，停止所有电机"""
+        if self.motor_group is not None and self.motor_group.updates:
+            print(self.motor_group.skew_report())
         for position, config in self.motor_config.items():
             if config['motor'] is not None:
                 try:
@@ -314,15 +384,19 @@ class MecanumWheels:
                 except Exception as e:
                     print(f"停止{position}轮电机时出错: {e}")
 
-def run_menu_system():
-    """运行交互菜单系统"""
+def run_menu_system(simulate=False):
+    """运行交互菜单系统
+
+    Args:
+        simulate: 使用模拟电机组（命令行参数--simulate），不需要BuildHAT
+    """
     try:
         # 创建麦克纳姆轮控制对象
-        if not BUILDHAT_AVAILABLE:
+        if not BUILDHAT_AVAILABLE and not simulate:
             print("错误: BuildHAT库不可用，无法启动菜单系统")
             return
             
-        wheels = MecanumWheels()
+        wheels = MecanumWheels(simulate=simulate)
         
         # 菜单系统
         while True:
@@ -402,4 +476,4 @@ def run_menu_system():
         print("程序已退出")
 
 if __name__ == "__main__":
-    run_menu_system()
+    run_menu_system(simulate="--simulate" in sys.argv)
@@ -0,0 +1,284 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+非阻塞运动执行器
+
+运动指令交给独立线程执行：提交后立即返回句柄，调用方可以等待、await或取消。
+每条指令带截止时间，到期由执行线程停止电机，或在队列中还有指令时直接接上下一条；
+新指令默认清空队列并抢占正在执行的指令（都不经过停止，避免走走停停），
+stop()立即停止（例如语音"停"）。运动计划（多段定时速度）按队列依次执行。
+看门狗线程独立检查：电机超过截止时间仍在转动，或执行线程已退出时强制停止。
+"""
+
+import asyncio
+import functools
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future
+
+
+class MotionHandle:
+    """一条运动指令的句柄
+
+    future的结果为结束状态：'completed'（到时完成）、'cancelled'（被取消或停止）、
+    'preempted'（被新指令抢占）或'failed'（设置电机出错）。
+    """
+
+    def __init__(self, executor, name, duration, apply):
+        self.name = name
+        self.duration = duration
+        self.future = Future()
+        self.started_at = None
+        self._executor = executor
+        self._apply = apply
+
+    @property
+    def done(self):
+        return self.future.done()
+
+    @property
+    def status(self):
+        """结束状态，尚未结束时为None"""
+        return self.future.result() if self.future.done() else None
+
+    def wait(self, timeout=None):
+        """阻塞等待指令结束
+
+        Returns:
+            str: 结束状态；超时返回None
+        """
+        try:
+            return self.future.result(timeout)
+        except Exception:
+            return None
+
+    def __await__(self):
+        return asyncio.wrap_future(self.future).__await__()
+
+    def cancel(self):
+        """取消指令，正在执行时立即停止电机"""
+        self._executor.cancel(self)
+
+    def _finish(self, status):
+        if not self.future.done():
+            self.future.set_result(status)
+
+
+class MotionExecutor:
+    """在独立线程中按截止时间执行运动指令"""
+
+    def __init__(self, wheels, max_duration=30.0, watchdog_grace=0.5, watchdog_interval=0.1):
+        """
+        Args:
+            wheels: MecanumWheels实例
+            max_duration: 单条指令的最长持续时间（秒），更长的指令会被截断
+            watchdog_grace: 超过截止时间多久电机仍在转动时由看门狗强制停止（秒）
+            watchdog_interval: 看门狗检查间隔（秒）
+        """
+        self.wheels = wheels
+        self.max_duration = max_duration
+        self.watchdog_grace = watchdog_grace
+        self.watchdog_interval = watchdog_interval
+
+        self._cond = threading.Condition()
+        self._motor_lock = threading.Lock()  # 电机写入只能串行进行
+        self._queue = deque()  # 等待执行的指令
+        self._current = None  # 正在执行的指令
+        self._preempt = False  # 为True时不等当前指令到时，立即切换到队列中的下一条
+        self._deadline = None
+        self._stop_reason = None  # 非None时执行线程应停止当前指令
+        self._motors_active = False
+        self._running = True
+
+        self._thread = threading.Thread(target=self._run, name="MotionExecutor", daemon=True)
+        self._thread.start()
+        self._watchdog = threading.Thread(target=self._watch, name="MotionWatchdog", daemon=True)
+        self._watchdog.start()
+
+    @property
+    def is_moving(self):
+        """是否有指令正在执行或等待执行"""
+        with self._cond:
+            return self._current is not None or bool(self._queue)
+
+    def submit(self, name, apply, duration=None, queue=False):
+        """提交一条运动指令，立即返回
+
+        Args:
+            name: 指令名称（用于日志）
+            apply: 在执行线程中调用、设置电机的函数，不能阻塞
+            duration: 持续时间（秒），None表示持续到max_duration或被停止
+            queue: 为True时排在已有指令之后，前一条到时后立即接上；
+                   为False时清空队列并抢占正在执行的指令
+
+        Returns:
+            MotionHandle
+        """
+        if duration is None or duration > self.max_duration:
+            if duration is not None:
+                print(f"运动时间 {duration}秒 超过上限，截断为 {self.max_duration}秒")
+            duration = self.max_duration
+        handle = MotionHandle(self, name, max(0.0, duration), apply)
+        with self._cond:
+            if not self._running:
+                handle._finish('cancelled')
+                return handle
+            if not queue:
+                for queued in self._queue:
+                    queued._finish('preempted')
+                self._queue.clear()
+                self._preempt = self._current is not None
+            self._queue.append(handle)
+            self._cond.notify_all()
+        return handle
+
+    def move(self, pattern, duration=None, speed=None, queue=False):
+        """按MecanumWheels的运动方式移动一段时间"""
+        return self.submit(pattern, lambda: self.wheels.start_motion(pattern, speed), duration, queue)
+
+    def drive(self, vx, vy, omega=0.0, duration=None, speed=None, queue=False):
+        """按底盘速度移动一段时间，参数含义见MecanumWheels.drive"""
+        return self.submit(f"drive({vx:g}, {vy:g}, {omega:g})",
+                           lambda: self.wheels.drive(vx, vy, omega, speed), duration, queue)
+
+    def run_plan(self, plan, speed=None, queue=False):
+        """依次执行运动计划中的各段，段与段之间不停车
+
+        Args:
+            plan: MotionSegment列表
+            speed: 未指定速度的分段使用的电机速度
+            queue: 为True时整个计划排在已有指令之后，否则抢占
+
+        Returns:
+            list: 每段对应的MotionHandle，最后一个完成即整个计划完成
+        """
+        handles = []
+        for index, segment in enumerate(plan):
+            segment_speed = segment.speed if segment.speed is not None else speed
+            apply = functools.partial(self.wheels.drive, segment.vx, segment.vy, segment.omega, segment_speed)
+            handles.append(self.submit(segment.label, apply, segment.duration, queue or index > 0))
+        return handles
+
+    def cancel(self, handle, reason='cancelled'):
+        """取消指定指令"""
+        with self._cond:
+            if handle in self._queue:
+                self._queue.remove(handle)
+                handle._finish(reason)
+            elif handle is self._current:
+                self._stop_reason = reason
+            self._cond.notify_all()
+
+    def stop(self):
+        """取消所有指令并立即停止电机"""
+        with self._cond:
+            for queued in self._queue:
+                queued._finish('cancelled')
+            self._queue.clear()
+            if self._current is not None:
+                self._stop_reason = 'cancelled'
+            self._cond.notify_all()
+
+    def _stop_motors(self, force=False):
+        """停止电机；force为True时（看门狗）等不到电机锁也直接停止"""
+        locked = self._motor_lock.acquire(timeout=0.2 if force else -1)
+        try:
+            self.wheels.stop()
+        except Exception as e:
+            print(f"停止电机失败: {e}")
+        finally:
+            if locked:
+                self._motor_lock.release()
+        with self._cond:
+            self._motors_active = False
+
+    def _ready(self):
+        """执行线程是否需要处理状态变化，调用方需持有锁"""
+        if self._stop_reason is not None:
+            return True
+        if self._current is None:
+            return bool(self._queue)
+        return self._preempt or time.monotonic() >= self._deadline
+
+    def _run(self):
+        """执行线程：按队列顺序接手指令、按截止时间切换或停止"""
+        try:
+            while True:
+                with self._cond:
+                    while self._running and not self._ready():
+                        timeout = None if self._current is None else self._deadline - time.monotonic()
+                        self._cond.wait(timeout)
+                    if not self._running:
+                        break
+                    current = self._current
+                    reason, self._stop_reason = self._stop_reason, None
+                    preempted, self._preempt = self._preempt, False
+                    new = self._queue.popleft() if reason is None and self._queue else None
+                    if new is not None:
+                        self._current = new
+                        self._deadline = time.monotonic() + new.duration
+                        self._motors_active = True
+                    else:
+                        self._current = None
+
+                if new is not None:
+                    # 下一条指令直接覆盖电机设置，中间不停车
+                    if current is not None:
+                        status = 'preempted' if preempted else 'completed'
+                        print(f"运动指令 [{current.name}] 结束: {status}，接着执行 [{new.name}]")
+                        current._finish(status)
+                    print(f"执行运动指令 [{new.name}] {new.duration:.1f}秒")
+                    new.started_at = time.monotonic()
+                    try:
+                        with self._motor_lock:
+                            new._apply()
+                    except Exception as e:
+                        print(f"运动指令 [{new.name}] 执行失败: {e}")
+                        # 后续分段依赖这一段的位置，一并取消
+                        self.stop()
+                        self._stop_motors()
+                        with self._cond:
+                            if self._current is new:
+                                self._current = None
+                                self._stop_reason = None
+                        new._finish('failed')
+                elif current is not None:
+                    self._stop_motors()
+                    status = reason or 'completed'
+                    print(f"运动指令 [{current.name}] 结束: {status}")
+                    current._finish(status)
+        finally:
+            self._stop_motors()
+            with self._cond:
+                for handle in list(self._queue) + [self._current]:
+                    if handle is not None:
+                        handle._finish('cancelled')
+                self._queue.clear()
+                self._current = None
+
+    def _watch(self):
+        """看门狗：截止时间已过或执行线程已退出时电机仍在转动，强制停止"""
+        while True:
+            time.sleep(self.watchdog_interval)
+            with self._cond:
+                active = self._motors_active
+                overdue = self._deadline is not None and \
+                    time.monotonic() > self._deadline + self.watchdog_grace
+                running = self._running
+            if active and (overdue or not self._thread.is_alive()):
+                print("看门狗: 电机超时仍在转动，强制停止")
+                self._stop_motors(force=True)
+            if not running and not self._thread.is_alive():
+                break
+
+    def close(self):
+        """停止所有指令并结束执行线程"""
+        with self._cond:
+            self._running = False
+            self._cond.notify_all()
+        self._thread.join(timeout=2.0)
+        if self._thread.is_alive():
+            # 执行线程卡在电机写入中，直接停止
+            self._stop_motors(force=True)
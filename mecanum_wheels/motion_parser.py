@@ -0,0 +1,190 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+移动指令解析
+
+先用本地规则解析"向前两秒"、"左转2.5秒然后后退一秒半"这类简单指令（方向关键词加中文或
+阿拉伯数字的秒数），不需要调用LLM；规则无法完整解释的指令才交给LLM。
+LLM按约定输出JSON，由parse_plan_json按固定结构校验，格式不对时抛出ValueError而不是崩溃。
+"""
+
+import json
+import re
+
+from .motion_plan import DIRECTION_PATTERNS, MotionSegment
+
+# 方向关键词 -> DIRECTION_PATTERNS中的方向，同一位置优先匹配较长的关键词
+DIRECTION_KEYWORDS = {
+    "左前方": "左前", "右前方": "右前", "左后方": "左后", "右后方": "右后",
+    "左前": "左前", "右前": "右前", "左后": "左后", "右后": "右后",
+    "逆时针": "左转", "顺时针": "右转",
+    "左转": "左转", "右转": "右转", "左拐": "左转", "右拐": "右转",
+    "前进": "前", "后退": "后", "倒退": "后", "左移": "左", "右移": "右",
+    "前": "前", "后": "后", "左": "左", "右": "右",
+}
+
+# 连接词中含有"后"等方向字，先替换掉
+CONNECTIVES = ("然后", "之后", "以后", "最后", "接着", "随后", "再", "并且", "和")
+# 允许出现的其它词，去掉后不应剩下任何内容，否则交给LLM
+FILLER_WORDS = ("机器人", "请你", "请", "麻烦", "帮我", "给我", "一下", "向", "往", "朝",
+                "方向", "面", "边", "移动", "平移", "行驶", "运动", "走", "开", "转", "动", "地", "的", "先")
+NEGATIONS = ("不", "别", "停")
+# 单字方向（"前"、"左"等）必须紧跟在介词后面或紧接动词，否则"后面"、"前前前"之类会被当成移动
+DIRECTION_PREFIXES = "向往朝"
+DIRECTION_VERBS = "走移开行动"
+
+_CN_DIGITS = {'零': 0, '一': 1, '二': 2, '两': 2, '三': 3, '四': 4, '五': 5, '六': 6, '七': 7, '八': 8, '九': 9}
+_NUMBER = r"\d+(?:\.\d+)?|[零一二两三四五六七八九十百]+(?:点[零一二三四五六七八九]+)?|半"
+_DURATION_PATTERN = re.compile(rf"({_NUMBER})\s*个?\s*(秒钟|秒|s|分钟|分)(半)?")
+_ANY_NUMBER_PATTERN = re.compile(r"\d|[一二两三四五六七八九十百半]")
+_DIRECTION_PATTERN = re.compile("|".join(sorted(DIRECTION_KEYWORDS, key=len, reverse=True)))
+
+
+def chinese_to_number(text):
+    """把"十五"、"三点五"、"两"、"半"、"2.5"等转换为数字
+
+    Raises:
+        ValueError: 无法识别的数字
+    """
+    if re.fullmatch(r"\d+(?:\.\d+)?", text):
+        return float(text)
+    if text == "半":
+        return 0.5
+    integer, _, decimal = text.partition("点")
+    value, current = 0, 0
+    for ch in integer:
+        if ch in _CN_DIGITS:
+            current = _CN_DIGITS[ch]
+        elif ch == "十":
+            value += (current or 1) * 10
+            current = 0
+        elif ch == "百":
+            value += (current or 1) * 100
+            current = 0
+        else:
+            raise ValueError(f"无法识别的数字: {text}")
+    value += current
+    if decimal:
+        value += float("0." + "".join(str(_CN_DIGITS[ch]) for ch in decimal))
+    return float(value)
+
+
+def _is_bare_direction(text, match):
+    """单字方向前面没有介词、后面也没有动词"""
+    if len(match.group(0)) > 1:
+        return False
+    before = text[:match.start()].rstrip()[-1:]
+    after = text[match.end():].lstrip()[:1]
+    has_prefix = bool(before) and before in DIRECTION_PREFIXES
+    has_verb = bool(after) and after in DIRECTION_VERBS
+    return not (has_prefix or has_verb)
+
+
+def parse_motion_text(text, default_duration=1.0, max_segments=10, max_seconds=30.0):
+    """用本地规则解析移动指令
+
+    每个方向关键词与它之后、下一个方向之前的时长配对，没有给出时长时使用default_duration。
+    出现否定词、无法配对的数字、不在(0, max_seconds]范围内的时长、没有介词或动词的单字方向
+    或无法解释的其它内容时返回None，交给LLM处理。时长范围与parse_plan_json一致。
+
+    Returns:
+        list: MotionSegment列表；无法可靠解析时返回None
+    """
+    # 标点换成空格，小数点保留
+    text = re.sub(r"[\s，,。！!？?、；;：:]+|\.(?!\d)", " ", text.strip())
+    if not text or any(word in text for word in NEGATIONS):
+        return None
+    for word in CONNECTIVES:
+        text = text.replace(word, " ")
+
+    durations = []
+    for match in _DURATION_PATTERN.finditer(text):
+        try:
+            seconds = chinese_to_number(match.group(1))
+        except ValueError:
+            return None
+        if match.group(2).startswith("分"):
+            seconds *= 60
+        if match.group(3):
+            seconds += 0.5
+        if not 0 < seconds <= max_seconds:
+            return None
+        durations.append((match.start(), seconds))
+    rest = _DURATION_PATTERN.sub(" ", text)
+    # 剩下的数字没有秒这个单位（例如"一米"、"90度"），规则无法处理
+    if _ANY_NUMBER_PATTERN.search(rest):
+        return None
+
+    matches = list(_DIRECTION_PATTERN.finditer(text))
+    if any(_is_bare_direction(text, match) for match in matches):
+        return None
+    directions = [(match.start(), DIRECTION_KEYWORDS[match.group(0)]) for match in matches]
+    if not directions or len(directions) > max_segments:
+        return None
+    rest = _DIRECTION_PATTERN.sub(" ", rest)
+    for word in FILLER_WORDS:
+        rest = rest.replace(word, " ")
+    if rest.strip():
+        return None
+
+    plan = []
+    for index, (position, direction) in enumerate(directions):
+        end = directions[index + 1][0] if index + 1 < len(directions) else len(text)
+        owned = [seconds for start, seconds in durations if position < start < end]
+        if len(owned) > 1:
+            return None
+        plan.append(MotionSegment.from_direction(direction, owned[0] if owned else default_duration))
+    # 每个时长都必须跟在某个方向后面
+    if sum(1 for start, _ in durations if start > directions[0][0]) != len(durations):
+        return None
+    return plan
+
+
+# LLM输出的JSON结构说明，同时用于提示词
+PLAN_JSON_FORMAT = '{"actions": [{"direction": "前", "seconds": 2}, {"direction": "右转", "seconds": 1}]}'
+
+
+def parse_plan_json(text, max_segments=10, max_seconds=30.0):
+    """解析并校验LLM输出的JSON运动计划
+
+    结构为{"actions": [{"direction": 方向, "seconds": 秒数}, ...]}，
+    方向必须是DIRECTION_PATTERNS中的一个，秒数为0到max_seconds之间的数字。
+    允许回复被```json代码块包裹。
+
+    Returns:
+        list: MotionSegment列表
+
+    Raises:
+        ValueError: 不是合法JSON或不符合结构
+    """
+    text = text.strip()
+    fenced = re.search(r"```(?:json)?\s*(.*?)```", text, re.S)
+    if fenced:
+        text = fenced.group(1)
+    start, end = text.find("{"), text.rfind("}")
+    if start < 0 or end < start:
+        raise ValueError("回复中没有JSON对象")
+    try:
+        data = json.loads(text[start:end + 1])
+    except ValueError as e:
+        raise ValueError(f"JSON格式错误: {e}")
+
+    actions = data.get("actions") if isinstance(data, dict) else None
+    if not isinstance(actions, list) or not actions:
+        raise ValueError("缺少actions列表")
+    if len(actions) > max_segments:
+        raise ValueError(f"动作数量超过 {max_segments}")
+    plan = []
+    for index, action in enumerate(actions):
+        if not isinstance(action, dict):
+            raise ValueError(f"第{index + 1}个动作不是对象")
+        direction = action.get("direction")
+        seconds = action.get("seconds")
+        if direction not in DIRECTION_PATTERNS:
+            raise ValueError(f"第{index + 1}个动作的方向无效: {direction}")
+        if isinstance(seconds, bool) or not isinstance(seconds, (int, float)) or \
+                not 0 < seconds <= max_seconds:
+            raise ValueError(f"第{index + 1}个动作的时间无效: {seconds}")
+        plan.append(MotionSegment.from_direction(direction, float(seconds)))
+    return plan
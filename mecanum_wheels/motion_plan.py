@@ -0,0 +1,67 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+运动计划
+
+一个运动计划是若干段定时的底盘速度，由MotionExecutor.run_plan依次执行，段与段之间不停车。
+"前进两秒然后右转一秒"这样的多步指令只需要一次识别，解析方式见motion_parser。
+"""
+
+from .mecanum_control import MecanumWheels
+
+# 中文方向 -> MecanumWheels.MOTION_PATTERNS中的运动方式
+DIRECTION_PATTERNS = {
+    "前": 'forward',
+    "后": 'backward',
+    "左": 'left',
+    "右": 'right',
+    "左前": 'left_forward',
+    "右前": 'right_forward',
+    "左后": 'left_backward',
+    "右后": 'right_backward',
+    "左转": 'rotate_left',
+    "右转": 'rotate_right',
+}
+
+
+class MotionSegment:
+    """运动计划中的一段：以固定底盘速度运动一段时间"""
+
+    def __init__(self, vx, vy, omega, duration, speed=None, label=None):
+        """
+        Args:
+            vx: 前进速度（-1~1）
+            vy: 向左速度（-1~1）
+            omega: 逆时针旋转速度（-1~1）
+            duration: 持续时间（秒）
+            speed: 电机速度，None表示使用执行时的默认值
+            label: 用于日志和播报的名称
+        """
+        self.vx = vx
+        self.vy = vy
+        self.omega = omega
+        self.duration = duration
+        self.speed = speed
+        self.label = label or f"drive({vx:g}, {vy:g}, {omega:g})"
+
+    @classmethod
+    def from_direction(cls, direction, duration, speed=None):
+        """由中文方向（见DIRECTION_PATTERNS）创建分段"""
+        pattern = DIRECTION_PATTERNS[direction]
+        vx, vy, omega = MecanumWheels.MOTION_PATTERNS[pattern]
+        return cls(vx, vy, omega, duration, speed, label=direction)
+
+    def describe(self):
+        """播报用的描述，例如"向前2秒"、"左转1.5秒\""""
+        action = self.label if self.label.endswith("转") else f"向{self.label}"
+        return f"{action}{self.duration:g}秒"
+
+    def __repr__(self):
+        return f"MotionSegment({self.label}, {self.duration:g}s)"
+
+
+def total_duration(plan):
+    """运动计划的总时长（秒）"""
+    return sum(segment.duration for segment in plan)
+
@@ -0,0 +1,208 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+四轮电机组
+
+一次设置全部轮子的速度。只下发有变化的轮子；BuildHAT后端把所有轮子的命令拼成一行，
+例如"port 0 ; pwm ; set 0.75 ; port 1 ; pwm ; set -0.75\r"，一次串口写入，
+四个轮子几乎同时生效。逐个写入的后端保留PassiveMotor原来的调用方式，
+模拟后端按串口速率模拟写入耗时，用于没有BuildHAT时测试和比较两种方式。
+
+每次更新多个轮子时，记录从开始写入第一条命令到最后一条命令写完的时间（偏差），
+这是各轮子生效时间差的上限，偏差越大起步时越容易跑偏。各后端用同样的方法测量，
+逐个写入（MecanumWheels(batched=False)）的统计可以作为批量写入的对照基准。
+"""
+
+import time
+
+
+def batch_command(updates):
+    """拼接BuildHAT命令
+
+    Args:
+        updates: [(端口号, 速度)]，速度为-100~100，0表示停止
+
+    Returns:
+        str: 以回车结尾的一行命令
+    """
+    parts = []
+    for port, speed in updates:
+        if speed == 0:
+            parts.append(f"port {port} ; off")
+        else:
+            parts.append(f"port {port} ; pwm ; set {speed / 100}")
+    return " ; ".join(parts) + "\r"
+
+
+class MotorGroup:
+    """电机组接口"""
+
+    name = "电机组"
+
+    def __init__(self, positions):
+        """
+        Args:
+            positions: 轮子位置，apply的速度按这个顺序给出
+        """
+        self.positions = tuple(positions)
+        self.updates = 0  # 有变化的更新次数
+        self.writes = 0  # 串口写入次数
+        self.last_skew = 0.0  # 最近一次更新的偏差（秒）
+        self.max_skew = 0.0
+        self._total_skew = 0.0
+        self._speeds = {position: None for position in self.positions}  # 已下发的速度，None表示未知
+
+    def _write(self, updates):
+        """下发[(位置, 速度)]"""
+        raise NotImplementedError
+
+    def _record(self, updates):
+        start = time.perf_counter()
+        self._write(updates)
+        elapsed = time.perf_counter() - start
+        for position, speed in updates:
+            self._speeds[position] = speed
+        # 只有一个轮子时不存在轮子之间的偏差
+        skew = elapsed if len(updates) > 1 else 0.0
+        self.updates += 1
+        self.last_skew = skew
+        self.max_skew = max(self.max_skew, skew)
+        self._total_skew += skew
+        return skew
+
+    def apply(self, speeds):
+        """设置所有轮子的速度，只下发有变化的轮子
+
+        Args:
+            speeds: 按positions顺序的速度（-100~100），0表示停止
+
+        Returns:
+            float: 本次更新的偏差（秒），没有变化时为0
+        """
+        updates = [(position, float(speed)) for position, speed in zip(self.positions, speeds)
+                   if self._speeds[position] != float(speed)]
+        if not updates:
+            return 0.0
+        return self._record(updates)
+
+    def stop(self):
+        """停止所有轮子，不管已下发的状态如何都重新发送"""
+        return self._record([(position, 0.0) for position in self.positions])
+
+    def skew_report(self):
+        """偏差统计"""
+        mean = self._total_skew / self.updates if self.updates else 0.0
+        return (f"电机组[{self.name}]: {self.updates}次更新，{self.writes}次写入，"
+                f"轮子生效偏差 平均 {mean * 1000:.2f}ms，最大 {self.max_skew * 1000:.2f}ms")
+
+
+class PassiveMotorGroup(MotorGroup):
+    """逐个调用PassiveMotor.start/stop，每个轮子一次串口写入"""
+
+    name = "逐个写入"
+
+    def __init__(self, motors):
+        """
+        Args:
+            motors: 位置 -> PassiveMotor，按字典顺序作为轮子顺序
+        """
+        super().__init__(motors.keys())
+        self.motors = dict(motors)
+
+    def _write(self, updates):
+        for position, speed in updates:
+            motor = self.motors[position]
+            if speed == 0:
+                motor.stop()
+            else:
+                motor.start(speed)
+            self.writes += 1
+
+
+class BuildHatMotorGroup(PassiveMotorGroup):
+    """把所有轮子的命令拼成一行，一次写入BuildHAT串口
+
+    用到了buildhat库的内部接口（Device._instance.write和PassiveMotor._currentspeed，
+    以buildhat 0.9为准），创建时检查这些接口，批量写入因接口不兼容失败时改为逐个写入。
+    """
+
+    name = "批量写入"
+
+    def __init__(self, motors):
+        """
+        Args:
+            motors: 位置 -> PassiveMotor，按字典顺序作为轮子顺序
+
+        Raises:
+            ValueError: 无法取得BuildHAT的串口接口（库版本不兼容时由调用方回退到逐个写入）
+        """
+        super().__init__(motors)
+        first = next(iter(self.motors.values()))
+        # PassiveMotor的命令最终都经Device._instance.write发送，批量命令走同一个接口
+        self._hat = getattr(first, '_instance', None)
+        if self._hat is None or not callable(getattr(self._hat, 'write', None)):
+            raise ValueError("无法取得BuildHAT串口接口（Device._instance.write）")
+        for motor in self.motors.values():
+            if not isinstance(getattr(motor, 'port', None), int) or not hasattr(motor, '_currentspeed'):
+                raise ValueError("PassiveMotor缺少port或_currentspeed属性，buildhat版本不兼容")
+        self.batched = True
+
+    def _write(self, updates):
+        if not self.batched:
+            super()._write(updates)
+            return
+        command = batch_command([(self.motors[position].port, speed) for position, speed in updates])
+        try:
+            self._hat.write(command.encode())
+        except (AttributeError, TypeError) as e:
+            print(f"批量写入电机命令失败，改为逐个写入: {e}")
+            self.batched = False
+            self.name = PassiveMotorGroup.name
+            super()._write(updates)
+            return
+        self.writes += 1
+        # 绕过了PassiveMotor.start，同步它记录的当前速度，避免之后单独调用时被跳过
+        for position, speed in updates:
+            self.motors[position]._currentspeed = speed
+
+
+class SimulatedMotorGroup(MotorGroup):
+    """模拟电机组：按串口速率模拟写入耗时，记录每个轮子的速度变化"""
+
+    name = "模拟"
+
+    def __init__(self, positions, batched=True, baudrate=115200, overhead=0.0005):
+        """
+        Args:
+            positions: 轮子位置
+            batched: 是否模拟批量写入（False时模拟逐个写入）
+            baudrate: 模拟的串口波特率
+            overhead: 每次写入的固定开销（秒）
+        """
+        super().__init__(positions)
+        self.batched = batched
+        self.name = "模拟批量写入" if batched else "模拟逐个写入"
+        self.byte_time = 10.0 / baudrate  # 每字节含起始位和停止位
+        self.overhead = overhead
+        self.log = []  # [(时间, 位置, 速度)]
+
+    def _send(self, command):
+        time.sleep(self.overhead + len(command) * self.byte_time)
+        self.writes += 1
+        return time.perf_counter()
+
+    def _write(self, updates):
+        ports = {position: index for index, position in enumerate(self.positions)}
+        if self.batched:
+            applied = self._send(batch_command([(ports[p], speed) for p, speed in updates]))
+            times = [applied] * len(updates)
+        else:
+            times = [self._send(batch_command([(ports[p], speed)])) for p, speed in updates]
+        for applied, (position, speed) in zip(times, updates):
+            self.log.append((applied, position, speed))
+
+    @property
+    def speeds(self):
+        """各轮子当前的速度"""
+        return {position: speed or 0.0 for position, speed in self._speeds.items()}
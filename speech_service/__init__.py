@@ -0,0 +1,20 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+阿里云语音服务模块
+管理语音识别和语音合成会话，提供LLM→TTS分句流水线、非阻塞播报队列和语音合成缓存
+"""
+
+from .session_pool import NlsSessionPool, PooledRecognizer
+from .recognition import RecognitionResult, parse_result_text
+from .pipeline import SentenceSplitter, SentencePipeline
+from .speech_queue import (SpeechQueue, SpeechTicket,
+                           PRIORITY_LOW, PRIORITY_NORMAL, PRIORITY_HIGH)
+from .tts_cache import TtsCache
+
+# 导出模块的主要类
+__all__ = ['NlsSessionPool', 'PooledRecognizer', 'RecognitionResult', 'parse_result_text',
+           'SentenceSplitter', 'SentencePipeline',
+           'SpeechQueue', 'SpeechTicket', 'PRIORITY_LOW', 'PRIORITY_NORMAL', 'PRIORITY_HIGH',
+           'TtsCache']
@@ -0,0 +1,202 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+LLM→TTS分句流水线
+
+LLM流式输出的文本按中英文句子边界切分，每一句交给合成线程。合成线程把第N+1句
+合成进新的播放流时，第N句仍在播放，播放器按顺序衔接，因此第一句话合成完就能开口，
+后续句子之间也不会出现空档。
+"""
+
+import queue
+import re
+import threading
+
+# 句末标点（中文和英文）
+_SENTENCE_ENDS = set('。！？!?；;…\n')
+# 句末标点后可能紧跟的引号、括号
+_CLOSERS = set('"\'”’」』）)】》')
+# 句子过长时可以断开的位置
+_SOFT_BREAKS = '，,、：:'
+# 不需要朗读的Markdown符号
+_MARKDOWN = re.compile(r'[*#`>|]+')
+# 常见英文缩写（不含句号），后面的句号不是句末
+_ABBREVIATIONS = {'mr', 'mrs', 'ms', 'dr', 'prof', 'sr', 'jr', 'st', 'mt', 'vs', 'fig', 'approx', 'inc', 'ltd', 'co', 'corp', 'dept', 'est', 'jan', 'feb',
+                  'mar', 'apr', 'jun', 'jul', 'aug', 'sep', 'sept', 'oct', 'nov', 'dec'}
+_LAST_TOKEN = re.compile(r'[^\s"\'“‘(（\[]+$')
+# 带点的缩写，例如e.g、i.e、U.S（最后一个句号之前的部分）
+_DOTTED = re.compile(r'(?:[a-z]\.)+[a-z]')
+
+
+class SentenceSplitter:
+    """增量分句器"""
+
+    def __init__(self, min_chars=4, max_chars=60):
+        """
+        Args:
+            min_chars: 短于此长度的句子与下一句合并，减少合成请求次数
+            max_chars: 超过此长度仍没有句末标点时，在逗号等位置强制断开
+        """
+        self.min_chars = min_chars
+        self.max_chars = max_chars
+        self._buffer = ""
+        self._carry = ""
+
+    def _find_boundary(self):
+        """返回第一个句子的结束位置，没有完整句子时返回None"""
+        buf = self._buffer
+        for i, ch in enumerate(buf):
+            if ch == '.':
+                # 英文句号后面必须是空白，避免把小数点切开；末尾的句号等下一个字符再判断
+                if i + 1 >= len(buf):
+                    return None
+                if not buf[i + 1].isspace():
+                    continue
+                is_end = self._is_sentence_period(buf, i)
+                if is_end is None:
+                    return None
+                if not is_end:
+                    continue
+            elif ch not in _SENTENCE_ENDS:
+                continue
+            end = i + 1
+            while end < len(buf) and (buf[end] in _SENTENCE_ENDS or buf[end] in _CLOSERS):
+                end += 1
+            if end >= len(buf):
+                # 后面可能还有引号或标点，等下一段文本到达再切分
+                return None
+            return end
+        return None
+
+    @staticmethod
+    def _is_sentence_period(buf, i):
+        """判断buf[i]处后面跟着空白的英文句号是否为句末
+
+        缩写（"Mr."、"e.g."、单个字母）后面的句号和后面接小写字母的句号不是句末。
+
+        Returns:
+            bool: 是否为句末；后面还没有出现非空白字符时返回None，等下一段文本再判断
+        """
+        match = _LAST_TOKEN.search(buf, 0, i)
+        token = match.group(0).lower() if match else ""
+        if token in _ABBREVIATIONS or _DOTTED.fullmatch(token) or (len(token) == 1 and token.isalpha()):
+            return False
+        following = buf[i + 1:].lstrip()
+        if not following:
+            return None
+        return not following[0].islower()
+
+    def _emit(self, sentence, sentences):
+        cleaned = _MARKDOWN.sub('', sentence)
+        sentence = cleaned.strip()
+        # 英文句子之间的空白在切分时留在了下一句开头，合并时补回
+        if self._carry and sentence and cleaned[:1].isspace():
+            sentence = " " + sentence
+        sentence = self._carry + sentence
+        # 只有标点没有文字的片段不送去合成
+        if not re.search(r'\w', sentence):
+            self._carry = ""
+            return
+        if len(sentence) < self.min_chars:
+            self._carry = sentence
+            return
+        self._carry = ""
+        sentences.append(sentence)
+
+    def feed(self, text):
+        """输入一段新文本，返回已经完整的句子列表"""
+        self._buffer += text
+        sentences = []
+        while True:
+            end = self._find_boundary()
+            if end is None:
+                break
+            sentence, self._buffer = self._buffer[:end], self._buffer[end:]
+            self._emit(sentence, sentences)
+
+        if len(self._buffer) >= self.max_chars:
+            cut = max(self._buffer.rfind(ch) for ch in _SOFT_BREAKS)
+            if cut < self.min_chars:
+                cut = self.max_chars - 1
+            sentence, self._buffer = self._buffer[:cut + 1], self._buffer[cut + 1:]
+            self._emit(sentence, sentences)
+        return sentences
+
+    def flush(self):
+        """输入结束，返回剩余的文本"""
+        sentences = []
+        rest, self._buffer = self._buffer, ""
+        self._emit(rest, sentences)
+        if self._carry:
+            sentences.append(self._carry)
+            self._carry = ""
+        return sentences
+
+
+class SentencePipeline:
+    """分句合成流水线"""
+
+    def __init__(self, synthesize, splitter=None):
+        """
+        Args:
+            synthesize: 合成一句话的函数，阻塞到合成结束，返回已排入播放队列的PlaybackStream
+            splitter: 分句器，默认使用SentenceSplitter
+        """
+        self.synthesize = synthesize
+        self.splitter = splitter or SentenceSplitter()
+        self.text = ""  # 已收到的完整文本
+        self.playbacks = []
+
+        self._queue = queue.Queue()
+        self._cancelled = False
+        self._worker = threading.Thread(target=self._synthesis_loop, name="SentencePipeline", daemon=True)
+        self._worker.start()
+
+    @property
+    def cancelled(self):
+        return self._cancelled
+
+    def feed(self, delta):
+        """输入LLM新生成的文本"""
+        self.text += delta
+        for sentence in self.splitter.feed(delta):
+            self._queue.put(sentence)
+
+    def _synthesis_loop(self):
+        """合成线程：依次合成每一句，播放由播放器在后台衔接"""
+        while True:
+            sentence = self._queue.get()
+            if sentence is None:
+                break
+            if self._cancelled:
+                continue
+            try:
+                playback = self.synthesize(sentence)
+            except Exception as e:
+                print(f"分句合成失败: {e}")
+                continue
+            if playback is not None:
+                self.playbacks.append(playback)
+                if self._cancelled:
+                    playback.cancel()
+
+    def finish(self):
+        """输入结束：合成剩余文本并等待全部播放完成
+
+        Returns:
+            str: 完整文本
+        """
+        for sentence in self.splitter.flush():
+            self._queue.put(sentence)
+        self._queue.put(None)
+        self._worker.join()
+        for playback in self.playbacks:
+            playback.wait()
+        return self.text
+
+    def cancel(self):
+        """取消尚未合成和尚未播放的内容"""
+        self._cancelled = True
+        for playback in list(self.playbacks):
+            playback.cancel()
@@ -0,0 +1,82 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+识别结果对象
+
+每个识别会话持有自己的RecognitionResult，由SDK回调直接写入中间结果并在结束时完成。
+使用方可以阻塞等待、在asyncio中await，也可以随时读取最新的中间结果，
+多个会话同时进行时互不干扰，也不需要轮询共享标志。
+"""
+
+import asyncio
+import json
+import threading
+from concurrent.futures import Future
+
+
+def parse_result_text(message):
+    """从识别回调消息中取出识别文本，解析失败时返回空字符串"""
+    try:
+        result = json.loads(message)
+    except (TypeError, ValueError):
+        print(f"无法解析识别消息: {message}")
+        return ""
+    # 统一从payload.result字段获取结果，部分消息直接放在result字段
+    if "payload" in result and "result" in result["payload"]:
+        return result["payload"]["result"]
+    return result.get("result", "")
+
+
+class RecognitionResult:
+    """一次识别会话的结果
+
+    future的结果为最终识别文本。会话出错或关闭时若没有最终结果，以最后的中间结果完成，
+    并在error中记录错误消息。
+    """
+
+    def __init__(self):
+        self.future = Future()
+        self.partial = ""  # 最新的中间结果
+        self.error = None
+        self._lock = threading.Lock()
+
+    @property
+    def done(self):
+        return self.future.done()
+
+    @property
+    def text(self):
+        """已完成时为最终结果，否则为最新的中间结果"""
+        if self.future.done():
+            return self.future.result()
+        return self.partial
+
+    def wait(self, timeout=None):
+        """阻塞等待最终结果
+
+        Returns:
+            str: 识别文本；超时返回None
+        """
+        try:
+            return self.future.result(timeout)
+        except Exception:
+            return None
+
+    def __await__(self):
+        return asyncio.wrap_future(self.future).__await__()
+
+    def set_partial(self, text):
+        """记录中间结果（SDK回调线程调用）"""
+        with self._lock:
+            if not self.future.done():
+                self.partial = text
+
+    def resolve(self, text=None, error=None):
+        """完成识别，text为None时使用最后的中间结果"""
+        with self._lock:
+            if self.future.done():
+                return
+            if error is not None:
+                self.error = error
+            self.future.set_result(self.partial if text is None else text)
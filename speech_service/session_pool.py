@@ -0,0 +1,281 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+阿里云语音会话池
+
+NLS SDK的每个识别会话都要新建一次websocket并完成TLS握手。会话池在后台预先建立好
+识别会话（连接已打开、RecognitionStarted已返回），使用方取走时可以直接发送音频；
+取走一个会话时可以顺带预开下一个。Token轮换后，用旧Token建立的会话会被丢弃重建。
+
+SDK的语音合成在start(text)时才建立连接，无法提前打开，因此合成器只由会话池
+按当前Token统一创建。
+"""
+
+import threading
+import time
+
+import nls
+
+from .recognition import RecognitionResult, parse_result_text
+
+
+class PooledRecognizer:
+    """预先建立连接的一句话识别会话
+
+    SDK回调先进入本对象，写入本会话的识别结果(result)后再转发给绑定的使用方；
+    未绑定期间收到的开始消息会暂存，绑定时补发。
+    接口与nls.NlsSpeechRecognizer保持一致（send_audio/stop/shutdown）。
+    """
+
+    CALLBACK_NAMES = ('on_start', 'on_result_changed', 'on_completed', 'on_error', 'on_close')
+
+    def __init__(self, url, token, appkey, profile, start_options):
+        self.token = token
+        self.profile = profile
+        self.start_options = start_options
+        self.opened_at = None
+        self.last_sent = None
+        self.closed = False
+        self.bound = False
+        self.result = RecognitionResult()  # 本会话的识别结果
+
+        self._lock = threading.Lock()
+        self._callbacks = {}
+        self._start_message = None
+
+        self.recognizer = nls.NlsSpeechRecognizer(
+            url=url,
+            token=token,
+            appkey=appkey,
+            on_start=self._on_start,
+            on_result_changed=self._on_result_changed,
+            on_completed=self._on_completed,
+            on_error=self._on_error,
+            on_close=self._on_close
+        )
+
+    def open(self):
+        """建立连接并开始识别（阻塞直到服务端返回RecognitionStarted）"""
+        self.recognizer.start(**self.start_options)
+        self.opened_at = time.monotonic()
+        self.last_sent = self.opened_at
+
+    def bind(self, **callbacks):
+        """绑定使用方的回调函数"""
+        with self._lock:
+            self._callbacks = {name: callbacks.get(name) for name in self.CALLBACK_NAMES}
+            self.bound = True
+            start_message = self._start_message
+        if start_message is not None and self._callbacks['on_start']:
+            self._callbacks['on_start'](start_message)
+
+    def _dispatch(self, name, *args):
+        with self._lock:
+            callback = self._callbacks.get(name)
+        if callback:
+            callback(*args)
+
+    def _on_start(self, message, *args):
+        with self._lock:
+            self._start_message = message
+        self._dispatch('on_start', message)
+
+    def _on_result_changed(self, message, *args):
+        self.result.set_partial(parse_result_text(message))
+        self._dispatch('on_result_changed', message)
+
+    def _on_completed(self, message, *args):
+        self.result.resolve(parse_result_text(message))
+        self._dispatch('on_completed', message)
+
+    def _on_error(self, message, *args):
+        self.closed = True
+        self.result.resolve(error=message)
+        self._dispatch('on_error', message)
+
+    def _on_close(self, *args):
+        self.closed = True
+        self.result.resolve()
+        self._dispatch('on_close')
+
+    def age(self):
+        return 0 if self.opened_at is None else time.monotonic() - self.opened_at
+
+    def send_audio(self, pcm_data):
+        self.recognizer.send_audio(pcm_data)
+        self.last_sent = time.monotonic()
+
+    def stop(self):
+        self.recognizer.stop()
+
+    def shutdown(self):
+        self.closed = True
+        self.result.resolve()
+        try:
+            self.recognizer.shutdown()
+        except Exception:
+            pass
+
+
+class NlsSessionPool:
+    """阿里云语音会话池"""
+
+    def __init__(self, url, appkey, token_provider, profiles, sample_rate=16000,
+                 max_age=20.0, keepalive_interval=2.0, keep_warm=()):
+        """初始化会话池
+
+        Args:
+            url: 阿里云语音服务URL
+            appkey: 阿里云Appkey
+            token_provider: 返回当前有效Token的函数
+            profiles: 识别配置字典，键为配置名，值为recognizer.start的参数
+            sample_rate: 音频采样率
+            max_age: 预开会话的最长保留时间（秒）。一句话识别单次音频上限为60秒，
+                     保活发送的静音也计入其中，因此不宜过长
+            keepalive_interval: 向空闲会话发送静音保活的间隔（秒）
+            keep_warm: 始终保持一个预开会话的配置名
+        """
+        self.url = url
+        self.appkey = appkey
+        self.token_provider = token_provider
+        self.sample_rate = sample_rate
+        self.profiles = {
+            name: dict(options, aformat="pcm", sample_rate=sample_rate)
+            for name, options in profiles.items()
+        }
+        self.max_age = max_age
+        self.keepalive_interval = keepalive_interval
+        self.keep_warm = set(keep_warm)
+
+        self._lock = threading.Lock()
+        self._warm = {}  # 配置名 -> PooledRecognizer
+        self._opening = set()  # 正在后台建立的配置名
+        self._silence = b'\x00\x00' * int(sample_rate * 0.02)  # 20ms静音
+        self._running = True
+        self._maintainer = threading.Thread(target=self._maintain_loop, name="NlsSessionPool", daemon=True)
+        self._maintainer.start()
+
+    # ===== 识别会话 =====
+
+    def _create_recognizer(self, profile):
+        if profile not in self.profiles:
+            raise ValueError(f"未知的识别配置: {profile}")
+        session = PooledRecognizer(self.url, self.token_provider(), self.appkey,
+                                   profile, self.profiles[profile])
+        session.open()
+        return session
+
+    def _is_usable(self, session):
+        return (not session.closed
+                and session.token == self.token_provider()
+                and session.age() < self.max_age)
+
+    def acquire_recognizer(self, profile, prewarm_next=None, **callbacks):
+        """取出一个已开始识别的会话
+
+        Args:
+            profile: 识别配置名
+            prewarm_next: 取走后在后台预开的下一个会话的配置名
+            **callbacks: on_start/on_result_changed/on_completed/on_error/on_close回调
+
+        Returns:
+            PooledRecognizer: 已绑定回调的识别会话
+        """
+        with self._lock:
+            session = self._warm.pop(profile, None)
+        if session is not None and not self._is_usable(session):
+            session.shutdown()
+            session = None
+
+        if session is None:
+            session = self._create_recognizer(profile)
+        else:
+            print(f"使用预开的识别会话 [{profile}]")
+        session.bind(**callbacks)
+
+        if prewarm_next:
+            self.prewarm(prewarm_next)
+        return session
+
+    def prewarm(self, profile):
+        """在后台为指定配置预开一个识别会话"""
+        with self._lock:
+            warm = self._warm.get(profile)
+            if profile in self._opening or (warm is not None and self._is_usable(warm)):
+                return
+            self._opening.add(profile)
+        threading.Thread(target=self._open_in_background, args=(profile,), daemon=True).start()
+
+    def _open_in_background(self, profile):
+        try:
+            session = self._create_recognizer(profile)
+        except Exception as e:
+            print(f"预开识别会话失败 [{profile}]: {e}")
+            session = None
+        with self._lock:
+            self._opening.discard(profile)
+            if session is None:
+                return
+            if not self._running:
+                stale = session
+            else:
+                stale = self._warm.get(profile)
+                self._warm[profile] = session
+        if stale is not None:
+            stale.shutdown()
+
+    def invalidate(self):
+        """关闭所有预开会话（例如Token刷新之后）"""
+        with self._lock:
+            sessions = list(self._warm.values())
+            self._warm.clear()
+        for session in sessions:
+            session.shutdown()
+
+    def _maintain_loop(self):
+        """后台维护：静音保活、淘汰过期或Token失效的会话、补充常驻会话"""
+        while self._running:
+            time.sleep(0.5)
+            now = time.monotonic()
+            expired = []
+            idle = []
+            with self._lock:
+                for profile, session in list(self._warm.items()):
+                    if not self._is_usable(session):
+                        expired.append(self._warm.pop(profile))
+                    elif now - session.last_sent >= self.keepalive_interval:
+                        idle.append((profile, session))
+            # 保活涉及网络发送，不在锁内进行，以免阻塞acquire
+            for profile, session in idle:
+                try:
+                    session.send_audio(self._silence)
+                except Exception:
+                    with self._lock:
+                        if self._warm.get(profile) is session:
+                            del self._warm[profile]
+                    expired.append(session)
+            for session in expired:
+                session.shutdown()
+            for profile in self.keep_warm:
+                self.prewarm(profile)
+
+    # ===== 语音合成 =====
+
+    def create_synthesizer(self, **callbacks):
+        """按当前Token创建语音合成器
+
+        Args:
+            **callbacks: on_metainfo/on_data/on_completed/on_error/on_close回调
+        """
+        return nls.NlsSpeechSynthesizer(
+            url=self.url,
+            token=self.token_provider(),
+            appkey=self.appkey,
+            **callbacks
+        )
+
+    def close(self):
+        """停止后台维护并关闭所有预开会话"""
+        self._running = False
+        self.invalidate()
@@ -0,0 +1,191 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+语音播报队列
+
+提示语交给后台线程按优先级依次合成播放，调用方不必等播放结束。
+每条播报返回一个SpeechTicket，可以直接丢弃（即发即忘）、阻塞等待，也可以在asyncio中await。
+相同coalesce_key的待播消息只保留最新一条，超过max_age仍未开始播放的过期消息会被丢弃，
+高优先级消息可以打断正在播放的内容。
+"""
+
+import asyncio
+import heapq
+import itertools
+import threading
+import time
+from concurrent.futures import Future
+
+# 播报优先级
+PRIORITY_LOW = 0
+PRIORITY_NORMAL = 1
+PRIORITY_HIGH = 2
+
+
+class SpeechTicket:
+    """一条播报的句柄
+
+    future的结果为True表示已完整播放，False表示被合并、过期或取消。
+    """
+
+    def __init__(self, text, priority, coalesce_key, max_age):
+        self.text = text
+        self.priority = priority
+        self.coalesce_key = coalesce_key
+        self.max_age = max_age
+        self.created_at = time.monotonic()
+        self.future = Future()
+        self.playback = None  # 开始播放后对应的PlaybackStream
+
+    @property
+    def done(self):
+        return self.future.done()
+
+    def is_stale(self):
+        return self.max_age is not None and time.monotonic() - self.created_at > self.max_age
+
+    def wait(self, timeout=None):
+        """阻塞等待播报结束
+
+        Returns:
+            bool: 是否完整播放
+        """
+        try:
+            return self.future.result(timeout)
+        except Exception:
+            return False
+
+    def cancel(self):
+        """取消这条播报（未播放的直接丢弃，正在播放的立即停止）"""
+        self._resolve(False)
+        if self.playback is not None:
+            self.playback.cancel()
+
+    def _resolve(self, spoken):
+        if not self.future.done():
+            self.future.set_result(spoken)
+
+    def __await__(self):
+        return asyncio.wrap_future(self.future).__await__()
+
+
+class SpeechQueue:
+    """按优先级排队的非阻塞播报队列"""
+
+    def __init__(self, speak):
+        """
+        Args:
+            speak: 合成一段文本的函数，阻塞到合成结束，返回已排入播放队列的PlaybackStream
+        """
+        self.speak = speak
+        self.current = None  # 正在播放的SpeechTicket
+
+        self._heap = []
+        self._counter = itertools.count()
+        self._cond = threading.Condition()
+        self._running = True
+        self._worker = threading.Thread(target=self._speech_loop, name="SpeechQueue", daemon=True)
+        self._worker.start()
+
+    def say(self, text, priority=PRIORITY_NORMAL, coalesce_key=None, max_age=None, interrupt=False):
+        """排队播报一段文本，立即返回
+
+        Args:
+            text: 播报内容
+            priority: 优先级，数值越大越先播
+            coalesce_key: 相同key的待播消息只保留最新一条
+            max_age: 排队超过此时长（秒）仍未开始播放则丢弃
+            interrupt: 打断正在播放的内容，并丢弃优先级更低的待播消息
+
+        Returns:
+            SpeechTicket: 播报句柄
+        """
+        ticket = SpeechTicket(text, priority, coalesce_key, max_age)
+        with self._cond:
+            if coalesce_key is not None:
+                for _, _, pending in self._heap:
+                    if pending.coalesce_key == coalesce_key:
+                        pending._resolve(False)
+            if interrupt:
+                for _, _, pending in self._heap:
+                    if pending.priority < priority:
+                        pending._resolve(False)
+                current = self.current
+                if current is not None and current.priority <= priority:
+                    current.cancel()
+            heapq.heappush(self._heap, (-priority, next(self._counter), ticket))
+            self._cond.notify()
+        return ticket
+
+    def say_and_wait(self, text, timeout=None, **kwargs):
+        """排队播报并阻塞等待播放结束"""
+        return self.say(text, **kwargs).wait(timeout)
+
+    def clear(self):
+        """取消正在播放和排队中的所有播报"""
+        with self._cond:
+            pending = [ticket for _, _, ticket in self._heap]
+            self._heap.clear()
+            current = self.current
+        for ticket in pending:
+            ticket.cancel()
+        if current is not None:
+            current.cancel()
+
+    def wait_idle(self, timeout=None):
+        """等待队列中的播报全部结束"""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self._cond:
+            while self._heap or self.current is not None:
+                remaining = None if deadline is None else deadline - time.monotonic()
+                if remaining is not None and remaining <= 0:
+                    return False
+                self._cond.wait(remaining)
+        return True
+
+    def _next_ticket(self):
+        with self._cond:
+            while self._running:
+                while self._heap:
+                    _, _, ticket = heapq.heappop(self._heap)
+                    if ticket.done:
+                        continue
+                    if ticket.is_stale():
+                        print(f"丢弃过期播报: {ticket.text}")
+                        ticket._resolve(False)
+                        continue
+                    self.current = ticket
+                    return ticket
+                self._cond.notify_all()
+                self._cond.wait()
+            return None
+
+    def _speech_loop(self):
+        """播报线程：依次合成并播放"""
+        while True:
+            ticket = self._next_ticket()
+            if ticket is None:
+                break
+            try:
+                ticket.playback = self.speak(ticket.text)
+                if ticket.done:
+                    # 合成期间被取消
+                    ticket.playback.cancel()
+                ticket.playback.wait()
+                ticket._resolve(not ticket.playback.cancelled)
+            except Exception as e:
+                print(f"播报失败: {e}")
+                ticket._resolve(False)
+            finally:
+                with self._cond:
+                    self.current = None
+                    self._cond.notify_all()
+
+    def close(self):
+        """停止播报线程"""
+        self.clear()
+        with self._cond:
+            self._running = False
+            self._cond.notify_all()
+        self._worker.join(timeout=2.0)
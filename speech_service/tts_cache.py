@@ -0,0 +1,151 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+语音合成结果缓存
+
+以文本和音色、语速、语调等合成参数计算内容地址，缓存合成好的PCM数据。
+内存层为按字节数限制的LRU，磁盘层把PCM保存为文件，重启后仍然有效，
+按最近访问时间淘汰。固定提示语命中缓存后无需网络即可立即播放。
+"""
+
+import hashlib
+import os
+import threading
+from collections import OrderedDict
+
+
+class TtsCache:
+    """两级（内存LRU + 磁盘）PCM缓存"""
+
+    def __init__(self, cache_dir=None, max_memory_bytes=8 * 1024 * 1024, max_disk_bytes=64 * 1024 * 1024):
+        """
+        Args:
+            cache_dir: 磁盘缓存目录，None表示只使用内存缓存
+            max_memory_bytes: 内存缓存上限（字节）
+            max_disk_bytes: 磁盘缓存上限（字节）
+        """
+        self.cache_dir = cache_dir
+        self.max_memory_bytes = max_memory_bytes
+        self.max_disk_bytes = max_disk_bytes
+        self.hits = 0
+        self.misses = 0
+
+        self._memory = OrderedDict()
+        self._memory_bytes = 0
+        self._lock = threading.Lock()
+
+        if self.cache_dir:
+            try:
+                os.makedirs(self.cache_dir, exist_ok=True)
+            except OSError as e:
+                print(f"无法创建语音缓存目录 {self.cache_dir}: {e}")
+                self.cache_dir = None
+
+    @staticmethod
+    def make_key(text, **params):
+        """根据文本和合成参数计算缓存键"""
+        items = ";".join(f"{name}={params[name]}" for name in sorted(params))
+        return hashlib.sha1(f"{items}\n{text}".encode('utf-8')).hexdigest()
+
+    def _path(self, key):
+        return os.path.join(self.cache_dir, f"{key}.pcm")
+
+    def get(self, key):
+        """读取缓存，未命中返回None"""
+        with self._lock:
+            data = self._memory.get(key)
+            if data is not None:
+                self._memory.move_to_end(key)
+                self.hits += 1
+                return data
+
+        data = self._read_disk(key)
+        with self._lock:
+            if data is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+            self._put_memory(key, data)
+        return data
+
+    def contains(self, key):
+        with self._lock:
+            if key in self._memory:
+                return True
+        return self.cache_dir is not None and os.path.exists(self._path(key))
+
+    def put(self, key, data):
+        """写入缓存（内存和磁盘）"""
+        if not data:
+            return
+        with self._lock:
+            self._put_memory(key, data)
+        self._write_disk(key, data)
+
+    def _put_memory(self, key, data):
+        """调用方需持有锁"""
+        if len(data) > self.max_memory_bytes:
+            return
+        old = self._memory.pop(key, None)
+        if old is not None:
+            self._memory_bytes -= len(old)
+        self._memory[key] = data
+        self._memory_bytes += len(data)
+        while self._memory_bytes > self.max_memory_bytes:
+            _, evicted = self._memory.popitem(last=False)
+            self._memory_bytes -= len(evicted)
+
+    def _read_disk(self, key):
+        if not self.cache_dir:
+            return None
+        path = self._path(key)
+        try:
+            with open(path, 'rb') as f:
+                data = f.read()
+            os.utime(path)  # 更新访问时间用于LRU淘汰
+            return data
+        except FileNotFoundError:
+            return None
+        except OSError as e:
+            print(f"读取语音缓存失败: {e}")
+            return None
+
+    def _write_disk(self, key, data):
+        if not self.cache_dir:
+            return
+        path = self._path(key)
+        try:
+            # 先写临时文件再改名，避免读到写了一半的文件
+            tmp_path = f"{path}.tmp"
+            with open(tmp_path, 'wb') as f:
+                f.write(data)
+            os.replace(tmp_path, path)
+            self._evict_disk()
+        except OSError as e:
+            print(f"写入语音缓存失败: {e}")
+
+    def _evict_disk(self):
+        """磁盘缓存超过上限时删除最久未访问的文件"""
+        entries = []
+        total = 0
+        for name in os.listdir(self.cache_dir):
+            if not name.endswith('.pcm'):
+                continue
+            path = os.path.join(self.cache_dir, name)
+            try:
+                stat = os.stat(path)
+            except OSError:
+                continue
+            entries.append((stat.st_mtime, stat.st_size, path))
+            total += stat.st_size
+        if total <= self.max_disk_bytes:
+            return
+        for _, size, path in sorted(entries):
+            try:
+                os.remove(path)
+            except OSError:
+                continue
+            total -= size
+            if total <= self.max_disk_bytes:
+                break
@@ -0,0 +1,19 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+图像识别模块
+提供常驻摄像头服务、识图前的图片预处理、识图结果的感知哈希缓存、内存编码（JPEG / base64 data URL）和OSS异步归档
+"""
+
+from .encoding import encode_jpeg, to_data_url
+from .archive import OssImageArchiver
+from .camera import CameraService, CameraBackend, OpenCvBackend, LibcameraBackend
+from .preprocess import ImagePreprocessor, ImageRejected, PreprocessResult, DEFAULT_PROFILES
+from .phash_cache import PerceptualCache, phash, dhash
+
+# 导出模块的主要类和函数
+__all__ = ['encode_jpeg', 'to_data_url', 'OssImageArchiver',
+           'CameraService', 'CameraBackend', 'OpenCvBackend', 'LibcameraBackend',
+           'ImagePreprocessor', 'ImageRejected', 'PreprocessResult', 'DEFAULT_PROFILES',
+           'PerceptualCache', 'phash', 'dhash']
@@ -0,0 +1,95 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+OSS图片归档
+
+upload在调用线程中上传并返回预签名URL（视觉模型需要通过URL下载图片时使用）；
+submit把图片交给后台线程上传，只用于留档，不占用识别的关键路径。
+"""
+
+import datetime
+import queue
+import threading
+import uuid
+
+
+class OssImageArchiver:
+    """把拍到的图片上传到OSS"""
+
+    def __init__(self, bucket, prefix="captured_images", url_expires=3600, max_pending=8):
+        """
+        Args:
+            bucket: oss2.Bucket实例
+            prefix: 对象名前缀
+            url_expires: 预签名URL有效期（秒）
+            max_pending: 后台归档队列上限，队列满时丢弃新的归档请求
+        """
+        self.bucket = bucket
+        self.prefix = prefix
+        self.url_expires = url_expires
+
+        self._queue = queue.Queue(maxsize=max_pending)
+        self._worker = None
+        self._lock = threading.Lock()
+
+    def _object_name(self):
+        # 生成唯一文件名
+        timestamp = datetime.datetime.now().strftime("%Y%m%d%H%M%S")
+        return f"{self.prefix}/{timestamp}_{uuid.uuid4().hex[:8]}.jpg"
+
+    def upload(self, jpeg_data):
+        """上传图片并返回预签名URL，失败时返回None"""
+        try:
+            object_name = self._object_name()
+            self.bucket.put_object(object_name, jpeg_data)
+            print(f"文件已上传至OSS: {object_name}")
+
+            # 生成预签名URL
+            signed_url = self.bucket.sign_url('GET', object_name, self.url_expires)
+            print(f"生成预签名URL: {signed_url}")
+            return signed_url
+        except Exception as e:
+            print(f"OSS操作失败: {e}")
+            return None
+
+    def submit(self, jpeg_data):
+        """后台归档图片，立即返回
+
+        Returns:
+            bool: 是否已加入归档队列
+        """
+        with self._lock:
+            if self._worker is None or not self._worker.is_alive():
+                self._worker = threading.Thread(target=self._archive_loop, name="OssImageArchiver", daemon=True)
+                self._worker.start()
+        try:
+            self._queue.put_nowait(jpeg_data)
+            return True
+        except queue.Full:
+            print("OSS归档队列已满，丢弃本张图片")
+            return False
+
+    def _archive_loop(self):
+        while True:
+            jpeg_data = self._queue.get()
+            if jpeg_data is None:
+                break
+            try:
+                object_name = self._object_name()
+                self.bucket.put_object(object_name, jpeg_data)
+                print(f"图片已归档至OSS: {object_name}")
+            except Exception as e:
+                print(f"OSS归档失败: {e}")
+
+    def close(self, timeout=5.0):
+        """等待已提交的归档完成后停止后台线程"""
+        with self._lock:
+            worker = self._worker
+            self._worker = None
+        if worker is not None:
+            try:
+                self._queue.put(None, timeout=timeout)
+            except queue.Full:
+                return
+            worker.join(timeout)
@@ -0,0 +1,265 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+常驻摄像头服务
+
+后台线程保持摄像头打开并持续抓帧，只保留最新一帧，拍照时直接取最新帧，
+不再每次打开设备、预热、关闭。一段时间没有拍照请求后自动关闭设备省电，
+读帧出错时自动重连，并可以按顺序回退到下一个后端。
+
+OpenCV（USB摄像头）和libcamera（树莓派摄像头，libcamera-vid输出MJPEG流）
+两种后端提供相同的接口：open/grab/decode/close。
+"""
+
+import subprocess
+import threading
+import time
+
+import cv2
+import numpy as np
+
+
+class CameraBackend:
+    """摄像头后端接口"""
+
+    name = "camera"
+
+    def open(self):
+        """打开设备"""
+        raise NotImplementedError
+
+    def grab(self):
+        """抓取一帧，返回原始数据（解码推迟到真正需要时）；失败时抛出异常"""
+        raise NotImplementedError
+
+    def decode(self, raw):
+        """把grab返回的原始数据解码为BGR图像"""
+        return raw
+
+    def close(self):
+        """关闭设备"""
+        raise NotImplementedError
+
+
+class OpenCvBackend(CameraBackend):
+    """OpenCV VideoCapture后端"""
+
+    name = "OpenCV"
+
+    def __init__(self, device=0, width=1920, height=1080):
+        # 环境变量读出的设备号是字符串，数字字符串按设备索引处理
+        if isinstance(device, str) and device.isdigit():
+            device = int(device)
+        self.device = device
+        self.width = width
+        self.height = height
+        self._cap = None
+
+    def open(self):
+        cap = cv2.VideoCapture(self.device)
+        if not cap.isOpened():
+            raise Exception(f"无法打开摄像头 {self.device}")
+        cap.set(cv2.CAP_PROP_FRAME_WIDTH, self.width)
+        cap.set(cv2.CAP_PROP_FRAME_HEIGHT, self.height)
+        cap.set(cv2.CAP_PROP_BUFFERSIZE, 1)  # 驱动侧只缓存一帧，避免取到旧画面
+        self._cap = cap
+
+    def grab(self):
+        ret, frame = self._cap.read()
+        if not ret:
+            raise Exception("OpenCV读取画面失败")
+        return frame
+
+    def close(self):
+        if self._cap is not None:
+            self._cap.release()
+            self._cap = None
+
+
+class LibcameraBackend(CameraBackend):
+    """libcamera-vid MJPEG流后端（树莓派专用）
+
+    抓帧时只切出JPEG数据，拍照时才解码，持续运行的开销很小。
+    """
+
+    name = "libcamera"
+
+    def __init__(self, width=1920, height=1080, framerate=5):
+        self.width = width
+        self.height = height
+        self.framerate = framerate
+        self._process = None
+        self._buffer = b''
+
+    def open(self):
+        cmd = ["libcamera-vid", "--codec", "mjpeg", "-t", "0", "-o", "-", "--nopreview",
+               "--width", str(self.width), "--height", str(self.height),
+               "--framerate", str(self.framerate)]
+        self._process = subprocess.Popen(cmd, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL)
+        self._buffer = b''
+
+    def grab(self):
+        # MJPEG流中每帧以FFD8开始、FFD9结束
+        while True:
+            start = self._buffer.find(b'\xff\xd8')
+            end = self._buffer.find(b'\xff\xd9', start + 2) if start >= 0 else -1
+            if end >= 0:
+                jpeg = self._buffer[start:end + 2]
+                self._buffer = self._buffer[end + 2:]
+                return jpeg
+            if start > 0:
+                self._buffer = self._buffer[start:]
+            data = self._process.stdout.read1(65536)
+            if not data:
+                raise Exception(f"libcamera-vid已退出 (返回码 {self._process.poll()})")
+            self._buffer += data
+
+    def decode(self, raw):
+        frame = cv2.imdecode(np.frombuffer(raw, dtype=np.uint8), cv2.IMREAD_COLOR)
+        if frame is None:
+            raise Exception("libcamera画面解码失败")
+        return frame
+
+    def close(self):
+        if self._process is not None:
+            self._process.terminate()
+            try:
+                self._process.wait(timeout=2.0)
+            except subprocess.TimeoutExpired:
+                self._process.kill()
+            self._process = None
+        self._buffer = b''
+
+
+class CameraService:
+    """常驻摄像头服务"""
+
+    def __init__(self, backends, idle_timeout=60.0, warmup_frames=5, reconnect_delay=2.0):
+        """
+        Args:
+            backends: 按优先级排列的CameraBackend列表，打开或读帧失败时依次尝试下一个
+            idle_timeout: 超过这么久没有拍照请求就关闭设备（秒），None表示一直保持打开
+            warmup_frames: 打开设备后丢弃的帧数（自动曝光尚未稳定）
+            reconnect_delay: 所有后端都失败后等待多久再重试（秒）
+        """
+        self.backends = list(backends)
+        self.idle_timeout = idle_timeout
+        self.warmup_frames = warmup_frames
+        self.reconnect_delay = reconnect_delay
+        self.last_error = None
+
+        self._backend = None
+        self._latest = None  # (抓帧时间, 原始数据, 后端)
+        self._last_request = time.monotonic()
+        self._cond = threading.Condition()
+        self._running = False
+        self._thread = None
+
+    @property
+    def is_open(self):
+        return self._backend is not None
+
+    def prewarm(self):
+        """提前打开摄像头（例如识别到拍照唤醒词时），不等待画面"""
+        with self._cond:
+            self._last_request = time.monotonic()
+            if self._thread is None or not self._thread.is_alive():
+                self._running = True
+                self._thread = threading.Thread(target=self._capture_loop, name="CameraService", daemon=True)
+                self._thread.start()
+
+    def snapshot(self, max_age=0.5, timeout=10.0):
+        """取得一帧最新画面
+
+        Args:
+            max_age: 可接受的画面最大时长（秒），缓存的最新帧比这更旧时等待新帧
+            timeout: 最长等待时间（秒）
+
+        Returns:
+            np.ndarray: BGR图像
+        """
+        self.prewarm()
+        requested = time.monotonic()
+        deadline = requested + timeout
+        with self._cond:
+            while self._latest is None or requested - self._latest[0] > max_age:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    raise Exception(f"摄像头拍照超时: {self.last_error or '没有画面'}")
+                self._cond.wait(remaining)
+            captured_at, raw, backend = self._latest
+            self._last_request = time.monotonic()
+        frame = backend.decode(raw)
+        print(f"拍照完成（{backend.name}，画面延迟 {(time.monotonic() - captured_at) * 1000:.0f}ms）")
+        return frame
+
+    def _open_backend(self):
+        """按顺序尝试打开后端，全部失败返回None"""
+        for backend in self.backends:
+            try:
+                backend.open()
+                # 丢弃自动曝光稳定前的画面
+                for _ in range(self.warmup_frames):
+                    backend.grab()
+                print(f"摄像头已打开: {backend.name}")
+                return backend
+            except Exception as e:
+                self.last_error = e
+                print(f"打开摄像头失败 [{backend.name}]: {e}")
+                backend.close()
+        return None
+
+    def _close_backend(self):
+        if self._backend is not None:
+            self._backend.close()
+            self._backend = None
+        with self._cond:
+            self._latest = None
+
+    def _capture_loop(self):
+        """抓帧线程：保持最新一帧，空闲时关闭设备，出错时重连"""
+        handed_off = False
+        try:
+            while self._running:
+                with self._cond:
+                    idle = self.idle_timeout is not None and \
+                        time.monotonic() - self._last_request > self.idle_timeout
+                    if idle:
+                        # 关闭设备和交出线程都在锁内完成，之后的prewarm才会启动新线程，
+                        # 不会出现新线程打开设备时旧线程还在关闭同一个后端
+                        print("摄像头空闲，关闭设备")
+                        self._close_backend()
+                        self._thread = None
+                        handed_off = True
+                        break
+
+                if self._backend is None:
+                    self._backend = self._open_backend()
+                    if self._backend is None:
+                        time.sleep(self.reconnect_delay)
+                        continue
+
+                try:
+                    raw = self._backend.grab()
+                except Exception as e:
+                    self.last_error = e
+                    print(f"摄像头读取失败，重新连接: {e}")
+                    self._close_backend()
+                    continue
+
+                with self._cond:
+                    self._latest = (time.monotonic(), raw, self._backend)
+                    self._cond.notify_all()
+        finally:
+            if not handed_off:
+                self._close_backend()
+
+    def close(self):
+        """停止抓帧并关闭设备"""
+        with self._cond:
+            self._running = False
+            thread = self._thread
+            self._thread = None
+        if thread is not None:
+            thread.join(timeout=3.0)
@@ -0,0 +1,41 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+图片内存编码
+
+拍到的画面直接在内存中缩放、编码为JPEG，再转成base64 data URL放进视觉模型请求的
+image_url字段，不再经过临时文件和OSS中转。
+"""
+
+import base64
+
+import cv2
+
+
+def encode_jpeg(frame, max_side=1024, quality=85):
+    """把BGR画面缩放并编码为JPEG
+
+    Args:
+        frame: OpenCV读取的BGR图像
+        max_side: 长边的最大像素数，超过时等比缩小，None表示不缩放
+        quality: JPEG质量（1~100）
+
+    Returns:
+        bytes: JPEG数据
+    """
+    if max_side is not None:
+        height, width = frame.shape[:2]
+        scale = max_side / max(height, width)
+        if scale < 1.0:
+            frame = cv2.resize(frame, (int(width * scale), int(height * scale)),
+                               interpolation=cv2.INTER_AREA)
+    ok, buffer = cv2.imencode('.jpg', frame, [int(cv2.IMWRITE_JPEG_QUALITY), int(quality)])
+    if not ok:
+        raise Exception("图片编码失败")
+    return buffer.tobytes()
+
+
+def to_data_url(jpeg_data):
+    """把JPEG数据转为base64 data URL"""
+    return "data:image/jpeg;base64," + base64.b64encode(jpeg_data).decode('ascii')
@@ -0,0 +1,139 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+识图结果的感知哈希缓存
+
+对预处理后的画面计算64位感知哈希（pHash或dHash，NumPy实现）。新画面与缓存中某条记录的
+汉明距离不超过阈值时视为同一物品，直接返回上次的识别结果，省去上传和推理。
+所有缓存哈希存放在一个uint64数组中，查找时一次异或、按位计数得到全部距离。
+"""
+
+import threading
+import time
+
+import numpy as np
+
+
+def _area_resize(gray, height, width):
+    """按区域平均把灰度图缩放到指定大小"""
+    g = np.asarray(gray, dtype=np.float32)
+    rows = np.linspace(0, g.shape[0], height + 1).astype(int)
+    cols = np.linspace(0, g.shape[1], width + 1).astype(int)
+    # 每个输出像素对应的区域大小至少为1
+    rows[1:] = np.maximum(rows[1:], rows[:-1] + 1)
+    cols[1:] = np.maximum(cols[1:], cols[:-1] + 1)
+    summed = np.add.reduceat(np.add.reduceat(g, rows[:-1], axis=0), cols[:-1], axis=1)
+    counts = np.outer(np.diff(rows), np.diff(cols))
+    return summed / counts
+
+
+def _bits_to_int(bits):
+    return int.from_bytes(np.packbits(bits.astype(np.uint8).ravel()).tobytes(), 'big')
+
+
+def dhash(gray, hash_size=8):
+    """差值哈希：相邻像素的明暗关系"""
+    small = _area_resize(gray, hash_size, hash_size + 1)
+    return _bits_to_int(small[:, 1:] > small[:, :-1])
+
+
+_DCT_CACHE = {}
+
+
+def _dct_matrix(n):
+    if n not in _DCT_CACHE:
+        k = np.arange(n)[:, None]
+        i = np.arange(n)[None, :]
+        matrix = np.cos(np.pi * (2 * i + 1) * k / (2 * n)) * np.sqrt(2.0 / n)
+        matrix[0] /= np.sqrt(2.0)
+        _DCT_CACHE[n] = matrix.astype(np.float32)
+    return _DCT_CACHE[n]
+
+
+def phash(gray, hash_size=8, highfreq_factor=4):
+    """DCT感知哈希：低频系数相对中位数的高低"""
+    n = hash_size * highfreq_factor
+    small = _area_resize(gray, n, n)
+    dct = _dct_matrix(n)
+    low = (dct @ small @ dct.T)[:hash_size, :hash_size]
+    return _bits_to_int(low > np.median(low.ravel()[1:]))
+
+
+class PerceptualCache:
+    """按感知哈希相似度查找的识图结果缓存"""
+
+    HASHES = {'phash': phash, 'dhash': dhash}
+
+    def __init__(self, max_entries=32, ttl=300.0, threshold=8, method='phash'):
+        """
+        Args:
+            max_entries: 最多保存的记录数，超出时淘汰最久未命中的记录
+            ttl: 记录有效期（秒）
+            threshold: 汉明距离不超过此值视为同一画面（64位哈希）
+            method: 'phash'或'dhash'
+        """
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.threshold = threshold
+        self.hash_func = self.HASHES[method]
+        self.hits = 0
+        self.misses = 0
+
+        self._hashes = np.zeros(0, dtype=np.uint64)
+        self._entries = []  # 与_hashes一一对应: [命名空间, 结果, 写入时间, 最近使用时间]
+        self._lock = threading.Lock()
+
+    def hash(self, gray):
+        """计算灰度画面的感知哈希"""
+        return self.hash_func(gray)
+
+    def _expire(self, now):
+        """调用方需持有锁"""
+        keep = [i for i, entry in enumerate(self._entries) if now - entry[2] <= self.ttl]
+        if len(keep) != len(self._entries):
+            self._hashes = self._hashes[keep]
+            self._entries = [self._entries[i] for i in keep]
+
+    def get(self, image_hash, namespace=None):
+        """查找相似画面的缓存结果
+
+        Returns:
+            (result, distance): 未命中时result为None
+        """
+        now = time.monotonic()
+        with self._lock:
+            self._expire(now)
+            if not self._entries:
+                self.misses += 1
+                return None, None
+            xor = self._hashes ^ np.uint64(image_hash)
+            distances = np.unpackbits(xor.view(np.uint8).reshape(-1, 8), axis=1).sum(axis=1)
+            same = np.array([entry[0] == namespace for entry in self._entries])
+            distances = np.where(same, distances, 65)
+            best = int(np.argmin(distances))
+            distance = int(distances[best])
+            if distance > self.threshold:
+                self.misses += 1
+                return None, distance
+            entry = self._entries[best]
+            entry[3] = now
+            self.hits += 1
+            return entry[1], distance
+
+    def put(self, image_hash, result, namespace=None):
+        """写入一条识别结果"""
+        now = time.monotonic()
+        with self._lock:
+            self._expire(now)
+            if len(self._entries) >= self.max_entries:
+                oldest = min(range(len(self._entries)), key=lambda i: self._entries[i][3])
+                self._hashes = np.delete(self._hashes, oldest)
+                del self._entries[oldest]
+            self._hashes = np.append(self._hashes, np.uint64(image_hash))
+            self._entries.append([namespace, result, now, now])
+
+    def clear(self):
+        with self._lock:
+            self._hashes = np.zeros(0, dtype=np.uint64)
+            self._entries = []
@@ -0,0 +1,200 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+识图前的图片预处理
+
+按请求类型的配置依次执行：质量检查（过暗、模糊的画面直接拒绝，由调用方重拍）、
+中心或显著区域裁剪、缩放、按体积上限选择JPEG质量。亮度、清晰度和显著区域都在
+缩小的灰度图上用NumPy整块计算，每个阶段记录耗时和体积，便于评估节省的流量和延迟。
+"""
+
+import time
+
+import cv2
+import numpy as np
+
+from .encoding import encode_jpeg
+
+# 各类识图请求的预处理配置
+DEFAULT_PROFILES = {
+    # 只需说出画面主体的名字：裁到主体、低分辨率、低细节
+    'object': {
+        'max_side': 768,  # 输出长边像素
+        'crop': 'saliency',  # 'center'、'saliency'或None
+        'crop_ratio': 0.75,  # 裁剪窗口占原图的比例
+        'quality': 80,  # 初始JPEG质量
+        'min_quality': 50,  # 为满足体积上限最多降到的质量
+        'max_bytes': 120 * 1024,  # JPEG体积上限
+        'detail': 'low',  # 视觉模型的detail参数
+        'min_brightness': 35.0,  # 平均亮度下限（0~255）
+        'min_sharpness': 60.0,  # 拉普拉斯方差下限
+    },
+    # 描述整个场景：保留全画面和更多细节
+    'scene': {
+        'max_side': 1280,
+        'crop': None,
+        'crop_ratio': 1.0,
+        'quality': 85,
+        'min_quality': 60,
+        'max_bytes': 400 * 1024,
+        'detail': 'high',
+        'min_brightness': 30.0,
+        'min_sharpness': 30.0,
+    },
+}
+
+
+class ImageRejected(Exception):
+    """画面质量不合格（过暗或模糊）"""
+
+    def __init__(self, reason, message):
+        super().__init__(message)
+        self.reason = reason  # 'dark'或'blurry'
+
+
+class PreprocessResult:
+    """预处理结果"""
+
+    def __init__(self, jpeg, detail, quality, size, input_size):
+        self.jpeg = jpeg
+        self.detail = detail
+        self.quality = quality
+        self.size = size  # 输出图像(宽, 高)
+        self.input_size = input_size  # 输入图像(宽, 高)
+        self.stages = {}  # 阶段名 -> 耗时（毫秒）
+        self.brightness = None
+        self.sharpness = None
+        self.thumbnail = None  # 输出画面的小灰度图，用于感知哈希
+
+    @property
+    def raw_bytes(self):
+        """输入画面未压缩的字节数"""
+        return self.input_size[0] * self.input_size[1] * 3
+
+    @property
+    def saved_bytes(self):
+        return self.raw_bytes - len(self.jpeg)
+
+    def summary(self):
+        stages = "，".join(f"{name} {ms:.1f}ms" for name, ms in self.stages.items())
+        return (f"{self.input_size[0]}x{self.input_size[1]} -> {self.size[0]}x{self.size[1]}，"
+                f"JPEG质量{self.quality} {len(self.jpeg) / 1024:.0f}KB"
+                f"（比原始画面少 {self.saved_bytes / 1024:.0f}KB），{stages}")
+
+
+class ImagePreprocessor:
+    """按请求类型配置的图片预处理器"""
+
+    def __init__(self, profiles=None, analysis_side=320, thumbnail_side=64):
+        """
+        Args:
+            profiles: 配置名 -> 配置字典，未给出的配置项使用DEFAULT_PROFILES中'object'的值
+            analysis_side: 质量检查和显著区域计算使用的缩略图长边像素
+            thumbnail_side: 结果中附带的方形灰度缩略图边长
+        """
+        self.profiles = {}
+        for name, options in (profiles or DEFAULT_PROFILES).items():
+            self.profiles[name] = dict(DEFAULT_PROFILES['object'], **options)
+        self.analysis_side = analysis_side
+        self.thumbnail_side = thumbnail_side
+
+    @staticmethod
+    def _resize_to(image, max_side):
+        height, width = image.shape[:2]
+        scale = max_side / max(height, width)
+        if scale >= 1.0:
+            return image
+        return cv2.resize(image, (max(1, int(width * scale)), max(1, int(height * scale))),
+                          interpolation=cv2.INTER_AREA)
+
+    @staticmethod
+    def measure(gray):
+        """计算灰度图的平均亮度和清晰度（拉普拉斯方差）"""
+        g = gray.astype(np.float32)
+        laplacian = g[1:-1, :-2] + g[1:-1, 2:] + g[:-2, 1:-1] + g[2:, 1:-1] - 4 * g[1:-1, 1:-1]
+        return float(g.mean()), float(laplacian.var())
+
+    @staticmethod
+    def saliency_center(gray):
+        """用梯度能量估计画面主体的中心（相对坐标0~1）"""
+        g = gray.astype(np.float32)
+        energy = np.zeros_like(g)
+        energy[:, 1:] += np.abs(np.diff(g, axis=1))
+        energy[1:, :] += np.abs(np.diff(g, axis=0))
+        # 只保留能量较高的区域，避免大片背景纹理把中心拉偏
+        energy[energy < np.percentile(energy, 75)] = 0
+        total = float(energy.sum())
+        if total <= 0:
+            return 0.5, 0.5
+        rows = np.arange(g.shape[0], dtype=np.float32)
+        cols = np.arange(g.shape[1], dtype=np.float32)
+        cy = float(energy.sum(axis=1) @ rows) / total
+        cx = float(energy.sum(axis=0) @ cols) / total
+        return cx / g.shape[1], cy / g.shape[0]
+
+    def process(self, frame, profile='object', check_quality=True):
+        """预处理一帧画面
+
+        Args:
+            frame: BGR图像
+            profile: 配置名
+            check_quality: 是否做过暗、模糊检查
+
+        Returns:
+            PreprocessResult
+
+        Raises:
+            ImageRejected: 画面过暗或模糊
+        """
+        options = self.profiles[profile]
+        height, width = frame.shape[:2]
+        stages = {}
+
+        # 质量检查：在缩略灰度图上计算
+        start = time.perf_counter()
+        gray = cv2.cvtColor(self._resize_to(frame, self.analysis_side), cv2.COLOR_BGR2GRAY)
+        brightness, sharpness = self.measure(gray)
+        stages['检查'] = (time.perf_counter() - start) * 1000
+        if check_quality:
+            if brightness < options['min_brightness']:
+                raise ImageRejected('dark', f"画面过暗（亮度 {brightness:.0f}）")
+            if sharpness < options['min_sharpness']:
+                raise ImageRejected('blurry', f"画面模糊（清晰度 {sharpness:.0f}）")
+
+        # 裁剪：窗口位置在缩略图上计算，再映射回原图
+        start = time.perf_counter()
+        ratio = options['crop_ratio']
+        if options['crop'] and ratio < 1.0:
+            if options['crop'] == 'saliency':
+                cx, cy = self.saliency_center(gray)
+            else:
+                cx, cy = 0.5, 0.5
+            crop_w, crop_h = int(width * ratio), int(height * ratio)
+            left = min(max(int(cx * width - crop_w / 2), 0), width - crop_w)
+            top = min(max(int(cy * height - crop_h / 2), 0), height - crop_h)
+            frame = frame[top:top + crop_h, left:left + crop_w]
+        stages['裁剪'] = (time.perf_counter() - start) * 1000
+
+        start = time.perf_counter()
+        frame = self._resize_to(frame, options['max_side'])
+        thumbnail = cv2.cvtColor(cv2.resize(frame, (self.thumbnail_side, self.thumbnail_side),
+                                            interpolation=cv2.INTER_AREA), cv2.COLOR_BGR2GRAY)
+        stages['缩放'] = (time.perf_counter() - start) * 1000
+
+        # 编码：超过体积上限时逐步降低质量
+        start = time.perf_counter()
+        quality = options['quality']
+        jpeg = encode_jpeg(frame, max_side=None, quality=quality)
+        while len(jpeg) > options['max_bytes'] and quality - 10 >= options['min_quality']:
+            quality -= 10
+            jpeg = encode_jpeg(frame, max_side=None, quality=quality)
+        stages['编码'] = (time.perf_counter() - start) * 1000
+
+        result = PreprocessResult(jpeg, options['detail'], quality,
+                                  (frame.shape[1], frame.shape[0]), (width, height))
+        result.stages = stages
+        result.brightness = brightness
+        result.sharpness = sharpness
+        result.thumbnail = thumbnail
+        return result
@@ -4,30 +4,33 @@
 import os
 import time
 import json
+import asyncio
+import functools
+import importlib.util
+from concurrent.futures import ThreadPoolExecutor
 import pyaudio
 import numpy as np
-import io
 from dotenv import load_dotenv
 import nls  # 阿里云语音识别SDK
 from aliyunsdkcore.client import AcsClient
 from aliyunsdkcore.request import CommonRequest
-from openai import OpenAI
 from enum import Enum
-import cv2
 import oss2
 from oss2.credentials import EnvironmentVariableCredentialsProvider
-import uuid
-import datetime
-import subprocess
-import re  # 用于正则表达式处理
-from mecanum_wheels import MecanumWheels
-
-# 条件导入BuildHAT库
-try:
-    from buildhat import PassiveMotor
-    BUILDHAT_AVAILABLE = True
-except ImportError:
-    BUILDHAT_AVAILABLE = False
+import sys
+import threading
+from mecanum_wheels import (MecanumWheels, MotionExecutor, parse_motion_text, parse_plan_json,
+                            PLAN_JSON_FORMAT)
+from audio_io import (MicrophoneCapture, VoiceActivityDetector, AudioPlayer,
+                      EchoSuppressor, BargeInDetector, KeywordSpotter)
+from speech_service import NlsSessionPool, SentencePipeline, SpeechQueue, TtsCache, parse_result_text
+from llm_service import LlmClient, CancelToken, ResponseCache, ConversationMemory, Speculator, SpeculativeStream
+from vision import (to_data_url, OssImageArchiver, ImagePreprocessor, ImageRejected,
+                    CameraService, OpenCvBackend, LibcameraBackend, PerceptualCache)
+
+# 检测BuildHAT库是否可用，电机由mecanum_wheels创建
+BUILDHAT_AVAILABLE = importlib.util.find_spec("buildhat") is not None
+if not BUILDHAT_AVAILABLE:
     print("警告: BuildHAT库未安装，电机控制功能将不可用")
 
 
@@ -58,8 +61,9 @@ class VoiceAssistant:
         # 音频参数配置
         self.sample_rate = 16000
         self.silence_threshold = 1.0  # 从2.0秒降低到1.0秒，更快检测到句子结束
-        self.silence_level = 300  # 静默音量阈值，低于此值被视为静默
-        self.speaking_level = 800  # 说话音量阈值，高于此值被视为说话
+        # 音量阈值按帧RMS计算（约为平均绝对值的1.25倍，对应原来的300/800）
+        self.silence_level = 380  # 静默音量阈值（帧RMS），低于此值被视为静默
+        self.speaking_level = 1000  # 说话音量阈值（帧RMS），高于此值被视为说话
         
         # 功能配置
         self.enable_voice_response = True  # 是否启用语音回答
@@ -74,14 +78,25 @@ class VoiceAssistant:
 
         self.is_listening = False  # 是否处于主动监听状态
         
+        # 异步调度：阻塞的SDK调用（nls、oss2、cv2、buildhat等）放到线程池中执行，
+        # 各阶段作为asyncio任务，通过有界队列衔接
+        self.executor = ThreadPoolExecutor(max_workers=8, thread_name_prefix="VoiceAssistant")
+        self.command_queue_size = 1  # 唤醒阶段与指令处理阶段之间的队列长度
+        self.stream_queue_size = 64  # 流式结果（LLM输出等）从线程转到协程的缓冲长度
+        
         # 检查阿里云百炼API配置
         if not self.llm_api_key or self.llm_api_key == "":
             print("警告：未设置阿里云百炼API密钥，请在.env文件中设置DASHSCOPE_API_KEY")
         
-        # 初始化OpenAI客户端
-        self.openai_client = OpenAI(
-            api_key=self.llm_api_key,
-            base_url="https://dashscope.aliyuncs.com/compatible-mode/v1"
+        # LLM客户端：连接池保活、截止时间、重试，主模型超过延迟目标时对冲请求备用模型
+        self.llm = LlmClient(
+            self.llm_api_key,
+            base_url=os.getenv("ALIYUN_LLM_API_URL") or "https://dashscope.aliyuncs.com/compatible-mode/v1",
+            fallback_model=os.getenv("ALIYUN_LLM_FALLBACK_MODEL") or None,
+            slo=float(os.getenv("LLM_SLO", "3.0")) or None,
+            deadline=float(os.getenv("LLM_DEADLINE", "20.0")),
+            max_retries=int(os.getenv("LLM_MAX_RETRIES", "2")),
+            pool_size=int(os.getenv("LLM_POOL_SIZE", "4"))
         )
         
         # 阿里云语音识别配置
@@ -103,32 +118,146 @@ class VoiceAssistant:
             print("警告：未设置阿里云Appkey，请在.env文件中设置ALI_APPKEY")
             print("获取Appkey请前往控制台：https://nls-portal.console.aliyun.com/applist")
         
+        # 识别会话池：预先建立连接，Token轮换后自动重建
+        self.nls_pool = NlsSessionPool(
+            self.ali_url,
+            self.ali_appkey,
+            token_provider=lambda: self.ali_token,
+            profiles={
+                'wake': {'enable_intermediate_result': True},
+                'command': {
+                    'enable_intermediate_result': True,
+                    'enable_punctuation_prediction': True,
+                    'enable_inverse_text_normalization': True  # 启用数字转换功能
+                }
+            },
+            sample_rate=self.sample_rate,
+            keep_warm=[p.strip() for p in os.getenv("NLS_KEEP_WARM", "").split(",") if p.strip()]
+        )
+        
         # 初始化麦克风和音频处理
         self.audio = pyaudio.PyAudio()
+        # 常驻采集线程，所有麦克风读取都通过它的环形缓冲区进行
+        self.microphone = MicrophoneCapture(self.audio, sample_rate=self.sample_rate)
+        self.chunk_size = 1024  # 每次从环形缓冲区读取的采样数
+        self.vad_frame_ms = 20  # VAD帧长（毫秒）
+        self.vad_preroll_ms = 300  # 语音开始前预留的音频时长（毫秒）
+        self.wake_streaming = True  # 唤醒检测时边说边送识别，并在中间结果中匹配唤醒词
+        self.wake_tail_ms = 300  # 中间结果命中唤醒词后，停顿多久即结束本段（毫秒）
+        self.wake_max_speech_ms = 20000  # 唤醒检测时单段语音的最长时长（毫秒）
+        # 本地唤醒词检测：录入模板后，只有本地匹配命中的语音段才送云端识别确认；设为None则关闭
+        self.keyword_spotter = KeywordSpotter(
+            sample_rate=self.sample_rate,
+            threshold=float(os.getenv("KWS_THRESHOLD", "0.3")),
+            template_dir=os.getenv("KWS_TEMPLATE_DIR", "kws_templates") or None
+        )
+        self.kws_extra_ms = 500  # 本地检测前，在最长模板之外再多收集的音频（毫秒）
+        self.enroll_repetitions = 3  # 每个唤醒词录入的模板数
         
-        # 用于阿里云识别结果的变量
-        self.recognition_result = ""
-        self.recognition_cmd = WakeWord.WAKE_NONE
-        self.recognition_completed = False
+        # 识别结果保存在每个会话自己的RecognitionResult中
+        self.recognition_timeout = 2.0  # 结束识别后等待最终结果的最长时间（秒）
+        self.pending_command = ""  # 与唤醒词在同一句话中说出的指令
         
         # 初始化语音合成相关变量
-        self.tts_buffer = None
-        self.tts_completed = False
+        # 写入扬声器的PCM同时作为回声抑制的参考信号
+        self.echo_suppressor = EchoSuppressor(sample_rate=self.sample_rate, frame_ms=self.vad_frame_ms)
+        self.player = AudioPlayer(self.audio, sample_rate=self.sample_rate,
+                                  echo_reference=self.echo_suppressor)  # 常驻输出流
+        self.speech_queue = SpeechQueue(self._speak_sentence)  # 非阻塞播报队列
+        self.tts_streaming = True  # 边合成边播放；为False时合成完成后再播放
+        # 合成参数（同时作为缓存键的一部分）
+        self.tts_voice = "aicheng"  # 默认使用小云音色
+        self.tts_volume = 80  # 音量，取值范围0~100
+        self.tts_speech_rate = 0  # 语速，取值范围-500~500
+        self.tts_pitch_rate = 0  # 语调，取值范围-500~500
+        # 短句合成结果缓存，固定提示语命中后无需联网合成
+        self.tts_cache = TtsCache(os.getenv("TTS_CACHE_DIR", "tts_cache") or None)
+        self.tts_cache_max_chars = 30  # 超过此长度的文本（通常是LLM回答）不缓存
+        # 插话：播放期间检测到用户说话时立即停止播放，转入录制新的指令
+        self.barge_in_enabled = True
+        self.barge_in = BargeInDetector(
+            self.microphone,
+            self.player,
+            self.echo_suppressor,
+            self.on_barge_in,
+            frame_ms=self.vad_frame_ms,
+            speaking_level=self.speaking_level,
+            preroll_ms=self.vad_preroll_ms
+        )
+        self.barge_in_position = None  # 插话语音起点（环形缓冲区绝对位置）
+        self.active_pipeline = None  # 正在播放回答的分句流水线
+        # 启动时预先合成的固定提示语
+        self.static_prompts = [
+            "机器人已启动",
+            "正在检查系统...",
+            "所有功能正常",
+            "你好，我是机器人。我已经准备就绪，请给我指令。",
+            "麦克风可能有问题",
+            "你好，请提问：",
+            "未能识别您的问题，请重试",
+            "准备拍照，请把需要拍照的物品放在摄像头前",
+            "拍照完成，正在处理图片...",
+            "开始分析图片内容，请稍候",
+            "分析过程出现错误，请重试",
+            "好的，如何移动？",
+            "移动方向错误，请重试",
+            "电机不可用",
+        ] + [f"检测到唤醒词: {wake_word['word']}" for wake_word in self.wake_words]
         
         # 图像识别配置
         self.is_raspberry_pi = self._check_raspberry_pi()  # 检测是否为树莓派环境
         self.capture_device = os.getenv("CAPTURE_DEVICE", 0)  # 摄像头设备索引
-        self.image_path = "captured_image.jpg"  # 临时保存路径
+        # 常驻摄像头服务：树莓派优先使用libcamera，失败时回退到OpenCV
+        camera_backends = [OpenCvBackend(self.capture_device)]
+        if self.is_raspberry_pi:
+            camera_backends.insert(0, LibcameraBackend())
+        self.camera = CameraService(
+            camera_backends,
+            idle_timeout=float(os.getenv("CAMERA_IDLE_TIMEOUT", "60"))
+        )
         self.vision_model = "qwen2.5-vl-32b-instruct"  # 视觉模型名称
+        # 图片直接以base64 data URL随请求发送；为False时先上传OSS再把预签名URL交给模型
+        self.vision_inline = os.getenv("VISION_INLINE", "true").lower() == "true"
+        # 识图前的预处理（裁剪、缩放、JPEG质量、过暗/模糊检查），按请求类型配置
+        self.image_preprocessor = ImagePreprocessor()
+        self.vision_retakes = 2  # 画面过暗或模糊时最多重拍的次数
+        # 近似重复画面直接复用上次的识别结果（感知哈希汉明距离不超过阈值）
+        self.vision_cache = PerceptualCache(
+            max_entries=32,
+            ttl=float(os.getenv("VISION_CACHE_TTL", "300")),
+            threshold=int(os.getenv("VISION_CACHE_THRESHOLD", "8"))
+        )
+        self.oss_archive = os.getenv("OSS_ARCHIVE", "false").lower() == "true"  # 内联模式下是否后台归档到OSS
 
         # 初始化麦克纳姆轮
         self.mecanum_wheels = None
+        self.motion = None  # 运动执行器，移动期间不阻塞唤醒检测
         if self.is_raspberry_pi and BUILDHAT_AVAILABLE:
             try:
                 self.mecanum_wheels = MecanumWheels()
+                self.motion = MotionExecutor(self.mecanum_wheels)
                 print("成功初始化麦克纳姆轮控制")
             except Exception as e:
                 print(f"初始化麦克纳姆轮控制失败: {e}")
+        self.motion_stop_words = ["停"]  # 移动期间识别到这些词立即停车，不需要唤醒词
+        # 对话的系统提示词保持不变，便于服务端复用前缀缓存
+        self.chat_system_prompt = ("你是一个有用的助手，请简洁地回答用户的问题。用户问的问题可能是中文，也可能是英文。"
+                                   "但是由于语音识别的缘故，用户的问题可能会有语音识别错误，请尽可能的理解问题，并给出回答。")
+        # 多轮对话记忆：最近几轮保留原文，较早的对话在后台压缩为摘要
+        self.conversation = ConversationMemory(
+            self._summarize_conversation,
+            max_tokens=int(os.getenv("CHAT_HISTORY_TOKENS", "1200")),
+            idle_reset=float(os.getenv("CHAT_IDLE_RESET", "300")),
+            executor=self.executor
+        )
+        # 录制问题时中间结果稳定这么久（秒）就预先请求回答，0表示等最终结果再请求
+        self.speculative_time = float(os.getenv("LLM_SPECULATIVE_MS", "300")) / 1000
+        self.llm_error_reply = "抱歉，我无法处理您的请求。"  # LLM请求失败时的回复
+        # LLM回复缓存：只登记回复确定的处理类别，对话回答不缓存
+        self.llm_cache = ResponseCache(max_entries=256)
+        self.llm_cache.register('move', float(os.getenv("LLM_CACHE_MOVE_TTL", "86400")))
+        # 解析移动指令时要求LLM以JSON模式回复（模型支持response_format时开启）
+        self.llm_json_mode = os.getenv("LLM_JSON_MODE", "false").lower() == "true"
         
         # 添加OSS配置
         self.oss_auth = oss2.ProviderAuthV4(EnvironmentVariableCredentialsProvider())
@@ -141,6 +270,7 @@ class VoiceAssistant:
             self.oss_bucket_name,
             region=self.oss_region  # 这里传入纯region代码
         )
+        self.oss_archiver = OssImageArchiver(self.oss_bucket)
     
     # ===== 阿里云Token管理 =====
     
@@ -164,6 +294,9 @@ class VoiceAssistant:
                 self.ali_token = response_json['Token']['Id']
                 self.token_expire_time = response_json['Token']['ExpireTime']
                 print(f"成功获取阿里云Token，将在 {self.token_expire_time} 过期")
+                # 用旧Token预开的会话作废
+                if hasattr(self, 'nls_pool'):
+                    self.nls_pool.invalidate()
                 return True
             else:
                 print("获取阿里云Token失败：无法解析响应")
@@ -182,73 +315,54 @@ class VoiceAssistant:
             self.get_ali_token()
     
     # ===== 语音识别回调函数 =====
+    # 识别结果由每个会话自己的RecognitionResult保存，这里的回调只负责输出日志
     
     def on_recognition_start(self, message, *args):
         """当一句话识别就绪时的回调函数"""
         print("识别开始:")
-        self.recognition_result = ""
-        self.recognition_completed = False
     
     def on_recognition_result_changed(self, message, *args):
         """当一句话识别返回中间结果时的回调函数"""
-        try:
-            result = json.loads(message)
-            
-            # 统一从payload.result字段获取结果
-            if "payload" in result and "result" in result["payload"]:
-                recognition_text = result["payload"]["result"]
-                self.recognition_result = recognition_text
-                print(f"中间结果: {recognition_text}")
-            
-            # 移除这里的唤醒词检测逻辑
-        except Exception as e:
-            print(f"解析中间结果出错: {e}, 原始消息: {message}")
+        print(f"中间结果: {parse_result_text(message)}")
     
     def on_recognition_completed(self, message, *args):
         """当一句话识别返回最终识别结果时的回调函数"""
-        try:
-            result = json.loads(message)
-            
-            # 根据阿里云文档，最终结果可能在不同位置
-            recognition_text = ""
-            if "payload" in result and "result" in result["payload"]:
-                recognition_text = result["payload"]["result"]
-            elif "result" in result:
-                recognition_text = result["result"]
-            
-            if recognition_text:
-                self.recognition_result = recognition_text
-                print(f"识别完成: {recognition_text}")
-                
-                # 仅在最终结果中检测唤醒词（增加精确匹配逻辑）
-                if not self.is_listening:
-                    for wake_word in self.wake_words:
-                        if wake_word['word'].lower() in recognition_text.strip().lower():
-                            print(f"[完成回调-精确匹配] 检测到唤醒词: {wake_word['word']}")
-
-                            self.recognition_cmd = wake_word['cmd']
-
-                            if not self.is_listening:
-                                self.is_listening = True
-                                print(f"唤醒成功! [{wake_word['word']}]")
-                                
-                                # 重置识别结果
-                                self.recognition_result = ""
-                                self.recognition_completed = False
-
-                            break
-            else:
-                print(f"无法从完成结果中提取文本，原始消息: {message}")
-            
-            self.recognition_completed = True
-        except Exception as e:
-            print(f"解析完成结果出错: {e}, 原始消息: {message}")
-            self.recognition_completed = True
+        recognition_text = parse_result_text(message)
+        if recognition_text:
+            print(f"识别完成: {recognition_text}")
+        else:
+            print(f"无法从完成结果中提取文本，原始消息: {message}")
+    
+    def _match_wake_word(self, text):
+        """在识别文本中查找唤醒词
+
+        Returns:
+            (wake_word, remainder): 匹配到的唤醒词配置和其后的文本，未匹配时为(None, "")
+        """
+        text = text.strip()
+        for wake_word in self.wake_words:
+            index = text.lower().find(wake_word['word'].lower())
+            if index >= 0:
+                return wake_word, text[index + len(wake_word['word']):].strip(" ，,。.！!？?")
+        return None, ""
+
+    def _check_motion_stop(self, text):
+        """移动期间识别文本中出现停车词时停止运动
+
+        Returns:
+            bool: 是否已停车
+        """
+        if self.motion is None or not self.motion.is_moving or not text:
+            return False
+        if any(word in text for word in self.motion_stop_words):
+            print(f"检测到停车指令: {text}")
+            self.motion.stop()
+            return True
+        return False
     
     def on_recognition_error(self, message, *args):
         """当SDK或云端出现错误时的回调函数"""
         print(f"识别错误: {message}")
-        self.recognition_completed = True
     
     def on_recognition_close(self, *args):
         """当和云端连接断开时的回调函数"""
@@ -262,24 +376,44 @@ class VoiceAssistant:
     
     def on_tts_data(self, data, *args):
         """语音合成数据回调函数"""
-        # 将音频数据写入缓冲区
-        if hasattr(self, 'tts_buffer') and self.tts_buffer:
-            self.tts_buffer.write(data)
+        # 将音频数据写入本次合成对应播放流的抖动缓冲区，并留存一份用于缓存（通过callback_args传入）
+        playback, capture = args[0], args[1]
+        if playback is not None:
+            playback.write(data)
+        if capture is not None:
+            capture['chunks'].append(bytes(data))
     
     def on_tts_completed(self, message, *args):
         """语音合成完成回调函数"""
         print("语音合成完成")
-        self.tts_completed = True
+        if len(args) > 1 and args[1] is not None:
+            args[1]['completed'] = True
     
     def on_tts_error(self, message, *args):
         """语音合成错误回调函数"""
         print(f"语音合成错误: {message}")
-        self.tts_completed = True
     
     def on_tts_close(self, *args):
         """语音合成连接关闭回调函数"""
         print("语音合成连接关闭")
     
+    # ===== 插话处理 =====
+    
+    def on_barge_in(self, position):
+        """用户插话回调（插话检测线程调用）：取消正在播放和待合成的内容"""
+        self.barge_in_position = position
+        self.speech_queue.clear()
+        pipeline = self.active_pipeline
+        if pipeline is not None:
+            pipeline.cancel()
+        self.player.cancel_all()
+    
+    def _take_barge_in(self):
+        """取出尚未处理的插话语音起点，没有插话时返回None"""
+        position = self.barge_in_position
+        self.barge_in_position = None
+        return position
+    
     # ===== 核心功能 =====
     
     def wait_for_wake_word(self):
@@ -287,242 +421,387 @@ class VoiceAssistant:
         print("\n正在等待唤醒词...")
 
         result = WakeWord.WAKE_NONE
+        self.pending_command = ""
+        early_wake = None  # 当前语音段的中间结果中命中的唤醒词
         
-        # 创建本地音频流
-        stream = self.audio.open(
-            format=pyaudio.paInt16,
-            channels=1,
-            rate=self.sample_rate,
-            input=True,
-            frames_per_buffer=1024
-        )
+        # 采集线程异常退出时尝试重新打开设备
+        if not self.microphone.is_running:
+            self.microphone.start()
         
-        audio_buffer = []
-        is_speaking = False
+        # 从共享环形缓冲区的当前位置开始读取
+        reader = self.microphone.create_reader()
+        vad = self._create_vad(max_speech_ms=self.wake_max_speech_ms)
+        vad.reset(reader.position)
+        default_hangover = vad.hangover_frames
+        segment_start = reader.position
+        
+        recognizer = None  # 流式模式下当前语音段的识别会话
+        sent_position = reader.position  # 已送入识别器的音频位置
+        # 当前语音段的本地检测状态: 'gating'等待本地检测，'accepted'送云端识别，'rejected'忽略
+        segment_state = 'accepted'
+        kws_samples = self._kws_samples()
         
         try:
             while not self.is_listening:
-                data = stream.read(1024, exception_on_overflow=False)
-                audio_data = np.frombuffer(data, dtype=np.int16)
-                current_level = np.abs(audio_data).mean()
-                
+                # 至少等待一帧，积压的数据（例如识别期间采集的）一次性批量处理
+                audio_data = reader.read_block(vad.frame_size, max_samples=self.sample_rate)
+                if audio_data is None:
+                    raise Exception("麦克风采集已停止")
+                    
                 # 语音活动检测
-                if current_level > self.speaking_level:
-                    if not is_speaking:  # 检测到语音开始
+                for event in vad.process(audio_data):
+                    if event.kind == 'start':
                         print("检测到语音开始")
-                        is_speaking = True
-                        audio_buffer = [data]  # 重置缓冲区
+                        segment_start = event.position
+                        # 移动期间每段语音都送云端识别，以便及时听到"停"
+                        moving = self.motion is not None and self.motion.is_moving
+                        segment_state = 'gating' if kws_samples and not moving else 'accepted'
+                        if segment_state == 'accepted' and self.wake_streaming:
+                            # 语音一开始就建立识别会话，预录部分稍后随积压数据一起发送
+                            recognizer = self._open_wake_stream()
+                            sent_position = segment_start
+                        continue
+                    
+                    if segment_state == 'gating':
+                        # 语音段比最长模板还短，结束时再做本地检测
+                        segment_state = self._spot_keyword(segment_start, event.position)
+                    if segment_state == 'rejected':
+                        print("检测到语音结束，本地未检测到唤醒词，忽略")
+                        continue
+                    
+                    if recognizer is not None:
+                        # 流式模式：语音段已边说边发送，只需结束会话等待最终结果
+                        print("检测到语音结束，等待识别结果...")
+                        self._send_ring_audio(recognizer, sent_position, event.position)
+                        text = self._finish_recognition(recognizer)
+                        recognizer = None
+                        vad.hangover_frames = default_hangover
                     else:
-                        audio_buffer.append(data)
-                elif is_speaking:
-                    # 持续静默检测
-                    silent_frames = 0
-                    while silent_frames < int(self.silence_threshold * self.sample_rate / 1024):
-                        data = stream.read(1024, exception_on_overflow=False)
-                        audio_data = np.frombuffer(data, dtype=np.int16)
-                        current_level = np.abs(audio_data).mean()
-                        
-                        if current_level < self.silence_level:
-                            silent_frames += 1
-                        else:
-                            audio_buffer.append(data)
-                            silent_frames = 0  # 重置静默计数器
+                        # 发送完整语音段（含预录部分）到阿里云识别，识别期间采集线程继续写入缓冲区
+                        print("检测到语音结束，开始识别...")
+                        segment = self.microphone.read_range(segment_start, event.position)
+                        text = self._process_audio_chunk(segment.tobytes())
                     
-                    # 发送完整语音段到阿里云识别
-                    print("检测到语音结束，开始识别...")
-                    self._process_audio_chunk(b''.join(audio_buffer))
+                    if self._check_motion_stop(text):
+                        early_wake = None
+                        continue
                     
-                    result = self.recognition_cmd
-
-                    # 重置状态
-                    is_speaking = False
-                    audio_buffer = []
+                    # 在最终结果中精确匹配唤醒词，未命中但中间结果命中过时仍按唤醒处理
+                    wake_word, remainder = self._match_wake_word(text)
+                    if wake_word is None and early_wake is not None:
+                        wake_word, remainder = early_wake, ""
+                        print("唤醒成功! [中间结果]")
+                    early_wake = None
+                    if wake_word is not None:
+                        print(f"唤醒成功! [{wake_word['word']}]")
+                        result = wake_word['cmd']
+                        # 唤醒词后面紧跟的内容作为指令保留，例如"你好机器人，今天天气怎么样"
+                        self.pending_command = remainder
+                        self.is_listening = True
+                        break
                 
-                time.sleep(0.1)
-
+                if segment_state == 'gating' and vad.is_speaking and \
+                   reader.position - segment_start >= kws_samples:
+                    # 已收集到足够的音频，本地检测通过后才建立云端识别会话
+                    segment_state = self._spot_keyword(segment_start, reader.position)
+                    if segment_state == 'accepted' and self.wake_streaming:
+                        recognizer = self._open_wake_stream()
+                        sent_position = segment_start
+                
+                if recognizer is not None and not self.is_listening:
+                    # 用户还在说话，把新读到的音频继续送入识别器
+                    if self._send_ring_audio(recognizer, sent_position, reader.position):
+                        sent_position = reader.position
+                    else:
+                        # 会话已断开，本段改为结束后整段识别
+                        self._finish_recognition(recognizer)
+                        recognizer = None
+                        continue
+                    # 中间结果中出现停车词时不等本段结束就停车
+                    self._check_motion_stop(recognizer.result.partial)
+                    if early_wake is None:
+                        early_wake, _ = self._match_wake_word(recognizer.result.partial)
+                        if early_wake is not None:
+                            # 中间结果已出现唤醒词，缩短拖尾：停顿片刻即结束本段，
+                            # 继续说下去的内容会作为指令保留在最终结果中
+                            print(f"[中间结果] 检测到唤醒词: {early_wake['word']}")
+                            vad.hangover_frames = max(1, self.wake_tail_ms // self.vad_frame_ms)
         finally:
-            stream.close()
+            if recognizer is not None:
+                self._finish_recognition(recognizer)
 
         return result
     
+    def _kws_samples(self):
+        """本地检测前需要收集的采样数，未启用本地检测时返回0"""
+        spotter = self.keyword_spotter
+        if spotter is None or not spotter.ready:
+            return 0
+        extra = self.sample_rate * self.kws_extra_ms // 1000
+        return min(spotter.max_template_samples + extra, spotter.search_samples)
+    
+    def _spot_keyword(self, start, end):
+        """对环形缓冲区中[start, end)的语音做本地唤醒词检测
+
+        Returns:
+            str: 'accepted'或'rejected'
+        """
+        segment = self.microphone.read_range(start, end)
+        return 'accepted' if self.keyword_spotter.detect(segment) else 'rejected'
+    
+    def _capture_utterance(self, timeout=10.0):
+        """用VAD截取下一段完整语音
+
+        Returns:
+            np.ndarray: int16采样，超时返回None
+        """
+        reader = self.microphone.create_reader()
+        vad = self._create_vad(max_speech_ms=5000)
+        vad.reset(reader.position)
+        vad.hangover_frames = max(1, 500 // self.vad_frame_ms)
+        deadline = reader.position + int(timeout * self.sample_rate)
+        start = None
+        while reader.position < deadline or start is not None:
+            audio_data = reader.read_block(vad.frame_size, max_samples=self.sample_rate)
+            if audio_data is None:
+                return None
+            for event in vad.process(audio_data):
+                if event.kind == 'start':
+                    start = event.position
+                elif start is not None:
+                    return self.microphone.read_range(start, event.position)
+        return None
+    
+    def enroll_wake_words(self, repetitions=None):
+        """依次录入每个唤醒词的本地检测模板"""
+        repetitions = repetitions or self.enroll_repetitions
+        if not self.microphone.is_running:
+            self.microphone.start()
+        for wake_word in self.wake_words:
+            self.keyword_spotter.clear(wake_word['word'])
+            count = 0
+            while count < repetitions:
+                self.text_to_speech(f"请说：{wake_word['word']}")
+                segment = self._capture_utterance()
+                if segment is None:
+                    self.text_to_speech("没有听到，请再说一遍")
+                    continue
+                try:
+                    self.keyword_spotter.enroll(wake_word['word'], segment)
+                    count += 1
+                except ValueError as e:
+                    print(e)
+                    self.text_to_speech("录音太短，请再说一遍")
+        self.text_to_speech("唤醒词录入完成")
+    
+    def _create_vad(self, max_speech_ms=None):
+        """按当前音频参数创建语音活动检测器"""
+        return VoiceActivityDetector(
+            sample_rate=self.sample_rate,
+            frame_ms=self.vad_frame_ms,
+            speaking_level=self.speaking_level,
+            silence_level=self.silence_level,
+            hangover_ms=int(self.silence_threshold * 1000),
+            preroll_ms=self.vad_preroll_ms,
+            max_speech_ms=max_speech_ms
+        )
+    
+    def _open_wake_stream(self):
+        """为唤醒检测建立一个流式识别会话"""
+        # 检查token是否有效
+        self.check_token()
+        
+        try:
+            # 优先使用会话池中预开的会话（NLS_KEEP_WARM包含wake时常驻一个），
+            # 不在每段语音后预开下一个，以免未用到的会话成倍增加云端调用
+            return self.nls_pool.acquire_recognizer('wake', **self._recognition_callbacks())
+        except Exception as e:
+            print(f"建立流式识别会话失败: {e}")
+            return None
+    
+    def _recognition_callbacks(self):
+        """识别会话使用的回调函数"""
+        return {
+            'on_start': self.on_recognition_start,
+            'on_result_changed': self.on_recognition_result_changed,
+            'on_completed': self.on_recognition_completed,
+            'on_error': self.on_recognition_error,
+            'on_close': self.on_recognition_close
+        }
+    
+    def _send_ring_audio(self, recognizer, start, end):
+        """把环形缓冲区中[start, end)的音频送入识别器
+
+        Returns:
+            bool: 发送成功返回True
+        """
+        segment = self.microphone.read_range(start, end)
+        if not len(segment):
+            return True
+        try:
+            recognizer.send_audio(segment.tobytes())
+            return True
+        except Exception as e:
+            print(f"发送音频失败: {e}")
+            return False
+    
+    def _finish_recognition(self, recognizer):
+        """结束识别会话并等待最终结果
+
+        Returns:
+            str: 识别文本，没有最终结果时为最后的中间结果
+        """
+        try:
+            recognizer.stop()
+        except Exception as e:
+            print(f"结束识别失败: {e}")
+        text = recognizer.result.wait(self.recognition_timeout)
+        recognizer.shutdown()
+        return recognizer.result.text if text is None else text
+    
     def _process_audio_chunk(self, audio_data):
-        """处理单个语音片段"""
+        """识别单个语音片段
+
+        Returns:
+            str: 识别文本，失败时为空字符串
+        """
         # 检查token是否有效
         self.check_token()
 
-        # 直接创建识别器实例（原_create_recognizer方法的逻辑内联）
-        recognizer = nls.NlsSpeechRecognizer(
-            url=self.ali_url,
-            token=self.ali_token,
-            appkey=self.ali_appkey,
-            on_start=self.on_recognition_start,
-            on_result_changed=self.on_recognition_result_changed,
-            on_completed=self.on_recognition_completed,
-            on_error=self.on_recognition_error,
-            on_close=self.on_recognition_close
-        )
+        try:
+            # 从会话池取出已开始识别的会话
+            recognizer = self.nls_pool.acquire_recognizer('wake', **self._recognition_callbacks())
+        except Exception as e:
+            print(f"语音段处理失败: {e}")
+            return ""
         
         try:
-            # 开始识别
-            recognizer.start(
-                aformat="pcm",
-                sample_rate=self.sample_rate,
-                enable_intermediate_result=True
-            )
-            
             # 分片发送音频数据（模拟实时流）
             chunk_size = 1024
             for i in range(0, len(audio_data), chunk_size):
                 chunk = audio_data[i:i+chunk_size]
                 recognizer.send_audio(chunk)
                 time.sleep(0.01)  # 模拟实时流间隔
-            
-            # 停止识别
-            recognizer.stop()
-            
-            # 等待结果
-            timeout = 0
-            while not self.recognition_completed and timeout < 5:
-                time.sleep(0.1)
-                timeout += 1
-                        
         except Exception as e:
             print(f"语音段处理失败: {e}")
-        finally:
-            recognizer.shutdown()
+        
+        # 停止识别，最终结果由回调写入本会话的结果对象
+        return self._finish_recognition(recognizer)
     
-    def record_command(self):
-        """使用阿里云一句话识别录制用户命令"""
+    def record_command(self, start_position=None, on_partial=None):
+        """使用阿里云一句话识别录制用户命令
+
+        Args:
+            start_position: 从环形缓冲区的这个位置开始录制（例如插话的语音起点），默认从当前位置开始
+            on_partial: on_partial(text, seconds)，每个音频块发送后以最新的中间结果和已录制的时长调用
+
+        Returns:
+            str: 识别文本，没有识别到内容或出错时为空字符串
+        """
         print("请说出您的问题...")
         
         # 检查token是否有效
         self.check_token()
         
-        # 创建阿里云识别器（直接实例化）
-        recognizer = nls.NlsSpeechRecognizer(
-            url=self.ali_url,
-            token=self.ali_token,
-            appkey=self.ali_appkey,
-            on_start=self.on_recognition_start,
-            on_result_changed=self.on_recognition_result_changed,
-            on_completed=self.on_recognition_completed,
-            on_error=self.on_recognition_error,
-            on_close=self.on_recognition_close
-        )
-        
-        stream = self.audio.open(
-            format=pyaudio.paInt16,
-            channels=1,
-            rate=self.sample_rate,
-            input=True,
-            frames_per_buffer=1024
-        )
+        # 从共享环形缓冲区读取，不再单独打开输入流
+        reader = self.microphone.create_reader(start_position)
+        vad = self._create_vad()
+        vad.reset(reader.position)
+        start_position = reader.position
         
-        frames = []
-        silence_frames = 0
         speaking_started = False
-        no_speech_timeout = int(5 * self.sample_rate / 1024)  # 5秒无语音则超时
-        no_speech_counter = 0
+        no_speech_timeout = 5 * self.sample_rate  # 5秒无语音则超时（采样数）
+        no_update_threshold = 2 * self.sample_rate  # 识别结果2秒没有更新（采样数）
         
         try:
-            # 开始识别
-            recognizer.start(
-                aformat="pcm",
-                sample_rate=self.sample_rate,
-                enable_intermediate_result=True,
-                enable_punctuation_prediction=True,
-                enable_inverse_text_normalization=True  # 启用数字转换功能
-            )
-            
-            self.recognition_completed = False
-            self.recognition_result = ""
+            # 从会话池取出识别会话，唤醒后通常已在后台预开
+            recognizer = self.nls_pool.acquire_recognizer('command', **self._recognition_callbacks())
+        except Exception as e:
+            print(f"录制命令时出错: {e}")
+            return ""
+        
+        result = recognizer.result  # 本会话的识别结果，由回调直接写入
+        try:
             last_result_length = 0
-            no_new_result_counter = 0
+            last_result_position = reader.position
             
             while True:
-                data = stream.read(1024, exception_on_overflow=False)
-                frames.append(data)
+                audio_data = reader.read_block(vad.frame_size, max_samples=self.sample_rate)
+                if audio_data is None:
+                    raise Exception("麦克风采集已停止")
+                data = audio_data.tobytes()
                 
-                # 计算当前音频帧的音量级别
-                audio_data = np.frombuffer(data, dtype=np.int16)
-                current_level = np.abs(audio_data).mean()
+                # 语音活动检测
+                speech_ended = False
+                for event in vad.process(audio_data):
+                    if event.kind == 'start':
+                        speaking_started = True
+                    elif event.kind == 'end':
+                        speech_ended = True
                 
-                # 检测是否开始说话
-                if current_level > self.speaking_level:  # 音量高于阈值，认为开始说话
-                    speaking_started = True
-                    silence_frames = 0
-                    no_speech_counter = 0
-                elif speaking_started:
-                    # 如果音量低于阈值，增加静默帧计数
-                    if current_level < self.silence_level:
-                        silence_frames += 1
-                    else:
-                        silence_frames = max(0, silence_frames - 1)  # 如果又检测到声音，减少静默计数
-                else:
+                if not speaking_started and reader.position - start_position >= no_speech_timeout:
                     # 如果还没开始说话，检查超时
-                    no_speech_counter += 1
-                    if no_speech_counter >= no_speech_timeout:
-                        print("等待说话超时")
-                        if self.recognition_result:  # 如果有识别结果，也返回
-                            recognizer.stop()
-                            break
-                        recognizer.stop()
-                        return "", []
+                    print("等待说话超时")
+                    if result.partial:  # 如果有识别结果，也返回
+                        break
+                    recognizer.stop()
+                    recognizer.shutdown()
+                    return ""
                 
                 # 发送音频数据给阿里云识别器
                 recognizer.send_audio(data)
                 
                 # 检查识别结果是否有更新
-                if len(self.recognition_result) > last_result_length:
-                    last_result_length = len(self.recognition_result)
-                    no_new_result_counter = 0
-                else:
-                    no_new_result_counter += 1
+                partial = result.partial
+                if len(partial) > last_result_length:
+                    last_result_length = len(partial)
+                    last_result_position = reader.position
+                no_update = reader.position - last_result_position > no_update_threshold
+                if on_partial is not None and partial:
+                    on_partial(partial, (reader.position - start_position) / self.sample_rate)
                 
                 # 满足以下任一条件则结束录制：
-                # 1. 连续静默帧超过阈值
+                # 1. VAD判定语音结束（连续静默超过阈值）
                 # 2. 阿里云识别完成
                 # 3. 识别结果长时间没有更新且已经有内容
-                silence_threshold_frames = int(self.silence_threshold * self.sample_rate / 1024)
-                no_update_threshold = int(2 * self.sample_rate / 1024)
-                
-                if (speaking_started and silence_frames > silence_threshold_frames) or \
-                   self.recognition_completed or \
-                   (speaking_started and no_new_result_counter > no_update_threshold and self.recognition_result):
+                if speech_ended or \
+                   result.done or \
+                   (speaking_started and no_update and partial):
                     print("检测到句子结束")
-                    recognizer.stop()
                     break
-
-                time.sleep(0.1)
         except Exception as e:
             print(f"录制命令时出错: {e}")
             try:
                 recognizer.stop()
             except:
                 pass
-            return "", []
-        
-        finally:
-            # 确保关闭流
-            stream.close()
-        
-        # 等待识别完成
-        timeout = 0
-        while not self.recognition_completed and timeout < 20:
-            time.sleep(0.1)
-            timeout += 1
+            recognizer.shutdown()
+            return ""
         
-        result_text = self.recognition_result
+        # 结束识别并等待最终结果
+        result_text = self._finish_recognition(recognizer)
         print(f"阿里云识别结果: {result_text}")
         
-        return result_text, frames
+        return result_text
     
-    def get_llm_response(self, prompt, system_prompt=None):
-        """从阿里云百炼DeepSeek获取回答"""
+    def get_llm_response(self, prompt, system_prompt=None, cache=None, **options):
+        """从阿里云百炼DeepSeek获取回答
+
+        Args:
+            cache: 回复缓存的处理类别，类别已在llm_cache中登记时相同的指令直接返回缓存的回复
+            options: 覆盖默认值的请求参数，例如temperature、response_format
+        """
+        if cache is not None:
+            cached = self.llm_cache.get(cache, system_prompt, prompt)
+            if cached is not None:
+                print(f"LLM回复缓存命中 [{cache}]")
+                return cached
         try:
             print(f"正在使用阿里云百炼模型 {self.llm_model} 处理问题...")
             
-            completion = self.openai_client.chat.completions.create(
+            request = {'temperature': 0.6, 'max_tokens': 4096}
+            request.update(options)
+            completion = self.llm.create(
                 model=self.llm_model,
                 messages=[
                     {
@@ -531,8 +810,7 @@ class VoiceAssistant:
                     },
                     {"role": "user", "content": prompt}
                 ],
-                temperature=0.6,
-                max_tokens=4096
+                **request
             )
             
             # 提取模型回答
@@ -542,205 +820,471 @@ class VoiceAssistant:
             if hasattr(completion.choices[0].message, 'reasoning_content') and completion.choices[0].message.reasoning_content:
                 print(f"模型推理过程: {completion.choices[0].message.reasoning_content}")
             
+            if cache is not None:
+                self.llm_cache.put(cache, system_prompt, prompt, answer)
             return answer
                 
         except Exception as e:
             print(f"LLM响应错误: {e}")
-            return "抱歉，我无法处理您的请求。"
+            return self.llm_error_reply
     
-    def text_to_speech(self, text):
-        """使用阿里云语音合成将文本转换为语音并播放"""
+    def stream_llm_response(self, prompt, system_prompt=None, messages=None, cancel=None):
+        """从阿里云百炼流式获取回答，逐段产出生成的文本
+
+        Args:
+            messages: 完整的消息列表（例如带有对话历史），给出时忽略prompt和system_prompt
+            cancel: CancelToken，取消时关闭连接，生成器直接结束
+        """
         try:
-            # 检查token是否有效
-            self.check_token()
-            
-            # 准备一个内存缓冲区来存储音频数据
-            self.tts_buffer = io.BytesIO()
-            self.tts_completed = False
+            print(f"正在使用阿里云百炼模型 {self.llm_model} 处理问题（流式）...")
             
-            # 创建阿里云语音合成器
-            tts = nls.NlsSpeechSynthesizer(
-                url=self.ali_url,
-                token=self.ali_token,
-                appkey=self.ali_appkey,
-                on_metainfo=self.on_tts_metainfo,
-                on_data=self.on_tts_data,
-                on_completed=self.on_tts_completed,
-                on_error=self.on_tts_error,
-                on_close=self.on_tts_close
+            completion = self.llm.stream(
+                model=self.llm_model,
+                messages=messages or [
+                    {
+                        "role": "system", 
+                        "content": system_prompt
+                    },
+                    {"role": "user", "content": prompt}
+                ],
+                temperature=0.6,
+                max_tokens=4096,
+                cancel=cancel
             )
             
-            # 开始语音合成
-            print("开始语音合成...")
+            reasoning_content = ""
+            for chunk in completion:
+                if not chunk.choices:
+                    continue
+                delta = chunk.choices[0].delta
+                if hasattr(delta, 'reasoning_content') and delta.reasoning_content:
+                    reasoning_content += delta.reasoning_content
+                if delta.content:
+                    yield delta.content
+            
+            # 如果有推理过程，打印出来（仅供调试）
+            if reasoning_content:
+                print(f"模型推理过程: {reasoning_content}")
+                
+        except Exception as e:
+            if cancel is not None and cancel.cancelled:
+                return
+            print(f"LLM响应错误: {e}")
+            yield self.llm_error_reply
+    
+    def _tts_cache_key(self, text):
+        return TtsCache.make_key(
+            text,
+            voice=self.tts_voice,
+            sample_rate=self.sample_rate,
+            volume=self.tts_volume,
+            speech_rate=self.tts_speech_rate,
+            pitch_rate=self.tts_pitch_rate
+        )
+    
+    def _synthesize(self, text, playback=None):
+        """合成一段文本，PCM数据包写入playback，阻塞到合成结束
+
+        短文本合成成功后写入缓存。
+
+        Args:
+            text: 合成内容
+            playback: 播放流，为None时只合成不播放（预热缓存）
+        """
+        # 检查token是否有效
+        self.check_token()
+        capture = None
+        if len(text) <= self.tts_cache_max_chars:
+            capture = {'chunks': [], 'completed': False}
+        
+        # 创建阿里云语音合成器（由会话池按当前Token创建），播放流通过callback_args传给回调
+        tts = self.nls_pool.create_synthesizer(
+            on_metainfo=self.on_tts_metainfo,
+            on_data=self.on_tts_data,
+            on_completed=self.on_tts_completed,
+            on_error=self.on_tts_error,
+            on_close=self.on_tts_close,
+            callback_args=[playback, capture]
+        )
+        
+        # 开始语音合成，阻塞到合成完成；播放线程在第一个数据包到达后即开始播放
+        print("开始语音合成...")
+        try:
             tts.start(
                 text,
-                aformat="wav",  # 使用wav格式
-                voice="aicheng",  # 默认使用小云音色
+                aformat="pcm",  # 使用pcm格式，数据包可直接播放
+                voice=self.tts_voice,
                 sample_rate=self.sample_rate,
-                volume=80,  # 音量，取值范围0~100
-                speech_rate=0,  # 语速，取值范围-500~500
-                pitch_rate=0  # 语调，取值范围-500~500
+                volume=self.tts_volume,
+                speech_rate=self.tts_speech_rate,
+                pitch_rate=self.tts_pitch_rate,
+                completed_timeout=30  # 最多等待30秒
             )
-            
-            # 等待语音合成完成
-            timeout = 0
-            while not self.tts_completed and timeout < 30:  # 最多等待30秒
-                time.sleep(0.1)
-                timeout += 1
-            
-            if timeout >= 30:
-                print("语音合成超时")
-                return
-            
-            # 准备播放音频
-            self.tts_buffer.seek(0)
-            
-            # 创建播放器
-            p = pyaudio.PyAudio()
-            
-            # 打开流进行播放
-            stream = p.open(
-                format=p.get_format_from_width(2),  # 16位音频
-                channels=1,
-                rate=self.sample_rate,
-                output=True
-            )
-            
-            # 读取数据播放
-            data = self.tts_buffer.read(1024)
-            while data:
-                stream.write(data)
-                data = self.tts_buffer.read(1024)
+        except Exception:
+            if playback is not None:
+                playback.cancel()
+            raise
+        finally:
+            if playback is not None:
+                playback.finish()
+        
+        # 只缓存完整合成的音频
+        if capture is not None and capture['completed']:
+            self.tts_cache.put(self._tts_cache_key(text), b''.join(capture['chunks']))
+    
+    def _speak_sentence(self, text):
+        """合成一句话并排入播放队列，不等待播放结束（分句流水线和播报队列使用）"""
+        pcm = self.tts_cache.get(self._tts_cache_key(text))
+        if pcm is not None:
+            print(f"使用缓存的语音: {text}")
+            return self.player.play(pcm, wait=False)
+        playback = self.player.begin_stream(wait_all=not self.tts_streaming)
+        self._synthesize(text, playback)
+        return playback
+    
+    def _warm_tts_cache(self):
+        """预先合成尚未缓存的固定提示语（后台线程）"""
+        for text in self.static_prompts:
+            if self.tts_cache.contains(self._tts_cache_key(text)):
+                continue
+            try:
+                self._synthesize(text)
+            except Exception as e:
+                print(f"预合成提示语失败: {text}: {e}")
+        print(f"提示语缓存预热完成，共{len(self.static_prompts)}条")
+    
+    def text_to_speech(self, text):
+        """使用阿里云语音合成将文本转换为语音并播放，阻塞到播放结束
 
-            time.sleep(0.5)
-            
-            # 关闭资源
-            stream.stop_stream()
-            stream.close()
-            p.terminate()
-            
-            print("语音播放完成")
-            
-        except Exception as e:
-            print(f"语音合成错误: {e}")
+        排在播报队列中的提示语会先播完。
+        """
+        ticket = self.speech_queue.say(text)
+        if ticket.wait() and ticket.playback.first_audio_at is not None:
+            delay = ticket.playback.first_audio_at - ticket.playback.created_at
+            print(f"语音播放完成（首包延迟 {delay * 1000:.0f}ms）")
+    
+    def announce(self, text, **kwargs):
+        """非阻塞播报提示语，立即返回SpeechTicket
+
+        Args:
+            text: 播报内容
+            **kwargs: priority/coalesce_key/max_age/interrupt，见SpeechQueue.say
+        """
+        return self.speech_queue.say(text, **kwargs)
+    
+    # ===== 异步调度 =====
+    
+    async def _blocking(self, func, *args, **kwargs):
+        """在线程池中执行阻塞调用，不阻塞事件循环"""
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self.executor, functools.partial(func, *args, **kwargs))
+    
+    async def _iterate_blocking(self, iterable):
+        """在线程池中迭代阻塞的迭代器（例如流式LLM响应），通过有界队列逐项交给协程
+
+        队列满时生产线程等待，协程提前退出时生产线程在下一项停止。
+        """
+        loop = asyncio.get_running_loop()
+        queue = asyncio.Queue(maxsize=self.stream_queue_size)
+        done = object()
+        stopped = threading.Event()
+        
+        def produce():
+            try:
+                for item in iterable:
+                    if stopped.is_set():
+                        break
+                    asyncio.run_coroutine_threadsafe(queue.put(item), loop).result()
+            except Exception as e:
+                print(f"流式读取出错: {e}")
+            finally:
+                if not stopped.is_set():
+                    asyncio.run_coroutine_threadsafe(queue.put(done), loop).result()
+        
+        producer = loop.run_in_executor(self.executor, produce)
+        try:
+            while True:
+                item = await queue.get()
+                if item is done:
+                    break
+                yield item
+        finally:
+            stopped.set()
+            # 让可能阻塞在put上的生产线程退出
+            while not queue.empty():
+                queue.get_nowait()
+            if producer.done():
+                producer.result()
+    
+    async def speak(self, text, **kwargs):
+        """排队播报并等待播放结束（协程版text_to_speech）"""
+        return await self.speech_queue.say(text, **kwargs)
     
     def run(self):
         """运行语音助手"""
+        asyncio.run(self.run_async())
+    
+    async def run_async(self):
+        """异步主流程：启动检查后，唤醒检测和指令处理作为两个阶段并发运行"""
         print("语音助手已启动")
-        self.text_to_speech("机器人已启动")
+        # 后台预合成固定提示语，之后的提示语直接从缓存播放
+        threading.Thread(target=self._warm_tts_cache, name="TtsWarmup", daemon=True).start()
+        # 提前建立LLM连接，第一次提问不用等握手
+        self.llm.warm_up()
+        self.announce("机器人已启动")
         print(f"使用阿里云语音识别，Appkey: {self.ali_appkey}")
         print(f"使用阿里云百炼模型: {self.llm_model}")
         for wake_word in self.wake_words:
             print(f"唤醒词: {wake_word['word']}")
         print(f"阿里云语音服务URL: {self.ali_url}")
         
+        # 启动常驻麦克风采集线程
+        try:
+            await self._blocking(self.microphone.start)
+        except Exception as e:
+            print(f"启动麦克风采集失败: {e}")
+        if self.barge_in_enabled:
+            self.barge_in.start()
+        
         # 检查麦克风是否正常工作
-        self.text_to_speech("正在检查系统...")
-        self._check_microphone()
-        self.text_to_speech("所有功能正常")
+        self.announce("正在检查系统...")
+        await self._blocking(self._check_microphone)
+        self.announce("所有功能正常")
 
-
-        self.text_to_speech("你好，我是机器人。"
-                            "我已经准备就绪，请给我指令。")
+        await self.speak("你好，我是机器人。"
+                         "我已经准备就绪，请给我指令。")
         
+        commands = asyncio.Queue(maxsize=self.command_queue_size)
+        stages = [
+            asyncio.create_task(self._wake_stage(commands), name="wake"),
+            asyncio.create_task(self._command_stage(commands), name="command")
+        ]
+        try:
+            await asyncio.gather(*stages)
+        finally:
+            for stage in stages:
+                stage.cancel()
+    
+    async def _wake_stage(self, commands):
+        """唤醒阶段：检测唤醒词，把指令交给处理阶段"""
         while True:
             try:
                 # 检查token是否有效
-                self.check_token()
+                await self._blocking(self.check_token)
 
                 # 等待唤醒词
                 self.is_listening = False
-                cmd = self.wait_for_wake_word()
+                cmd = await self._blocking(self.wait_for_wake_word)
                 
                 if not self.is_listening or cmd == WakeWord.WAKE_NONE:
                     print("未能检测到唤醒词，重新尝试...")
                     continue
                 
+                # 需要继续录制指令时，趁播报提示音的时间预开识别会话
+                if cmd in (WakeWord.WAKE_LLM, WakeWord.WAKE_MOVE) and not self.pending_command:
+                    self.nls_pool.prewarm('command')
+                # 空闲较久时连接可能已被服务端关闭，趁播报和录音的时间重新建立
+                self.llm.warm_up(min_idle=30.0)
+                # 趁播报提示语的时间打开摄像头
+                if cmd == WakeWord.WAKE_TAKEPHOTO:
+                    self.camera.prewarm()
+                
+                await commands.put(cmd)
+                # 指令处理期间麦克风由处理阶段使用，处理完成后再继续检测唤醒词
+                await commands.join()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                print(f"发生错误: {e}")
+                self.is_listening = False
+                await asyncio.sleep(1)
+    
+    async def _command_stage(self, commands):
+        """指令处理阶段：调用唤醒词对应的处理协程"""
+        while True:
+            cmd = await commands.get()
+            # 处理指令期间允许用户插话
+            self.barge_in.armed = self.barge_in_enabled
+            try:
                 for wake_word in self.wake_words:
                     if wake_word['cmd'] == cmd:
-                        self.text_to_speech(f"检测到唤醒词: {wake_word['word']}")
-                        wake_word['handler']()
+                        # 提示语在后台播报，过时的确认语直接丢弃
+                        self.announce(f"检测到唤醒词: {wake_word['word']}", coalesce_key='wake', max_age=3.0)
+                        await wake_word['handler']()
                         break
                 
-                time.sleep(0.1)
-
-            except KeyboardInterrupt:
-                break
+                # 回答被打断后直接录制用户的新问题，不需要再说唤醒词
+                while self.barge_in_position is not None:
+                    await self.handle_barge_in()
+            except asyncio.CancelledError:
+                raise
             except Exception as e:
                 print(f"发生错误: {e}")
-                self.is_listening = False
+            finally:
+                self.barge_in.armed = False
+                commands.task_done()
 
     def _check_microphone(self):
         """检查麦克风是否正常工作"""
         print("检查麦克风...")
         try:
-            stream = self.audio.open(
-                format=pyaudio.paInt16,
-                channels=1,
-                rate=self.sample_rate,
-                input=True,
-                frames_per_buffer=1024
-            )
-            data = stream.read(1024)
-            if data:
-                print("麦克风正常工作")
-            stream.close()
+            if not self.microphone.is_running:
+                raise Exception(f"麦克风采集线程未运行 {self.microphone.last_error or ''}")
+            reader = self.microphone.create_reader()
+            data = reader.read(self.chunk_size, timeout=2.0)
+            if data is None:
+                raise Exception("读取麦克风数据超时")
+            print(f"麦克风正常工作，当前音量: {np.abs(data).mean():.0f}")
         except Exception as e:
             print(f"麦克风可能有问题: {e}")
             self.text_to_speech("麦克风可能有问题")
     
     def cleanup(self):
         """清理资源"""
+        self.barge_in.stop()
+        self.speech_queue.close()
+        self.nls_pool.close()
+        self.player.close()
+        self.microphone.stop()
+        self.oss_archiver.close()
+        self.camera.close()
+        if self.motion is not None:
+            self.motion.close()
+        if self.mecanum_wheels is not None:
+            self.mecanum_wheels.cleanup()
+        self.llm.close()
+        self.executor.shutdown(wait=False)
         self.audio.terminate()
 
+    def _llm_motion_plan(self, prompt):
+        """请LLM把移动指令转换为JSON运动计划并校验
+
+        Returns:
+            list: MotionSegment列表；回复不符合格式时返回None
+        """
+        options = {'temperature': 0.1, 'max_tokens': 512}
+        if self.llm_json_mode:
+            options['response_format'] = {'type': 'json_object'}
+        system_prompt = ("你是一个机器人控制助手，请把用户的指令分解为依次执行的若干个动作，每个动作包括方向和时间。"
+                         "方向必须是：前、后、左转、右转、左、右、左前、右前、左后、右后其中的一个，不要用其他词。"
+                         "时间单位为秒，必须是数字。"
+                         "只输出一个JSON对象，不要输出其它内容。"
+                         f"例如\"前进两秒然后右转一秒\"输出：{PLAN_JSON_FORMAT}")
+        response = self.get_llm_response(prompt, system_prompt=system_prompt, cache='move', **options)
+        print(f"回答: {response}")
+        try:
+            return parse_plan_json(response, max_seconds=self.motion.max_duration if self.motion else 30.0)
+        except ValueError as e:
+            print(f"LLM返回的运动计划无效: {e}")
+            # 无效的回复不能留在缓存中
+            self.llm_cache.discard('move', system_prompt, prompt)
+            return None
+
     # ===== 唤醒词处理 =====
     
-    def handle_wake_llm(self):
+    async def handle_wake_llm(self):
         """处理唤醒词被检测到的情况"""
 
-        self.text_to_speech("你好，请提问：")
+        # 唤醒词后面已经说出了问题，直接使用，否则提示用户提问
+        prompt = self.pending_command
+        self.pending_command = ""
+        speculation = None
+        if not prompt:
+            await self.speak("你好，请提问：")
 
-        # 录制用户命令
-        prompt, frames = self.record_command()
+            # 录制用户命令（提示语被打断时从插话起点开始录制）
+            prompt, speculation = await self._record_prompt()
         if prompt:
-            self.text_to_speech(f"您说: {prompt}。请让我思考一下。")
-            # 获取LLM回答
-            response = self.get_llm_response(
-                prompt, 
-                system_prompt="你是一个有用的助手，请简洁地回答用户的问题。用户问的问题可能是中文，也可能是英文。"
-                                  "但是由于语音识别的缘故，用户的问题可能会有语音识别错误，请尽可能的理解问题，并给出回答。")
-            print(f"回答: {response}")
-            
-            # 语音输出回答
-            if self.enable_voice_response:
-                self.text_to_speech(response)
+            await self._answer_prompt(prompt, speculation)
         else:
-            self.text_to_speech("未能识别您的问题，请重试")
+            await self.speak("未能识别您的问题，请重试")
+    
+    async def handle_barge_in(self):
+        """用户打断播放后，从插话起点录制新的问题并回答"""
+        prompt, speculation = await self._record_prompt()
+        if prompt:
+            await self._answer_prompt(prompt, speculation)
+    
+    async def _record_prompt(self):
+        """录制问题，中间结果稳定后就预先请求回答
 
-    def _upload_to_oss(self, local_path):
-        """使用预签名URL上传并返回可访问链接"""
+        Returns:
+            (prompt, speculation): speculation为与最终结果一致的预先请求，没有时为None
+        """
+        start_position = self._take_barge_in()
+        if not self.speculative_time:
+            prompt = await self._blocking(self.record_command, start_position=start_position)
+            return prompt, None
+        speculator = Speculator(self._stream_answer, stable_time=self.speculative_time)
         try:
-            # 生成唯一文件名
-            timestamp = datetime.datetime.now().strftime("%Y%m%d%H%M%S")
-            object_name = f"captured_images/{timestamp}_{uuid.uuid4().hex[:8]}.jpg"
-            
-            # 上传文件
-            self.oss_bucket.put_object_from_file(object_name, local_path)
-            print(f"文件已上传至OSS: {object_name}")
-
-            # 生成预签名URL（有效期1小时）
-            signed_url = self.oss_bucket.sign_url(
-                'GET',
-                object_name,
-                3600  # 过期时间（秒）
-            )
-            print(f"生成预签名URL: {signed_url}")
-            
-            return signed_url
-            
-        except Exception as e:
-            print(f"OSS操作失败: {e}")
-            return None
+            prompt = await self._blocking(self.record_command, start_position=start_position,
+                                          on_partial=speculator.update)
+            return prompt, speculator.claim(prompt)
+        finally:
+            speculator.cancel()
+    
+    def _stream_answer(self, prompt, cancel=None):
+        """流式请求对话回答（带对话历史）"""
+        messages = self.conversation.messages(self.chat_system_prompt, prompt)
+        return self.stream_llm_response(prompt, messages=messages, cancel=cancel)
+    
+    async def _answer_prompt(self, prompt, speculation=None):
+        """请求LLM并流式播报回答，用户插话时停止
+
+        Args:
+            speculation: 录音期间用相同文本预先发出的请求，给出时直接使用它的回答
+        """
+        # 在后台开始请求并缓存回答，与确认语的播报同时进行
+        if speculation is None:
+            cancel = CancelToken()
+            speculation = SpeculativeStream(prompt, self._stream_answer(prompt, cancel), cancel=cancel)
+        try:
+            # 分句流水线直接送入播放器，不经过播报队列，确认语必须先播完，否则可能排在回答之后
+            await self.speak(f"您说: {prompt}。请让我思考一下。")
+            tokens = self._iterate_blocking(speculation)
+            try:
+                if self.enable_voice_response:
+                    # 语音输出回答：每生成一句就送去合成，第一句合成完即开始播放
+                    pipeline = SentencePipeline(self._speak_sentence)
+                    self.active_pipeline = pipeline
+                    try:
+                        async for delta in tokens:
+                            if pipeline.cancelled or self.barge_in_position is not None:
+                                # 用户插话，剩余的回答不再生成
+                                pipeline.cancel()
+                                break
+                            pipeline.feed(delta)
+                        response = await self._blocking(pipeline.finish)
+                    finally:
+                        self.active_pipeline = None
+                else:
+                    response = "".join([delta async for delta in tokens])
+            finally:
+                await tokens.aclose()
+        finally:
+            # 被打断时停止读取剩余的回答
+            speculation.cancel()
+        print(f"回答: {response}")
+        # 被打断时只记录已经生成的部分
+        if response and response != self.llm_error_reply:
+            self.conversation.add_turn(prompt, response)
+
+    def _summarize_conversation(self, summary, turns):
+        """把旧摘要和较早的几轮对话压缩为新的摘要（在后台线程中调用）"""
+        lines = [f"已有摘要：{summary}"] if summary else []
+        for question, answer in turns:
+            lines.append(f"用户：{question}")
+            lines.append(f"助手：{answer}")
+        result = self.get_llm_response(
+            "\n".join(lines),
+            system_prompt="请把下面的对话压缩成一段简洁的摘要，保留用户提到的事实、偏好和尚未解决的问题，"
+                          "不超过150字，只输出摘要。",
+            temperature=0.3,
+            max_tokens=400
+        )
+        if result == self.llm_error_reply:
+            raise Exception("LLM请求失败")
+        return result
 
     def _check_raspberry_pi(self):
         """检测是否为树莓派环境"""
@@ -756,111 +1300,109 @@ class VoiceAssistant:
             print(f"检测树莓派环境出错: {e}")
             return False
     
-    def _take_photo_with_libcamera(self):
-        """使用libcamera工具拍照（树莓派专用）"""
-        # 生成唯一的临时文件名
-        temp_image = f"/tmp/capture_{uuid.uuid4().hex[:8]}.jpg"
-        
-        # 使用libcamera命令拍照
-        print("正在使用libcamera拍照...")
-        cmd = f"libcamera-jpeg -o {temp_image} --width 1920 --height 1080 --nopreview -t 2000"
-        result = subprocess.run(cmd.split(), capture_output=True, text=True)
-        
-        if result.returncode != 0:
-            error_msg = result.stderr if result.stderr else "未知错误"
-            raise Exception(f"libcamera拍照失败: {error_msg}")
-        
-        if not os.path.exists(temp_image):
-            raise Exception("拍照成功但未生成图片文件")
-        
-        print(f"libcamera拍照成功，保存至: {temp_image}")
-        return temp_image
+    def _take_photo(self):
+        """从常驻摄像头服务取最新画面，返回BGR图像"""
+        return self.camera.snapshot()
     
-    def _take_photo_with_opencv(self):
-        """使用OpenCV拍照"""
-        print("正在使用OpenCV拍照...")
-        cap = cv2.VideoCapture(self.capture_device)
-        if not cap.isOpened():
-            raise Exception(f"无法打开摄像头 {self.capture_device}")
-        
-        # 摄像头预热
-        print("摄像头预热中...")
-        time.sleep(3)
-        
-        # 拍照
-        ret, frame = cap.read()
-        cap.release()
-        
-        if not ret:
-            raise Exception("OpenCV拍照失败")
-        
-        # 保存临时文件
-        temp_image = f"/tmp/opencv_capture_{uuid.uuid4().hex[:8]}.jpg"
-        cv2.imwrite(temp_image, frame)
-        print(f"OpenCV拍照成功，保存至: {temp_image}")
-        
-        return temp_image
+    async def _capture_for_vision(self, profile):
+        """拍照并预处理，画面过暗或模糊时自动重拍
+
+        重拍次数用完后使用最后一张画面，不再做质量检查。
+
+        Returns:
+            PreprocessResult: 预处理结果
+        """
+        for attempt in range(self.vision_retakes + 1):
+            frame = await self._blocking(self._take_photo)
+            check_quality = attempt < self.vision_retakes
+            try:
+                result = await self._blocking(self.image_preprocessor.process, frame, profile, check_quality)
+            except ImageRejected as e:
+                print(f"{e}，重新拍照")
+                self.announce("画面太暗了，请开灯或把物品移近一些" if e.reason == 'dark'
+                              else "画面有些模糊，请保持物品不动", coalesce_key='retake')
+                # 等画面稳定一下再拍
+                await asyncio.sleep(0.5)
+                continue
+            print(f"图片预处理: {result.summary()}")
+            return result
     
-    def handle_wake_takephoto(self):
-        """处理环境识别唤醒（集成OSS上传）"""
+    def _stream_vision_response(self, image_url, detail="high"):
+        """流式请求视觉模型识别图片主体
+
+        Yields:
+            (kind, text): kind为'reasoning'（思考过程）或'answer'（最终回答）
+        """
+        # 纯文本的备用模型看不到图片，不使用
+        completion = self.llm.stream(
+            model=self.vision_model,
+            fallback=False,
+            messages=[
+                {
+                    "role": "system",
+                    "content": [{
+                        "type": "text", 
+                        "text": "图像识别工具，只能识别图片主体内容，不会识别其它不重要的内容。"
+                    }],
+                },
+                {
+                    "role": "user",
+                    "content": [
+                        {
+                            "type": "image_url",
+                            "image_url": {
+                                "url": image_url,
+                                "detail": detail  # 细节控制参数，由预处理配置决定
+                            }
+                        },
+                        {
+                            "type": "text", 
+                            "text": "请告诉我这张图片的最主要的物品是什么，只说名字，不要其它任何额外说明"
+                        }
+                    ],
+                }
+            ],
+            temperature=0.3,  # 更低的随机性保证描述准确性
+            max_tokens=4096
+        )
+        for chunk in completion:
+            if not chunk.choices:
+                continue
+            delta = chunk.choices[0].delta
+            if hasattr(delta, 'reasoning_content') and delta.reasoning_content:
+                yield 'reasoning', delta.reasoning_content
+            if delta.content:
+                yield 'answer', delta.content
+    
+    async def handle_wake_takephoto(self):
+        """处理环境识别唤醒"""
         try:
-            self.text_to_speech("准备拍照，请把需要拍照的物品放在摄像头前")
+            await self.speak("准备拍照，请把需要拍照的物品放在摄像头前")
             
-            # 根据环境选择拍照方式
-            temp_image = None
-            if self.is_raspberry_pi:
-                try:
-                    temp_image = self._take_photo_with_libcamera()
-                except Exception as e:
-                    print(f"libcamera拍照失败: {e}, 尝试使用OpenCV拍照...")
-                    temp_image = self._take_photo_with_opencv()
+            image = await self._capture_for_vision('object')
+            jpeg_data = image.jpeg
+
+            # 同一物品重复识别时直接播报缓存结果，不再上传和推理
+            image_hash = self.vision_cache.hash(image.thumbnail)
+            cached, distance = self.vision_cache.get(image_hash, namespace='object')
+            if cached:
+                print(f"识图缓存命中（汉明距离 {distance}）: {cached}")
+                await self.speak(f"这个是 {cached}")
+                return
+
+            # 播报与上传同时进行
+            self.announce("拍照完成，正在处理图片...")
+            if self.vision_inline:
+                # 图片直接随请求发送，OSS归档在后台进行，不影响识别
+                image_url = to_data_url(jpeg_data)
+                if self.oss_archive:
+                    self.oss_archiver.submit(jpeg_data)
             else:
-                temp_image = self._take_photo_with_opencv()
+                image_url = await self._blocking(self.oss_archiver.upload, jpeg_data)
+                if not image_url:
+                    raise Exception("图片上传失败")
 
-            self.text_to_speech("拍照完成，正在处理图片...")
-            
-            # 上传到OSS
-            oss_url = self._upload_to_oss(temp_image)
-            if not oss_url:
-                raise Exception("图片上传失败")
-            
-            # 删除本地临时文件
-            os.remove(temp_image)
-            print("已清理本地临时文件")
-
-            # 使用OSS URL进行识别
-            self.text_to_speech("开始分析图片内容，请稍候")
-            completion = self.openai_client.chat.completions.create(
-                model=self.vision_model,
-                messages=[
-                    {
-                        "role": "system",
-                        "content": [{
-                            "type": "text", 
-                            "text": "图像识别工具，只能识别图片主体内容，不会识别其它不重要的内容。"
-                        }],
-                    },
-                    {
-                        "role": "user",
-                        "content": [
-                            {
-                                "type": "image_url",
-                                "image_url": {
-                                    "url": oss_url,
-                                    "detail": "high"  # 新增细节控制参数
-                                }
-                            },
-                            {
-                                "type": "text", 
-                                "text": "请告诉我这张图片的最主要的物品是什么，只说名字，不要其它任何额外说明"
-                            }
-                        ],
-                    }
-                ],
-                stream=True,
-                temperature=0.3,  # 更低的随机性保证描述准确性
-                max_tokens=4096
-            )
+            self.announce("开始分析图片内容，请稍候")
 
             # 初始化变量
             reasoning_content = ""
@@ -869,94 +1411,77 @@ class VoiceAssistant:
             response_buffer = ""  # 用于累积语音合成的文本
             
             print("\n" + "="*20 + "思考过程" + "="*20)
-            for chunk in completion:
-                if not chunk.choices:
-                    continue
-
-                delta = chunk.choices[0].delta
-                
-                # 实时打印思考内容
-                if hasattr(delta, 'reasoning_content') and delta.reasoning_content:
-                    print(delta.reasoning_content, end='', flush=True)
-                    reasoning_content += delta.reasoning_content
+            stream = self._iterate_blocking(self._stream_vision_response(image_url, image.detail))
+            try:
+                async for kind, text in stream:
+                    # 实时打印思考内容
+                    if kind == 'reasoning':
+                        print(text, end='', flush=True)
+                        reasoning_content += text
+                        
+                        # 累积到一定长度再合成语音
+                        response_buffer += text
+                        if len(response_buffer) > 30:
+                            self.announce(response_buffer)
+                            response_buffer = ""
+                        continue
                     
-                    # 累积到一定长度再合成语音
-                    response_buffer += delta.reasoning_content
-                    if len(response_buffer) > 30:
-                        self.text_to_speech(response_buffer)
-                        response_buffer = ""
-                
-                # 处理最终回答
-                if delta.content:
+                    # 处理最终回答
                     if not is_answering:
                         print("\n" + "="*20 + "最终回答" + "="*20)
                         is_answering = True
                         if response_buffer:  # 清空剩余思考内容
-                            self.text_to_speech(response_buffer)
+                            self.announce(response_buffer)
                             response_buffer = ""
                     
-                    print(delta.content, end='', flush=True)
-                    answer_content += delta.content
-                    response_buffer += delta.content
+                    print(text, end='', flush=True)
+                    answer_content += text
+                    response_buffer += text
+            finally:
+                await stream.aclose()
 
             # 合成剩余内容
             if response_buffer:
-                self.text_to_speech(f"分析完成，这个是 {response_buffer}")
+                await self.speak(f"分析完成，这个是 {response_buffer}")
 
+            answer_content = answer_content.strip()
+            if answer_content:
+                self.vision_cache.put(image_hash, answer_content, namespace='object')
             print("\n分析完成")
 
         except Exception as e:
             print(f"环境识别失败: {e}")
-            self.text_to_speech("分析过程出现错误，请重试")
-            # 确保清理本地文件
-            if os.path.exists(self.image_path):
-                os.remove(self.image_path)
+            await self.speak("分析过程出现错误，请重试")
 
-    def handle_wake_move(self):
+    async def handle_wake_move(self):
         """处理移动指令，控制电机"""
-        if self.enable_voice_response:
-            self.text_to_speech("好的，如何移动？")
+        prompt = self.pending_command
+        self.pending_command = ""
+        if not prompt:
+            if self.enable_voice_response:
+                await self.speak("好的，如何移动？")
 
-        prompt, frames = self.record_command()
+            prompt = await self._blocking(self.record_command, start_position=self._take_barge_in())
         if prompt:
             print(f"您说: {prompt}")
-            response = self.get_llm_response(
-                prompt, 
-                system_prompt="你是一个机器人控制助手，请解析用户的指令，给出移动方向。把结果分解为：方向和时间。"
-                             "方向必须是：前、后、左转、右转、左、右、左前、右前、左后、右后其中的一个，不要用其他词。"
-                             "时间单位为秒，必须是数字。"
-                             "格式必须是两行：第一行为方向，第二行为时间（只要数字）。"
-                             "例如：\n左\n20")
-            print(f"回答: {response}")
-
-            response = response.split("\n")
-            direction = response[0]
-            duration = float(response[1])
-
-            self.text_to_speech(f"向{direction}移动{int(duration)}秒")
-
-            if direction == "前":
-                self.mecanum_wheels.move_forward(duration)
-            elif direction == "后":
-                self.mecanum_wheels.move_backward(duration)
-            elif direction == "左":
-                self.mecanum_wheels.move_left(duration)
-            elif direction == "右":
-                self.mecanum_wheels.move_right(duration)
-            elif direction == "左前":
-                self.mecanum_wheels.move_left_forward(duration)
-            elif direction == "右前":
-                self.mecanum_wheels.move_right_forward(duration)
-            elif direction == "左后":
-                self.mecanum_wheels.move_left_backward(duration)
-            elif direction == "右后":
-                self.mecanum_wheels.move_right_backward(duration)    
-            elif direction == "左转":
-                self.mecanum_wheels.rotate_left(duration)
-            elif direction == "右转":
-                self.mecanum_wheels.rotate_right(duration)
+            # 简单指令由本地规则直接解析，无法解析时才请求LLM
+            plan = parse_motion_text(prompt, max_seconds=self.motion.max_duration if self.motion else 30.0)
+            if plan is not None:
+                print(f"本地解析移动指令: {plan}")
             else:
-                self.text_to_speech("移动方向错误，请重试")
+                plan = await self._blocking(self._llm_motion_plan, prompt)
+            if not plan:
+                await self.speak("移动方向错误，请重试")
+                return
+            if self.motion is None:
+                await self.speak("电机不可用")
+                return
+
+            # 整个计划交给执行器线程依次执行，处理函数立即返回继续检测唤醒词，期间说"停"即可停车
+            handles = self.motion.run_plan(plan)
+            for segment, handle in zip(plan, handles):
+                segment.duration = handle.duration  # 超过上限的分段已被截断
+            self.announce("，".join(segment.describe() for segment in plan))
 
 def main():
     """主函数"""
@@ -965,7 +1490,11 @@ def main():
 
     assistant = VoiceAssistant()
     try:
-        assistant.run()
+        if "--enroll" in sys.argv:
+            # 录入本地唤醒词检测模板
+            assistant.enroll_wake_words()
+        else:
+            assistant.run()
     except KeyboardInterrupt:
         print("\n程序已退出") 
     finally: